@@ -14,25 +14,22 @@ import streamlit as st
 import streamlit.components.v1 as components
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterable, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from email.utils import formataddr
 import time
 import io
-from jinja2 import Template
 import re
 import base64
 import json
 import os
+import uuid
+from contextlib import nullcontext
 import extra_streamlit_components as stx
 from streamlit_sortables import sort_items
 
 # 로컬 모듈 - 리팩토링된 통합 모듈
 from email_template import (
-    render_email, render_email_content, render_preview,
+    render_email, render_email_content, render_preview, get_compiled_template, render_tax_invoice_html,
     format_currency, format_percent, clean_id_column, format_date,
     get_styles, EmailContext, EmailStyleConfig,
     DEFAULT_HEADER_TITLE, DEFAULT_HEADER_SUBTITLE, DEFAULT_GREETING,
@@ -41,13 +38,27 @@ from email_template import (
 )
 from constants import (
     APP_TITLE, APP_SUBTITLE, VERSION, STEPS,
-    SMTP_PROVIDERS, DEFAULT_SENDER_NAME,
+    SMTP_PROVIDERS,
     DEFAULT_BATCH_SIZE, DEFAULT_EMAIL_DELAY_MIN, DEFAULT_EMAIL_DELAY_MAX, DEFAULT_BATCH_DELAY,
-    MAX_RETRY_COUNT, TEMPLATE_PRESETS, SemanticColors,
-    SESSION_STATE_DEFAULTS, CONFIG_COLUMNS_PATH, MAIL_HISTORY_DB_PATH,
+    DEFAULT_SEND_BURST, DEFAULT_SMTP_POOL_SIZE, MAX_SMTP_POOL_SIZE, MAX_RETRY_COUNT, TEMPLATE_PRESETS, SemanticColors,
+    SESSION_STATE_DEFAULTS, CONFIG_COLUMNS_PATH, MAIL_HISTORY_DB_PATH, HISTORY_PAGE_SIZE, PERF_METRICS_DIR,
+    HISTORY_EXPORT_DIR, HISTORY_EXPORT_MAX_FILES, HISTORY_EXPORT_EXPIRE_SECONDS,
+    SESSION_SPILL_ENABLED, SESSION_SPILL_DIR, SESSION_SPILL_IDLE_SECONDS, SESSION_SPILL_EXPIRE_SECONDS,
+    SESSION_MEMORY_BUDGET_BYTES,
     validate_email as validate_email_pattern, get_default_period, get_template_variables
 )
 from style import STREAMLIT_CUSTOM_CSS
+from data_loader import WorkbookSource, WORKBOOK_CACHE, load_cached_sheet, parse_failure_summary
+from prep_pipeline import PrepPipeline, PrepSettings
+from smtp_dispatcher import SMTPDispatcher, SendJob, build_wire_bytes, create_smtp_connection
+from render_pool import RenderSettings, iter_rendered_chunks, render_all
+from rate_limiter import TokenBucketRateLimiter
+from send_worker import BackgroundSendWorker, start_send_worker, get_send_worker, new_send_job_id, result_row
+from outbox import SendOutbox
+from history_db import HistoryDB
+from perf_trace import Tracer, activate_tracer, span, traced
+from session_store import SessionStore, shared_session_store
+from grouped_dataset import sanity_check, tax_invoice_amounts
 
 
 # ============================================================================
@@ -1288,6 +1299,11 @@ def reset_and_restart():
     # 보존할 설정 (SMTP 등)
     smtp_config = st.session_state.get('smtp_config')
     
+    # 끝난 발송 작업은 URL에서 분리 (진행 중인 작업은 계속 추적)
+    worker = get_send_worker(st.query_params.get(SEND_JOB_QUERY_PARAM))
+    if worker is not None and not worker.is_active:
+        del st.query_params[SEND_JOB_QUERY_PARAM]
+    
     # 모든 세션 상태 초기화
     for key in list(st.session_state.keys()):
         del st.session_state[key]
@@ -1441,55 +1457,21 @@ def add_log(message: str, level: str = "info"):
         st.session_state.activity_log = st.session_state.activity_log[-100:]
 
 
-def sanity_check(grouped_data: dict) -> List[dict]:
-    """발송 전 데이터 검증 (Sanity Check)"""
-    warnings = []
-    
-    for group_name, data in grouped_data.items():
-        # 금액 0원 체크
-        if data.get('totals'):
-            for col, val in data['totals'].items():
-                try:
-                    amount = float(str(val).replace(',', '').replace('원', ''))
-                    if amount == 0:
-                        warnings.append({
-                            'group': group_name,
-                            'type': 'zero_amount',
-                            'message': f"금액 0원 ({col})"
-                        })
-                except:
-                    pass
-        
-        # 이메일 없음 체크
-        if not data.get('recipient_email'):
-            warnings.append({
-                'group': group_name,
-                'type': 'no_email',
-                'message': "이메일 주소 없음"
-            })
-        
-        # 데이터 행 없음 체크
-        if data.get('row_count', 0) == 0:
-            warnings.append({
-                'group': group_name,
-                'type': 'no_data',
-                'message': "데이터 행 없음"
-            })
-    
-    return warnings
-
-
 # ============================================================================
 # DATA PROCESSING FUNCTIONS
 # ============================================================================
 
-def load_excel_file(uploaded_file) -> Tuple[Optional[pd.ExcelFile], List[str], Optional[str]]:
-    """엑셀 파일 로드"""
+def load_excel_file(uploaded_file) -> Tuple[Optional[WorkbookSource], List[str], Optional[str]]:
+    """엑셀 파일 로드
+    
+    업로드 내용 해시로 WorkbookSource를 만들고, 시트 목록도 해시 단위로 캐시합니다.
+    실제 openpyxl 파싱은 캐시 미스가 난 시트에 대해서만 수행됩니다.
+    """
     try:
         file_name = uploaded_file.name.lower()
         if file_name.endswith(('.xlsx', '.xls')):
-            xlsx = pd.ExcelFile(uploaded_file)
-            return xlsx, xlsx.sheet_names, None
+            source = WorkbookSource.from_upload(uploaded_file)
+            return source, source.sheet_names, None
         elif file_name.endswith('.csv'):
             return None, ['CSV 데이터'], None
         else:
@@ -1498,215 +1480,45 @@ def load_excel_file(uploaded_file) -> Tuple[Optional[pd.ExcelFile], List[str], O
         return None, [], f"파일 로드 오류: {str(e)}"
 
 
-def load_sheet(xlsx: pd.ExcelFile, sheet_name: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
+@traced('load')
+def load_sheet(xlsx: WorkbookSource, sheet_name: str) -> Tuple[Optional[pd.DataFrame], Optional[str]]:
     """시트 로드 - 항상 (DataFrame, error_message) 튜플 반환
     
     엑셀 원본 형식 유지:
     - 숫자에 콤마 있으면 콤마 포함 문자열로 보존
     - 바코드/코드는 숫자 그대로 유지
+    
+    파싱 결과는 (업로드 내용 해시, 시트명) 키로 캐시되어
+    Streamlit 리런 시 다시 파싱하지 않습니다. 반환된 DataFrame은 읽기 전용입니다.
     """
     try:
-        # 먼저 문자열로 읽어서 원본 형식 보존
-        df_str = pd.read_excel(xlsx, sheet_name=sheet_name, dtype=str)
-        # 일반 파싱도 수행 (숫자 계산용)
-        df = pd.read_excel(xlsx, sheet_name=sheet_name)
+        df, cache_hit = load_cached_sheet(xlsx, sheet_name)
+        _log_workbook_cache(xlsx, sheet_name, cache_hit)
         
         if df.empty:
             return None, "시트에 데이터가 없습니다."
         
-        # 원본 문자열 데이터 저장 (컬럼별 원본 형식 확인용)
-        df.attrs['original_str'] = df_str
-        
         return df, None  # 성공 시 (df, None) 반환
     except Exception as e:
         return None, f"시트 로드 오류: {str(e)}"
 
 
-def merge_email_data(df_data, df_email, join_col_data, join_col_email, email_col):
-    """이메일 데이터 병합"""
-    df_data = df_data.copy()
-    df_email = df_email.copy()
-    df_data['_join_key'] = df_data[join_col_data].astype(str).str.strip()
-    df_email['_join_key'] = df_email[join_col_email].astype(str).str.strip()
-    df_merged = df_data.merge(
-        df_email[['_join_key', email_col]].drop_duplicates('_join_key'),
-        on='_join_key', how='left'
-    )
-    df_merged.drop('_join_key', axis=1, inplace=True)
-    return df_merged
-
-
-def clean_dataframe(df, amount_cols, percent_cols, date_cols, id_cols):
-    """데이터 정리 - 엑셀 원본 유지, 숫자 컬럼만 numeric 변환"""
-    df_cleaned = df.copy()
-    
-    # 숫자 컬럼만 numeric 변환 (합계 계산을 위해)
-    # 나머지는 엑셀 원본 그대로 유지
-    for col in amount_cols:
-        if col in df_cleaned.columns:
-            df_cleaned[col] = pd.to_numeric(
-                df_cleaned[col].astype(str).str.replace(',', '').str.replace('₩', '').str.replace('원', '').str.strip(),
-                errors='coerce'
-            )
-    for col in percent_cols:
-        if col in df_cleaned.columns:
-            df_cleaned[col] = pd.to_numeric(
-                df_cleaned[col].astype(str).str.replace(',', '').str.replace('%', '').str.strip(),
-                errors='coerce'
-            )
-    
-    # id_cols, date_cols는 원본 그대로 유지 (형식 변환 안 함)
-    return df_cleaned
-
-
-def group_data_with_wildcard(df, group_key_col, email_col, amount_cols, percent_cols, display_cols,
-                             conflict_resolution='first', use_wildcard=True,
-                             wildcard_suffixes=None, calculate_totals=True):
-    """와일드카드 그룹화"""
-    if wildcard_suffixes is None:
-        wildcard_suffixes = [" 합계"]
-    
-    grouped_data = {}
-    conflicts = []
+def _log_workbook_cache(source: WorkbookSource, sheet_name: str, cache_hit: bool):
+    """워크북 캐시 적중/미스 카운터를 운영 로그에 기록 (세션당 시트별 1회)"""
+    if 'workbook_cache_logged' not in st.session_state:
+        st.session_state.workbook_cache_logged = set()
     
-    def get_base_key(val):
-        val_str = str(val).strip()
-        for suffix in wildcard_suffixes:
-            if val_str.endswith(suffix):
-                return val_str[:-len(suffix)].strip()
-        return val_str
-    
-    if use_wildcard:
-        df = df.copy()
-        df['_base_group_key'] = df[group_key_col].apply(get_base_key)
-        group_col = '_base_group_key'
-    else:
-        group_col = group_key_col
-    
-    for base_key, group_df in df.groupby(group_col):
-        base_key_str = str(base_key)
-        if not base_key_str or base_key_str.lower() in ['nan', 'none', '(비어 있음)']:
-            continue
-        
-        # 이메일 컬럼 존재 여부 확인
-        if email_col and email_col in group_df.columns:
-            unique_emails = [str(e).strip() for e in group_df[email_col].dropna().unique()
-                            if str(e).strip() and str(e).strip().lower() not in ['nan', 'none', '']]
-        else:
-            unique_emails = []
-        
-        has_conflict = len(unique_emails) > 1
-        if len(unique_emails) == 0:
-            recipient_email = None
-        elif len(unique_emails) == 1:
-            recipient_email = unique_emails[0]
-        else:
-            if conflict_resolution == 'first':
-                recipient_email = unique_emails[0]
-            elif conflict_resolution == 'most_common' and email_col and email_col in group_df.columns:
-                recipient_email = str(group_df[email_col].value_counts().index[0])
-            else:
-                recipient_email = unique_emails[0] if unique_emails else None
-            conflicts.append({'group_key': base_key_str, 'emails': unique_emails,
-                            'selected': recipient_email})
-        
-        def sort_key(row_val):
-            return 1 if any(str(row_val).endswith(s) for s in wildcard_suffixes) else 0
-        
-        if use_wildcard:
-            sorted_indices = group_df[group_key_col].apply(sort_key).sort_values().index
-            group_df = group_df.loc[sorted_indices]
-        
-        # ============================================================
-        # 엑셀 원본 형식 완전 유지 + NaN/0만 빈칸 처리
-        # - 엑셀에서 콤마 있으면 콤마 그대로
-        # - 바코드/코드 등 콤마 없는 숫자는 그대로
-        # ============================================================
-        # 원본 문자열 데이터 가져오기
-        original_str_df = df.attrs.get('original_str', None)
-        
-        rows = []
-        for idx, row in group_df.iterrows():
-            row_dict = {}
-            for col in display_cols:
-                if col in row.index:
-                    value = row[col]
-                    
-                    # NaN 체크
-                    if pd.isna(value) or value is None:
-                        row_dict[col] = ''
-                        continue
-                    
-                    # 원본 문자열 확인
-                    orig_str = None
-                    if original_str_df is not None and col in original_str_df.columns:
-                        try:
-                            orig_val = original_str_df.loc[idx, col]
-                            if pd.notna(orig_val):
-                                orig_str = str(orig_val).strip()
-                        except:
-                            pass
-                    
-                    # 숫자 0 체크 (빈칸 처리)
-                    if isinstance(value, (int, float)) and value == 0:
-                        row_dict[col] = ''
-                        continue
-                    
-                    # 원본 문자열이 있으면 그대로 사용 (NaN/0 제외)
-                    if orig_str:
-                        # 원본이 '0' 또는 빈값이면 빈칸
-                        if orig_str.lower() in ['nan', 'none', 'nat', '', '0', '0.0', '0.00']:
-                            row_dict[col] = ''
-                        else:
-                            row_dict[col] = orig_str
-                        continue
-                    
-                    # 원본 없으면 값 그대로 변환 (콤마 없이)
-                    if isinstance(value, (int, float)):
-                        if isinstance(value, float) and value == int(value):
-                            row_dict[col] = str(int(value))
-                        else:
-                            row_dict[col] = str(value)
-                    else:
-                        str_val = str(value).strip()
-                        if str_val.lower() in ['nan', 'none', 'nat', '', '0', '0.0']:
-                            row_dict[col] = ''
-                        else:
-                            row_dict[col] = str_val
-                else:
-                    row_dict[col] = ''
-            rows.append(row_dict)
-        
-        totals = {}
-        if calculate_totals:
-            # 합계 자동 계산이 활성화된 경우에만 totals 생성
-            if use_wildcard:
-                # 와일드카드 사용 시: 합계 행을 제외한 데이터만 합산
-                non_total_mask = ~group_df[group_key_col].apply(
-                    lambda x: any(str(x).endswith(s) for s in wildcard_suffixes))
-                non_total_df = group_df[non_total_mask]
-                for col in amount_cols:
-                    if col in non_total_df.columns:
-                        total_val = non_total_df[col].sum()
-                        totals[col] = f"{total_val:,.0f}" if total_val != 0 else ''
-            else:
-                # 와일드카드 미사용 시: 전체 데이터 합산
-                for col in amount_cols:
-                    if col in group_df.columns:
-                        total_val = group_df[col].sum()
-                        totals[col] = f"{total_val:,.0f}" if total_val != 0 else ''
-        # calculate_totals가 False이면 totals는 빈 딕셔너리 유지 (합계 행 표시 안함)
-        
-        grouped_data[base_key_str] = {
-            'recipient_email': recipient_email,
-            'rows': rows,
-            'totals': totals,
-            'row_count': len(rows),
-            'has_conflict': has_conflict,
-            'conflict_emails': unique_emails if has_conflict else [],
-        }
+    log_key = (source.content_hash, sheet_name)
+    if log_key in st.session_state.workbook_cache_logged:
+        return
+    st.session_state.workbook_cache_logged.add(log_key)
     
-    return grouped_data, conflicts
+    stats = WORKBOOK_CACHE.stats()
+    result = "적중" if cache_hit else "미스 (파싱)"
+    add_log(
+        f"워크북 캐시 {result}: {sheet_name} | 적중 {stats['hits']} / 미스 {stats['misses']} "
+        f"| {stats['bytes'] / 1024 / 1024:.1f}MB / {stats['max_bytes'] / 1024 / 1024:.0f}MB"
+    )
 
 
 # ============================================================================
@@ -1719,113 +1531,12 @@ def validate_email(email: str) -> bool:
     return bool(re.match(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$', email.strip()))
 
 
-def create_smtp_connection(config, max_retries=3):
-    """
-    SMTP 연결 생성 - 하이웍스(Hiworks) SSL 최적화
-    
-    필수 조건:
-    - Server: smtps.hiworks.com
-    - Port: 465 (SSL)
-    - smtplib.SMTP_SSL 사용 (일반 SMTP 아님)
-    - From 헤더와 로그인 이메일 일치 필수 (553 에러 방지)
-    """
-    import ssl
-    import socket
-    last_error = None
-    timeout = config.get('timeout', 30)
-    
-    for attempt in range(max_retries):
-        try:
-            if config['port'] == 465:
-                # SSL 컨텍스트 설정 (하이웍스 호환)
-                context = ssl.create_default_context()
-                context.check_hostname = False
-                context.verify_mode = ssl.CERT_NONE
-                context.set_ciphers('DEFAULT@SECLEVEL=1')
-                
-                # SMTP_SSL로 465 포트 직접 연결 (STARTTLS 아님)
-                server = smtplib.SMTP_SSL(
-                    config['server'], 
-                    config['port'], 
-                    context=context,
-                    timeout=timeout
-                )
-            else:
-                # 587 포트 등 STARTTLS 방식
-                server = smtplib.SMTP(config['server'], config['port'], timeout=timeout)
-                server.ehlo()
-                if config.get('use_tls', True):
-                    server.starttls()
-                    server.ehlo()
-            
-            # 로그인 (이메일과 앱 비밀번호)
-            server.login(config['username'], config['password'])
-            return server, None
-            
-        except smtplib.SMTPAuthenticationError as e:
-            error_code = e.smtp_code if hasattr(e, 'smtp_code') else 0
-            error_str = str(e)
-            
-            # 454: 임시 인증 서버 오류 → 재시도
-            if error_code == 454 or '454' in error_str or 'Temporary' in error_str:
-                last_error = f"인증 서버 임시 오류 (시도 {attempt+1}/{max_retries})"
-                time.sleep(2)
-                continue
-            
-            # 535: 인증 거부 (비밀번호 오류)
-            if error_code == 535 or '535' in error_str:
-                return None, "❌ 인증 거부: 비밀번호가 틀렸거나 2차 앱 비밀번호가 필요합니다."
-            
-            # 553: 발신자 불일치 또는 IP 차단
-            if error_code == 553 or '553' in error_str:
-                if 'IP' in error_str:
-                    return None, "❌ IP 차단: 하이웍스 관리자 설정에서 이 IP를 허용해야 합니다."
-                return None, "❌ 발신자 불일치: From 주소와 로그인 이메일이 다릅니다."
-            
-            return None, f"❌ 인증 실패: {error_str[:150]}"
-            
-        except socket.timeout:
-            last_error = f"연결 시간 초과 ({timeout}초) - 네트워크 확인 필요"
-            time.sleep(2)
-            continue
-            
-        except socket.gaierror:
-            return None, "❌ 서버를 찾을 수 없음: 서버 주소 또는 인터넷 연결을 확인하세요."
-            
-        except ssl.SSLError as e:
-            error_str = str(e)
-            if 'handshake' in error_str.lower():
-                last_error = f"SSL 핸드셰이크 실패 (시도 {attempt+1}/{max_retries})"
-                time.sleep(2)
-                continue
-            return None, f"❌ SSL 오류: {error_str[:100]}"
-            
-        except ConnectionRefusedError:
-            return None, "❌ 연결 거부: 서버 주소/포트가 올바른지 확인하세요."
-            
-        except Exception as e:
-            error_str = str(e)
-            if 'handshake' in error_str.lower() or 'ssl' in error_str.lower():
-                last_error = f"SSL 연결 오류 (시도 {attempt+1}/{max_retries})"
-                time.sleep(2)
-                continue
-            return None, f"❌ 연결 오류: {error_str[:100]}"
-    
-    return None, f"❌ 연결 실패: {last_error} - 네트워크 상태를 확인하고 잠시 후 다시 시도하세요."
-
-
+@traced('smtp.test_send')
 def send_email(server, sender_email, recipient, subject, html_content, sender_name=None):
     """이메일 발송 함수"""
     try:
-        msg = MIMEMultipart('alternative')
-        msg['Subject'] = subject
-        if sender_name:
-            msg['From'] = formataddr((sender_name, sender_email))
-        else:
-            msg['From'] = formataddr((DEFAULT_SENDER_NAME, sender_email))
-        msg['To'] = recipient
-        msg.attach(MIMEText(html_content, 'html', 'utf-8'))
-        server.sendmail(sender_email, recipient, msg.as_string())
+        server.sendmail(sender_email, recipient,
+                        build_wire_bytes(sender_email, recipient, subject, html_content, sender_name))
         return True, None
     except Exception as e:
         return False, str(e)
@@ -2432,8 +2143,6 @@ def execute_step_transition(current_step: int, direction: str = "next") -> bool:
         display_cols = st.session_state.get('display_cols', [])
         amount_cols = st.session_state.get('amount_cols', [])
         percent_cols = st.session_state.get('percent_cols', [])
-        date_cols = st.session_state.get('date_cols', [])
-        id_cols = st.session_state.get('id_cols', [])
         use_wildcard = st.session_state.get('use_wildcard_grouping', True)
         conflict_resolution = st.session_state.get('conflict_resolution', 'first')
         
@@ -2444,29 +2153,9 @@ def execute_step_transition(current_step: int, direction: str = "next") -> bool:
         # 컬럼 설정 저장
         save_column_settings(sheet_name)
         
-        # 데이터 처리
-        df_work = df.copy()
-        
-        if use_separate and df_email is not None:
-            df_work = merge_email_data(
-                df_work, df_email,
-                st.session_state.get('join_col_data'),
-                st.session_state.get('join_col_email'),
-                st.session_state.get('email_col')
-            )
-        
-        df_cleaned = clean_dataframe(df_work, amount_cols, percent_cols, date_cols, id_cols)
-        st.session_state.df = df_cleaned
-        
-        grouped, conflicts = group_data_with_wildcard(
-            df_cleaned, group_key_col, st.session_state.get('email_col'),
-            amount_cols, percent_cols, display_cols, conflict_resolution,
-            use_wildcard, st.session_state.get('wildcard_suffixes', [' 합계']),
-            st.session_state.get('calculate_totals_auto', False)
-        )
-        
-        st.session_state.grouped_data = grouped
-        st.session_state.email_conflicts = conflicts
+        # 데이터 처리 (설정이 바뀐 단계만 다시 실행)
+        prepare_grouped_data(df, df_email if use_separate else None, group_key_col, display_cols,
+                             amount_cols, percent_cols, use_wildcard, conflict_resolution)
         st.session_state.current_step = 3
         return True
     
@@ -3000,7 +2689,8 @@ def render_step1():
             df_data, err = load_sheet(xlsx, data_sheet)
             if not err and df_data is not None:
                 st.session_state.df = df_data
-                st.session_state.df_original = df_data.copy()
+                # 워크북 캐시 프레임을 그대로 공유 (읽기 전용 - 정리 단계는 파생 프레임을 만듦)
+                st.session_state.df_original = df_data
         
         # 이메일 시트 로드
         df_email_loaded = None
@@ -3451,6 +3141,85 @@ def render_step2():
                                        use_wildcard=use_wildcard, conflict_resolution=conflict_resolution)
 
 
+def get_perf_tracer() -> Tracer:
+    """세션별 단계 소요 시간 기록 (Step 5 성능 패널, 발송 작업마다 JSON Lines로 내보냄)"""
+    if st.session_state.get('perf_tracer') is None:
+        st.session_state.perf_tracer = Tracer()
+    return st.session_state.perf_tracer
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """서버 전역 세션 데이터 저장소 (SESSION_SPILL이 꺼져 있으면 None)"""
+    try:
+        enabled = bool(st.secrets.get('SESSION_SPILL', SESSION_SPILL_ENABLED))
+    except Exception:
+        enabled = SESSION_SPILL_ENABLED
+    if not enabled:
+        return None
+    return shared_session_store(SESSION_SPILL_DIR, SESSION_MEMORY_BUDGET_BYTES,
+                                SESSION_SPILL_IDLE_SECONDS, SESSION_SPILL_EXPIRE_SECONDS)
+
+
+def get_session_id() -> Optional[str]:
+    """현재 스크립트 실행의 Streamlit 세션 ID (스크립트 실행 밖이면 None)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def get_prep_pipeline() -> PrepPipeline:
+    """세션별 Step 2 → 3 단계 캐시 (다시 시작하면 세션 상태와 함께 초기화)"""
+    if st.session_state.get('prep_pipeline') is None:
+        st.session_state.prep_pipeline = PrepPipeline()
+    return st.session_state.prep_pipeline
+
+
+@traced('prep')
+def prepare_grouped_data(df, df_email, group_key_col: str, display_cols: list, amount_cols: list,
+                         percent_cols: list, use_wildcard: bool, conflict_resolution: str) -> dict:
+    """Step 2 → 3 데이터 준비 (이메일 병합 → 정리 → 그룹화) - 입력이 바뀐 단계만 다시 실행
+    
+    항상 엑셀 원본 시트(df_original)에서 시작합니다. st.session_state.df는 정리된 데이터로
+    바뀌므로 Step 2로 돌아왔다가 다시 진행해도 병합/정리가 두 번 적용되지 않습니다.
+    """
+    source = st.session_state.get('excel_file')
+    content_hash = source.content_hash if source is not None else None
+    df_raw = st.session_state.get('df_original')
+    if df_raw is None:
+        df_raw = df
+    
+    settings = PrepSettings(
+        group_key_col=group_key_col,
+        email_col=st.session_state.get('email_col'),
+        amount_cols=amount_cols,
+        percent_cols=percent_cols,
+        display_cols=display_cols,
+        join_col_data=st.session_state.get('join_col_data'),
+        join_col_email=st.session_state.get('join_col_email'),
+        conflict_resolution=conflict_resolution,
+        use_wildcard=use_wildcard,
+        wildcard_suffixes=st.session_state.get('wildcard_suffixes', [' 합계']),
+        calculate_totals=st.session_state.get('calculate_totals_auto', False),
+        tax_amount_col=(st.session_state.get('tax_amount_col')
+                        if st.session_state.get('show_tax_invoice_info', False) else None),
+    )
+    result = get_prep_pipeline().run(
+        df_raw, (content_hash, st.session_state.get('selected_data_sheet')) if content_hash else None,
+        settings,
+        df_email, (content_hash, st.session_state.get('selected_email_sheet')) if content_hash else None,
+    )
+    
+    st.session_state.df = result.df
+    st.session_state.grouped_data = result.grouped
+    st.session_state.email_conflicts = result.conflicts
+    add_log(f"데이터 준비: {', '.join(result.executed) or '변경 없음 (캐시)'} ({result.elapsed:.2f}s)")
+    if 'clean' in result.executed:
+        failures = parse_failure_summary(result.df)
+        if failures:
+            add_log(f"숫자 변환 실패 (빈 값으로 처리): {failures}", "warning")
+    return result.grouped
+
+
 def _save_step2_config_and_move(target_step: int, columns: list, df, df_email, 
                                  use_separate: bool,
                                  process_data: bool = False, group_key_col: str = None,
@@ -3463,33 +3232,15 @@ def _save_step2_config_and_move(target_step: int, columns: list, df, df_email,
     display_cols = columns.copy()
     amount_cols = st.session_state.get('amount_cols', [])
     percent_cols = st.session_state.get('percent_cols', [])
-    date_cols = st.session_state.get('date_cols', [])
-    id_cols = st.session_state.get('id_cols', [])
     
     add_log(f"Step 2 완료: {len(display_cols)}개 컬럼")
     
     # 데이터 처리 (다음 단계로 갈 때만)
     if process_data and target_step == 3:
         with st.spinner("데이터 처리 중..."):
-            df_work = df.copy()
-            
-            if use_separate and df_email is not None:
-                df_work = merge_email_data(df_work, df_email,
-                    st.session_state.join_col_data,
-                    st.session_state.join_col_email,
-                    st.session_state.email_col)
-            
-            df_cleaned = clean_dataframe(df_work, amount_cols, percent_cols, date_cols, id_cols)
-            st.session_state.df = df_cleaned
-            
-            grouped, conflicts = group_data_with_wildcard(
-                df_cleaned, group_key_col, st.session_state.email_col,
-                amount_cols, percent_cols, display_cols, conflict_resolution,
-                use_wildcard, st.session_state.wildcard_suffixes,
-                st.session_state.calculate_totals_auto)
-            
-            st.session_state.grouped_data = grouped
-            st.session_state.email_conflicts = conflicts
+            grouped = prepare_grouped_data(df, df_email if use_separate else None, group_key_col,
+                                           display_cols, amount_cols, percent_cols,
+                                           use_wildcard, conflict_resolution)
             add_log(f"데이터 그룹화 완료: {len(grouped)}개 그룹")
     
     # 스텝 이동
@@ -3546,52 +3297,20 @@ def render_step3():
         </div>
         """, unsafe_allow_html=True)
         
-        # 각 그룹의 합계 행에서 총 수수료액 추출
-        tax_invoice_data = []
-        total_tax_amount = 0
-        
-        for group_key, group_data in grouped.items():
-            # 합계 행 찾기 (CSO관리업체 합계 또는 마지막 행)
-            rows = group_data.get('rows', [])
-            tax_amount = 0
-            
-            for row in rows:
-                # 그룹명 + ' 합계' 패턴의 행에서 금액 추출
-                row_values = list(row.values())
-                is_total_row = any('합계' in str(v) for v in row_values)
-                
-                if is_total_row and tax_amount_col in row:
-                    try:
-                        amt_str = str(row[tax_amount_col]).replace(',', '').replace('원', '').strip()
-                        if amt_str and amt_str not in ['', '-', 'nan', 'None']:
-                            tax_amount = float(amt_str)
-                    except (ValueError, TypeError):
-                        pass
-            
-            # 합계 행이 없으면 totals에서 가져오기
-            if tax_amount == 0 and group_data.get('totals'):
-                totals = group_data.get('totals', {})
-                if tax_amount_col in totals:
-                    try:
-                        amt_str = str(totals[tax_amount_col]).replace(',', '').replace('원', '').strip()
-                        if amt_str and amt_str not in ['', '-', 'nan', 'None']:
-                            tax_amount = float(amt_str)
-                    except (ValueError, TypeError):
-                        pass
-            
-            if tax_amount > 0:
-                tax_invoice_data.append({
-                    'CSO관리업체명': group_key,
-                    '발행 금액': tax_amount
-                })
-                total_tax_amount += tax_amount
+        # 각 그룹의 합계 행 금액 - 그룹화 때 모든 그룹을 한 번에 계산한 값
+        amounts = tax_invoice_amounts(grouped, tax_amount_col)
+        issued = amounts > 0
+        tax_invoice_data = pd.DataFrame({
+            'CSO관리업체명': np.asarray(list(grouped), dtype=object)[issued],
+            '발행 금액': amounts[issued],
+        })
+        total_tax_amount = float(amounts[issued].sum())
         
-        if tax_invoice_data:
+        if len(tax_invoice_data):
             col_summary, col_total = st.columns([3, 1])
             with col_summary:
-                tax_df = pd.DataFrame(tax_invoice_data)
                 st.dataframe(
-                    tax_df,
+                    tax_invoice_data,
                     width='stretch',
                     hide_index=True,
                     column_config={
@@ -3714,7 +3433,7 @@ def render_step3():
                 
                 # 데이터 테이블 - 사용자가 설정한 컬럼 순서 유지
                 display_cols = st.session_state.get('display_cols', [])
-                rows_data = g['rows']
+                rows_data = list(g['rows'])  # 행 dict를 한 번만 만듦 (DataFrame은 시퀀스를 여러 번 인덱싱)
                 
                 if rows_data:
                     # DataFrame 생성 시 컬럼 순서 유지
@@ -3936,49 +3655,7 @@ Tel: 02-489-3611 | Fax: 02-487-3611
             tax_amount_col = st.session_state.get('tax_amount_col')
             
             if show_tax_invoice and tax_amount_col:
-                rows = sample_data.get('rows', [])
-                tax_amount = 0
-                
-                for row in rows:
-                    row_values = list(row.values())
-                    is_total_row = any('합계' in str(v) for v in row_values)
-                    
-                    if is_total_row and tax_amount_col in row:
-                        try:
-                            amt_str = str(row[tax_amount_col]).replace(',', '').replace('원', '').strip()
-                            if amt_str and amt_str not in ['', '-', 'nan', 'None']:
-                                tax_amount = float(amt_str)
-                        except (ValueError, TypeError):
-                            pass
-                
-                if tax_amount == 0:
-                    totals = sample_data.get('totals', {})
-                    if tax_amount_col in totals:
-                        try:
-                            amt_str = str(totals[tax_amount_col]).replace(',', '').replace('원', '').strip()
-                            if amt_str and amt_str not in ['', '-', 'nan', 'None']:
-                                tax_amount = float(amt_str)
-                        except (ValueError, TypeError):
-                            pass
-                
-                if tax_amount > 0:
-                    tax_invoice_html = f'''
-                    <div style="background: linear-gradient(135deg, #fff9c4 0%, #fff59d 100%); 
-                                padding: 16px 20px; border-radius: 10px; margin: 16px 0;
-                                border-left: 4px solid #ffc107; border: 1px solid #ffca28;">
-                        <strong style="color: #856404; font-size: 1.1em;">🧾 세금계산서 발행 정보</strong>
-                        <div style="margin-top: 12px; display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 8px;">
-                            <div>
-                                <span style="color: #665c00;">CSO관리업체명:</span>
-                                <strong style="color: #333; margin-left: 8px;">{sample_key}</strong>
-                            </div>
-                            <div style="white-space: nowrap;">
-                                <span style="color: #665c00;">발행 금액:</span>
-                                <strong style="color: #856404; font-size: 1.3em; margin-left: 8px;">₩{tax_amount:,.0f}</strong>
-                            </div>
-                        </div>
-                    </div>
-                    '''
+                tax_invoice_html = render_tax_invoice_html(sample_key, sample_data, tax_amount_col)
             
             # render_email_content로 실제 이메일 HTML 생성
             email_html = render_email_content(
@@ -3991,7 +3668,7 @@ Tel: 02-489-3611 | Fax: 02-487-3611
             )
             
             # 제목 미리보기
-            subject_preview = Template(subject).render(
+            subject_preview = get_compiled_template(subject).render(
                 company_name=sample_key,
                 period=datetime.now().strftime('%Y년 %m월')
             )
@@ -4021,64 +3698,456 @@ Tel: 02-489-3611 | Fax: 02-487-3611
             st.rerun()
 
 
+# ============================================================================
+# BACKGROUND SEND JOB - 발송 작업 시작/폴링/재연결
+# ============================================================================
+# 발송은 send_worker.BackgroundSendWorker가 소유합니다. 화면은 작업 ID로
+# 진행 상황만 조회하며, 작업 ID는 URL 쿼리 파라미터(send_job)에도 저장되어
+# 브라우저 새로고침 후에도 같은 작업에 다시 연결됩니다.
+
+SEND_JOB_QUERY_PARAM = "send_job"
+
+
+@traced('send.start')
+def current_templates() -> dict:
+    """세션에 저장된 메일 템플릿"""
+    return {
+        'subject': st.session_state.subject_template,
+        'header_title': st.session_state.header_title,
+        'greeting': st.session_state.greeting_template,
+        'info': st.session_state.info_template,
+        'additional': st.session_state.additional_template,
+        'footer': st.session_state.footer_template
+    }
+
+
+def build_render_settings(templates: dict, period: str, sender_email: str, sender_name: str) -> RenderSettings:
+    """렌더링 설정 - 발송 입력 스레드/프로세스 풀에서 쓰도록 세션 상태에서 미리 꺼내 둠"""
+    return RenderSettings(
+        templates=templates,
+        display_cols=st.session_state.display_cols,
+        amount_cols=st.session_state.amount_cols,
+        period=period,
+        tax_amount_col=(st.session_state.get('tax_amount_col')
+                        if st.session_state.get('show_tax_invoice_info', False) else None),
+        sender_email=sender_email,
+        sender_name=sender_name,
+    )
+
+
+def start_background_send(valid_groups: dict, templates: dict,
+                          email_delay_min, email_delay_max, batch_size, batch_delay):
+    """백그라운드 발송 작업 시작 - 메일은 워커에서 렌더링되는 청크 순서대로 바로 발송"""
+    config = st.session_state.smtp_config
+    total = len(valid_groups)
+    period = datetime.now().strftime('%Y년 %m월')
+    add_log(f"발송 시작 - 총 {total}건", "info")
+    
+    # 발송 간격은 토큰 버킷이 관리 - 대기는 발송 워커 스레드에서만 일어남
+    limiter = TokenBucketRateLimiter.from_delays(
+        email_delay_min, email_delay_max, batch_size, batch_delay,
+        burst=st.session_state.get('send_burst', DEFAULT_SEND_BURST)
+    )
+    dispatcher = SMTPDispatcher(
+        lambda: create_smtp_connection(config),
+        config['username'],
+        pool_size=st.session_state.get('smtp_pool_size', DEFAULT_SMTP_POOL_SIZE),
+        limiter=limiter
+    )
+    error = dispatcher.check_connection()
+    if error:
+        st.error(f"SMTP 연결 실패: {error}", icon="❌")
+        add_log(f"SMTP 연결 실패: {error}", "error")
+        return None
+    
+    # 이미 발송된 그룹 확인 (멱등성)
+    sent_groups = st.session_state.get('sent_groups', set())
+    
+    # 렌더링 대상 - 그룹이 많으면 프로세스 풀에서 병렬로
+    prefilled_rows, targets = [], []
+    for i, (gk, gd) in enumerate(valid_groups.items()):
+        if gk in sent_groups:
+            prefilled_rows.append({'그룹': gk, '이메일': gd['recipient_email'], '상태': '건너뜀', '사유': '이미 발송됨'})
+        else:
+            targets.append((i, gk, gd))
+    settings = build_render_settings(templates, period, config['username'], dispatcher.sender_name)
+    
+    # outbox에 대상 전부를 본문 없이 먼저 등록 (본문은 렌더링 청크마다 채움) - 기록할 수 없으면 발송하지 않음
+    run_id = new_send_job_id()
+    try:
+        init_database()
+        SEND_OUTBOX.create_run(run_id, [], period, config['username'],
+                               pending=[(i, gk, gd['recipient_email']) for i, gk, gd in targets],
+                               skipped_rows=prefilled_rows)
+        # 건너뜀 행은 발송 이력에 바로 기록
+        save_send_history(prefilled_rows, period)
+    except Exception as db_err:
+        st.error(f"발송 작업을 DB에 기록하지 못했습니다: {db_err}", icon="❌")
+        add_log(f"DB 저장 실패: {str(db_err)}", "error")
+        dispatcher.close()
+        return None
+    
+    # 발송 입력 스레드에서 실행 (st.* 사용 금지) - 청크의 본문을 outbox에 커밋한 뒤 발송 큐로
+    def rendered_jobs():
+        for chunk_jobs, chunk_failed in iter_rendered_chunks(targets, settings):
+            SEND_OUTBOX.fill_rendered(run_id, chunk_jobs, chunk_failed)
+            worker = get_send_worker(run_id)
+            worker.add_rows(chunk_failed)
+            try:
+                save_send_history(chunk_failed, period)
+            except Exception as db_err:
+                worker.meta['history_error'] = str(db_err)
+            yield from chunk_jobs
+    
+    return _launch_send_worker(run_id, rendered_jobs(), dispatcher, limiter, total, prefilled_rows, period,
+                               order={gk: i for i, gk, _ in targets})
+
+
+def _launch_send_worker(run_id: str, jobs: Iterable[SendJob], dispatcher: SMTPDispatcher,
+                        limiter: TokenBucketRateLimiter, total: int,
+                        prefilled_rows: list, period: str,
+                        order: Optional[Dict[str, int]] = None) -> BackgroundSendWorker:
+    """outbox에 연결된 백그라운드 워커 시작 - 결과는 메일 1건마다 DB에 기록"""
+    
+    # 아래 콜백은 워커 스레드에서 호출 - st.* 사용 금지
+    def before_send(job: SendJob):
+        SEND_OUTBOX.mark_sending(run_id, job.group_key)
+    
+    def on_result(worker: BackgroundSendWorker, result):
+        row = result_row(result)
+        with span('history.record'):
+            SEND_OUTBOX.mark_result(run_id, result.job.group_key, result.ok, row['사유'])
+            try:
+                save_send_history([{**row, 'subject': result.job.subject}], period)
+            except Exception as db_err:
+                worker.meta['history_error'] = str(db_err)
+    
+    tracer = get_perf_tracer()
+    
+    def on_complete(worker: BackgroundSendWorker):
+        SEND_OUTBOX.finish_run(run_id, worker.state)
+        if 'history_error' not in worker.meta:
+            worker.meta['history_saved'] = True
+        # 이 세션의 단계별 소요 시간 (로드 → 준비 → 렌더링 → 발송)을 작업별 파일로
+        try:
+            worker.meta['metrics_path'] = tracer.export_jsonl(
+                os.path.join(os.path.dirname(os.path.abspath(__file__)), PERF_METRICS_DIR, f"{run_id}.jsonl"),
+                run_id=run_id,
+                meta={'state': worker.state, 'total': worker.total, 'success': worker.success,
+                      'failed': worker.failed, 'skipped': worker.skipped, 'period': period}
+            )
+        except OSError as e:
+            worker.meta['metrics_error'] = str(e)
+    
+    dispatcher.before_send = before_send
+    worker = start_send_worker(BackgroundSendWorker(
+        jobs, dispatcher, limiter,
+        total=total, prefilled_rows=prefilled_rows,
+        on_result=on_result, on_complete=on_complete,
+        job_id=run_id,
+        meta={'period': period, 'sender': dispatcher.sender_email},
+        order=order
+    ))
+    
+    st.session_state.emergency_stop = False
+    st.session_state.send_job_id = worker.job_id
+    st.session_state.send_job_seen = 0
+    st.session_state.send_job_finalized = None
+    st.query_params[SEND_JOB_QUERY_PARAM] = worker.job_id
+    return worker
+
+
+def get_attached_send_worker() -> Optional[BackgroundSendWorker]:
+    """세션 또는 URL 쿼리 파라미터의 작업 ID로 발송 작업 조회 (새로고침 후 재연결)"""
+    job_id = st.session_state.get('send_job_id') or st.query_params.get(SEND_JOB_QUERY_PARAM)
+    worker = get_send_worker(job_id)
+    
+    if worker is None:
+        # 서버 재시작 등으로 작업이 사라짐
+        if job_id and st.query_params.get(SEND_JOB_QUERY_PARAM) == job_id:
+            del st.query_params[SEND_JOB_QUERY_PARAM]
+        st.session_state.send_job_id = None
+        return None
+    
+    if st.session_state.get('send_job_id') != worker.job_id:
+        st.session_state.send_job_id = worker.job_id
+        st.session_state.send_job_seen = 0
+        st.session_state.send_job_finalized = None
+        add_log(f"발송 작업에 다시 연결됨 ({worker.job_id})", "info")
+    return worker
+
+
+def _sync_send_worker(worker: BackgroundSendWorker):
+    """워커의 새 결과를 세션 상태(결과 리포트, 멱등성 목록, 운영 로그)에 반영"""
+    rows, seen = worker.results_since(st.session_state.get('send_job_seen', 0))
+    if not rows:
+        return
+    
+    sent_groups = st.session_state.get('sent_groups', set())
+    for row in rows:
+        if row['상태'] == '성공':
+            sent_groups.add(row['그룹'])  # 발송 완료 표시
+            add_log(f"✓ {row['그룹']} → {row['이메일']}", "success")
+        elif row['상태'] == '실패':
+            add_log(f"✗ {row['그룹']}: {row['사유']}", "error")
+    
+    st.session_state.sent_groups = sent_groups
+    st.session_state.send_results = worker.results()
+    st.session_state.send_job_seen = seen
+
+
+def _finalize_send_worker(worker: BackgroundSendWorker, progress: dict):
+    """작업 종료 후 1회 - 완료 로그 기록"""
+    if st.session_state.get('send_job_finalized') == worker.job_id:
+        return
+    st.session_state.send_job_finalized = worker.job_id
+    
+    if progress['state'] == 'stopped':
+        add_log(f"긴급 정지 - {progress['success'] + progress['failed']}건 발송 후 중단", "warning")
+    elif progress['state'] == 'failed':
+        add_log(f"발송 작업 오류: {progress['error']}", "error")
+    else:
+        add_log(f"발송 완료 - 성공: {progress['success']}, 실패: {progress['failed']}, "
+                f"건너뜀: {progress['skipped']}", "info")
+        if progress['meta'].get('history_saved'):
+            add_log("발송 이력 DB 저장 완료", "info")
+        elif progress['meta'].get('history_error'):
+            add_log(f"DB 저장 실패: {progress['meta']['history_error']}", "warning")
+    
+    summary = summarize_perf(get_perf_tracer())
+    if summary:
+        add_log(f"성능: {summary}", "info")
+    if progress['meta'].get('metrics_path'):
+        add_log(f"성능 기록 저장: {os.path.basename(progress['meta']['metrics_path'])}", "info")
+
+
+# 운영 로그 성능 요약에 표시할 구간 (구간 이름, 표시명)
+PERF_LOG_STAGES = (
+    ('load.parse', '시트 파싱'), ('prep', '데이터 준비'), ('render.chunk', '렌더링'),
+    ('mime.build', 'MIME 생성'), ('smtp.connect', 'SMTP 연결'), ('smtp.send', '메일 전송'),
+)
+
+
+def summarize_perf(tracer: Tracer) -> str:
+    """운영 로그용 한 줄 요약 (예: "렌더링 1.20s · 메일 전송 35.1s (300회)")"""
+    totals = tracer.totals_by_name()
+    parts = []
+    for name, label in PERF_LOG_STAGES:
+        if name in totals:
+            n, total_ms = totals[name]
+            parts.append(f"{label} {total_ms / 1000:.2f}s" + (f" ({n:,}회)" if n > 1 else ""))
+    return " · ".join(parts)
+
+
+def render_perf_panel():
+    """Step 5 성능 패널 - 이 세션의 단계별 소요 시간 (경로별 집계, 카운터, JSON Lines 내보내기)"""
+    tracer = get_perf_tracer()
+    stats = tracer.stats()
+    if not stats:
+        return
+    
+    with st.expander(f"⏱️ 성능 (단계별 소요 시간, {len(stats)}개 구간)", expanded=False):
+        st.dataframe(
+            pd.DataFrame([{
+                '단계': '\u00a0\u00a0\u00a0' * row['depth'] + row['name'],
+                '횟수': row['count'],
+                '합계(s)': round(row['total_ms'] / 1000, 3),
+                '평균(ms)': round(row['mean_ms'], 1),
+                'p50(ms)': round(row['p50_ms'], 1),
+                'p95(ms)': round(row['p95_ms'], 1),
+                '최대(ms)': round(row['max_ms'], 1),
+            } for row in stats]),
+            width='stretch', hide_index=True
+        )
+        st.caption("p50/p95는 고정 구간 히스토그램 기준 근사값입니다. "
+                   "프로세스 풀 렌더링은 청크 단위(render.chunk)로만 측정됩니다.")
+        
+        counters = tracer.counters()
+        if counters:
+            st.caption(" · ".join(f"{name} {value:,}" for name, value in counters.items()))
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button(
+                "📥 성능 기록 (JSON Lines)",
+                "\n".join(tracer.iter_jsonl(run_id=st.session_state.get('send_job_id'))) + "\n",
+                f"성능기록_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl",
+                "application/x-ndjson",
+                width='stretch'
+            )
+        with col2:
+            if st.button("🔄 성능 기록 초기화", width='stretch', key="perf_reset"):
+                tracer.reset()
+                st.rerun()
+
+
+def resume_outbox_run(run_id: str) -> Optional[BackgroundSendWorker]:
+    """중단된 outbox 작업을 'queued' 행부터 이어서 발송 - 렌더링 전에 중단된 행은 지금 불러온 데이터로 렌더링"""
+    config = st.session_state.smtp_config
+    
+    limiter = TokenBucketRateLimiter.from_delays(
+        st.session_state.get('email_delay_min', DEFAULT_EMAIL_DELAY_MIN),
+        st.session_state.get('email_delay_max', DEFAULT_EMAIL_DELAY_MAX),
+        st.session_state.get('batch_size', DEFAULT_BATCH_SIZE),
+        st.session_state.get('batch_delay', DEFAULT_BATCH_DELAY),
+        burst=st.session_state.get('send_burst', DEFAULT_SEND_BURST)
+    )
+    dispatcher = SMTPDispatcher(
+        lambda: create_smtp_connection(config),
+        config['username'],
+        pool_size=st.session_state.get('smtp_pool_size', DEFAULT_SMTP_POOL_SIZE),
+        limiter=limiter
+    )
+    error = dispatcher.check_connection()
+    if error:
+        st.error(f"SMTP 연결 실패: {error}", icon="❌")
+        add_log(f"SMTP 연결 실패: {error}", "error")
+        return None
+    
+    period = SEND_OUTBOX.get_run(run_id).get('period') or datetime.now().strftime('%Y년 %m월')
+    settings = build_render_settings(current_templates(), period, config['username'], dispatcher.sender_name)
+    
+    def render_missing(items):
+        grouped = st.session_state.get('grouped_data') or {}
+        return render_all([(i, gk, grouped[gk]) for i, gk in items if gk in grouped], settings)
+    
+    run, jobs, done_rows = SEND_OUTBOX.recover_run(run_id, render=render_missing)
+    if run.get('unrendered'):
+        st.warning(f"렌더링 전에 중단된 {run['unrendered']}건은 지금 불러온 데이터에 없어 남겨 두었습니다. "
+                   f"같은 엑셀 파일을 불러온 뒤 다시 이어서 발송하세요.", icon="⚠️")
+        add_log(f"렌더링하지 못한 {run['unrendered']}건 대기 유지 (작업 {run_id})", "warning")
+    
+    # 이번에 처리할 행만 - 렌더링하지 못한 행은 outbox에 'queued'로 남음
+    total = len(jobs) + len(done_rows)
+    add_log(f"중단된 발송 이어서 시작 - 남은 {len(jobs)}건 (작업 {run_id})", "info")
+    return _launch_send_worker(run_id, jobs, dispatcher, limiter, total, done_rows, period)
+
+
+def render_outbox_resume_panel():
+    """이전 실행에서 끝나지 않은 outbox 작업 안내 (프로세스 재시작 후 이어서 발송)"""
+    try:
+        runs = [r for r in SEND_OUTBOX.unfinished_runs() if get_send_worker(r['run_id']) is None]
+    except Exception:
+        return
+    
+    for run in runs:
+        counts = run['counts']
+        with st.container(border=True):
+            st.warning(
+                f"⚠️ **끝나지 않은 발송 작업** ({run['period']}, {run['created_at']} 시작) - "
+                f"성공 {counts['sent']}건 · 실패 {counts['failed']}건 · **남은 {counts['queued']}건**"
+                + (f" · 발송 여부 불확실 {counts['sending']}건 (재발송 안 함)" if counts['sending'] else "")
+            )
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("▶️ 이어서 발송", type="primary", width='stretch',
+                             key=f"outbox_resume_{run['run_id']}",
+                             disabled=not st.session_state.smtp_config,
+                             help="SMTP 연결 후 남은 메일만 발송합니다"):
+                    if resume_outbox_run(run['run_id']):
+                        st.rerun()
+            with col2:
+                if st.button("🗑️ 작업 종료", width='stretch', key=f"outbox_close_{run['run_id']}",
+                             help="남은 메일을 보내지 않고 작업을 닫습니다"):
+                    SEND_OUTBOX.close_run(run['run_id'])
+                    add_log(f"중단된 발송 작업 종료 ({run['run_id']})", "warning")
+                    st.rerun()
+
+
+def render_send_job_panel():
+    """발송 작업 진행 패널 - 작업이 진행 중이면 1초마다 이 영역만 다시 그림"""
+    worker = get_attached_send_worker()
+    if worker is None:
+        return
+    
+    job_id = worker.job_id
+    
+    def panel():
+        worker = get_send_worker(job_id)
+        if worker is None:
+            return
+        
+        _sync_send_worker(worker)
+        progress = worker.progress()
+        state = progress['state']
+        total = max(progress['total'], 1)
+        
+        with st.container(border=True):
+            col_progress, col_pause, col_stop = st.columns([4, 1, 1])
+            with col_progress:
+                st.progress(min(progress['done'] / total, 1.0))
+            
+            if worker.is_active:
+                with col_pause:
+                    if state == 'paused':
+                        if st.button("▶️ 재개", width='stretch', key=f"send_resume_{job_id}"):
+                            worker.resume()
+                            add_log("발송 재개", "info")
+                            st.rerun(scope="fragment")
+                    elif st.button("⏸️ 일시정지", width='stretch', key=f"send_pause_{job_id}",
+                                   disabled=state == 'stopping'):
+                        worker.pause()
+                        add_log("발송 일시정지", "warning")
+                        st.rerun(scope="fragment")
+                with col_stop:
+                    if st.button("🛑 긴급 정지", type="secondary", width='stretch', key=f"send_stop_{job_id}",
+                                 disabled=state == 'stopping'):
+                        st.session_state.emergency_stop = True
+                        worker.stop()
+                        st.rerun(scope="fragment")
+            
+            status_col1, status_col2 = st.columns([3, 1])
+            with status_col1:
+                if state == 'running':
+                    current = progress['current_group'] or '-'
+                    st.markdown(f"**발송 중:** {current}")
+                elif state == 'paused':
+                    st.markdown("**⏸️ 일시정지됨** - 진행 중이던 메일까지만 발송했습니다")
+                elif state == 'stopping':
+                    st.markdown("**🛑 정지 중...**")
+                elif state == 'stopped':
+                    st.markdown("**🛑 긴급 정지됨!**")
+                elif state == 'failed':
+                    st.markdown(f"**❌ 발송 작업 오류:** {progress['error']}")
+                else:
+                    st.markdown("**완료!**")
+            with status_col2:
+                st.markdown(f"`{progress['done']}/{progress['total']}`")
+            
+            if state == 'running' and progress['next_send_eta'] is not None:
+                cooldown = " (배치 휴식 중)" if progress['in_cooldown'] else ""
+                st.caption(
+                    f"⏱️ 다음 발송까지 {progress['next_send_eta']:.0f}초{cooldown} · "
+                    f"현재 속도 {progress['current_per_min'] or 0:.1f}건/분"
+                )
+            
+            if worker.is_finished:
+                _finalize_send_worker(worker, progress)
+                if state == 'completed':
+                    if progress['failed'] == 0:
+                        st.success(f"전체 발송 완료! ({progress['success']}건)", icon="🎉")
+                    else:
+                        st.warning(f"완료: 성공 {progress['success']}건, 실패 {progress['failed']}건", icon="⚠")
+                
+                # 진행 중 화면(1초 갱신)에서 결과 리포트 화면으로 전환
+                if st.session_state.get('send_job_rendered_final') != job_id:
+                    st.session_state.send_job_rendered_final = job_id
+                    st.rerun()
+    
+    # 진행 중일 때만 주기적으로 갱신 (종료된 작업은 정적 표시)
+    run_every = 1.0 if not worker.is_finished else None
+    st.fragment(panel, run_every=run_every)()
+
+
 def render_step5():
     """Step 5: 발송 - UX 최적화 (안심 장치, 즉각적 피드백)"""
     
     # 세금계산서 발행 정보 HTML 생성 헬퍼 함수
     def get_tax_invoice_html(group_key: str, group_data: dict) -> str:
         """그룹 데이터에서 세금계산서 발행 정보 HTML 생성"""
-        show_tax_invoice = st.session_state.get('show_tax_invoice_info', False)
-        tax_amount_col = st.session_state.get('tax_amount_col')
-        
-        if not show_tax_invoice or not tax_amount_col:
+        if not st.session_state.get('show_tax_invoice_info', False):
             return ""
-        
-        # 합계 행에서 세금계산서 금액 추출
-        rows = group_data.get('rows', [])
-        tax_amount = 0
-        
-        for row in rows:
-            row_values = list(row.values())
-            is_total_row = any('합계' in str(v) for v in row_values)
-            
-            if is_total_row and tax_amount_col in row:
-                try:
-                    amt_str = str(row[tax_amount_col]).replace(',', '').replace('원', '').strip()
-                    if amt_str and amt_str not in ['', '-', 'nan', 'None']:
-                        tax_amount = float(amt_str)
-                except (ValueError, TypeError):
-                    pass
-        
-        # 합계 행에서 못 찾으면 totals에서
-        if tax_amount == 0:
-            totals = group_data.get('totals', {})
-            if tax_amount_col in totals:
-                try:
-                    amt_str = str(totals[tax_amount_col]).replace(',', '').replace('원', '').strip()
-                    if amt_str and amt_str not in ['', '-', 'nan', 'None']:
-                        tax_amount = float(amt_str)
-                except (ValueError, TypeError):
-                    pass
-        
-        if tax_amount > 0:
-            return f'''
-            <div style="background: linear-gradient(135deg, #fff9c4 0%, #fff59d 100%); 
-                        padding: 16px 20px; border-radius: 10px; margin: 16px 0;
-                        border-left: 4px solid #ffc107; border: 1px solid #ffca28;">
-                <strong style="color: #856404; font-size: 1.1em;">🧾 세금계산서 발행 정보</strong>
-                <div style="margin-top: 12px; display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 8px;">
-                    <div>
-                        <span style="color: #665c00;">CSO관리업체명:</span>
-                        <strong style="color: #333; margin-left: 8px;">{group_key}</strong>
-                    </div>
-                    <div style="white-space: nowrap;">
-                        <span style="color: #665c00;">발행 금액:</span>
-                        <strong style="color: #856404; font-size: 1.3em; margin-left: 8px; white-space: nowrap;">₩{tax_amount:,.0f}</strong>
-                    </div>
-                </div>
-            </div>
-            '''
-        return ""
+        return render_tax_invoice_html(group_key, group_data, st.session_state.get('tax_amount_col'))
     
     # 페이지 헤더
     render_page_header(5, "메일 발송", "최종 확인 후 이메일을 발송하세요")
@@ -4154,6 +4223,26 @@ def render_step5():
             )
             st.session_state.email_delay_max = email_delay_max
         
+        col1, col2 = st.columns(2)
+        with col1:
+            send_burst = st.number_input(
+                "🪣 연속 발송 허용",
+                value=st.session_state.get('send_burst', DEFAULT_SEND_BURST),
+                min_value=1,
+                max_value=10,
+                help="대기 없이 연달아 보낼 수 있는 최대 건수 (토큰 버킷 크기). 1이면 매 메일마다 딜레이 적용"
+            )
+            st.session_state.send_burst = send_burst
+        with col2:
+            smtp_pool_size = st.number_input(
+                "🔌 동시 연결 수",
+                value=st.session_state.get('smtp_pool_size', DEFAULT_SMTP_POOL_SIZE),
+                min_value=1,
+                max_value=MAX_SMTP_POOL_SIZE,
+                help="동시에 사용할 SMTP 연결 수. 발송 간격/배치 규칙은 연결 수와 관계없이 전체 기준으로 유지됩니다"
+            )
+            st.session_state.smtp_pool_size = smtp_pool_size
+        
         # 설정 요약
         st.info(f"""
         📧 **발송 패턴 예시** (배치 크기 {batch_size}, 딜레이 {email_delay_min}~{email_delay_max}초)
@@ -4191,12 +4280,16 @@ def render_step5():
             help="실패한 건만 다시 발송"
         )
     
+    # 진행 중인 발송 작업이 있으면 새 발송 시작 불가
+    active_worker = get_attached_send_worker()
+    send_job_active = active_worker is not None and active_worker.is_active
+    
     with col4:
         send_btn = st.button(
             "🚀 전체 발송",
             type="primary",
             width='stretch',
-            disabled=not st.session_state.smtp_config or len(valid_groups)==0,
+            disabled=not st.session_state.smtp_config or len(valid_groups)==0 or send_job_active,
             help=f"총 {len(valid_groups)}개 업체에 이메일 발송"
         )
     
@@ -4225,14 +4318,7 @@ def render_step5():
             st.session_state.confirm_send = False
             send_btn = True  # 확인됨, 발송 진행
     
-    templates = {
-        'subject': st.session_state.subject_template,
-        'header_title': st.session_state.header_title,
-        'greeting': st.session_state.greeting_template,
-        'info': st.session_state.info_template,
-        'additional': st.session_state.additional_template,
-        'footer': st.session_state.footer_template
-    }
+    templates = current_templates()
     
     # 테스트 발송
     if test_btn and st.session_state.smtp_config and valid_groups:
@@ -4247,7 +4333,7 @@ def render_step5():
                 html = render_email_content(sample_key, sample_data,
                     st.session_state.display_cols, st.session_state.amount_cols, templates,
                     extra_html_before_table=tax_html)
-                subject = Template(templates['subject']).render(company_name=sample_key,
+                subject = get_compiled_template(templates['subject']).render(company_name=sample_key,
                     period=datetime.now().strftime('%Y년 %m월'))
                 
                 success, err = send_email(server, config['username'], config['username'],
@@ -4263,124 +4349,23 @@ def render_step5():
     
     # Sanity Check (발송 전 검증)
     if send_btn and st.session_state.smtp_config and valid_groups:
-        warnings = sanity_check(st.session_state.grouped_data)
-        if warnings:
-            with st.expander(f"⚠️ 데이터 검증 경고 ({len(warnings)}건)", expanded=True):
-                for w in warnings[:10]:  # 최대 10개만 표시
-                    st.warning(f"**{w['group']}**: {w['message']}")
-                if len(warnings) > 10:
-                    st.caption(f"... 외 {len(warnings) - 10}건")
-    
-    # 전체 발송
-    if send_btn and st.session_state.smtp_config and valid_groups:
-        config = st.session_state.smtp_config
-        add_log(f"발송 시작 - 총 {len(valid_groups)}건", "info")
-        
-        # 긴급 정지 버튼 + 진행률 표시 영역
-        progress_container = st.container()
-        with progress_container:
-            col_progress, col_stop = st.columns([4, 1])
-            with col_progress:
-                progress_bar = st.progress(0)
-            with col_stop:
-                if st.button("🛑 긴급 정지", type="secondary", width='stretch'):
-                    st.session_state.emergency_stop = True
-            
-            status_col1, status_col2 = st.columns([3, 1])
-            with status_col1:
-                status_text = st.empty()
-            with status_col2:
-                count_text = st.empty()
-        
-        results = []
-        success_cnt = fail_cnt = skipped_cnt = 0
-        total = len(valid_groups)
-        
-        # 이미 발송된 그룹 확인 (멱등성)
-        sent_groups = st.session_state.get('sent_groups', set())
-        
-        server, error = create_smtp_connection(config)
-        if not server:
-            st.error(f"SMTP 연결 실패: {error}", icon="❌")
-            add_log(f"SMTP 연결 실패: {error}", "error")
-        else:
-            st.session_state.emergency_stop = False
-            
-            for i, (gk, gd) in enumerate(valid_groups.items()):
-                # 긴급 정지 확인
-                if st.session_state.get('emergency_stop', False):
-                    status_text.markdown("**🛑 긴급 정지됨!**")
-                    add_log(f"긴급 정지 - {i}건 발송 후 중단", "warning")
-                    break
-                
-                # 멱등성 체크 - 이미 발송된 그룹은 건너뜀
-                if gk in sent_groups:
-                    skipped_cnt += 1
-                    results.append({'그룹': gk, '이메일': gd['recipient_email'], '상태': '건너뜀', '사유': '이미 발송됨'})
-                    continue
-                
-                progress_bar.progress((i+1)/total)
-                status_text.markdown(f"**발송 중:** {gk}")
-                count_text.markdown(f"`{i+1}/{total}`")
-                
-                try:
-                    # 세금계산서 정보 HTML 생성
-                    tax_html = get_tax_invoice_html(gk, gd)
-                    html = render_email_content(gk, gd, st.session_state.display_cols,
-                        st.session_state.amount_cols, templates,
-                        extra_html_before_table=tax_html)
-                    subject = Template(templates['subject']).render(company_name=gk,
-                        period=datetime.now().strftime('%Y년 %m월'))
-                    
-                    ok, err = send_email(server, config['username'], gd['recipient_email'], subject, html)
-                    
-                    if ok:
-                        success_cnt += 1
-                        results.append({'그룹': gk, '이메일': gd['recipient_email'], '상태': '성공', '사유': ''})
-                        sent_groups.add(gk)  # 발송 완료 표시
-                        add_log(f"✓ {gk} → {gd['recipient_email']}", "success")
-                    else:
-                        fail_cnt += 1
-                        # 상세 오류 메시지 파싱
-                        error_detail = err
-                        if 'SMTPAuthenticationError' in str(err):
-                            error_detail = "인증 오류 (비밀번호 확인)"
-                        elif 'SMTPRecipientsRefused' in str(err):
-                            error_detail = "수신자 거부 (이메일 주소 확인)"
-                        results.append({'그룹': gk, '이메일': gd['recipient_email'], '상태': '실패', '사유': error_detail})
-                        add_log(f"✗ {gk}: {error_detail}", "error")
-                except Exception as e:
-                    fail_cnt += 1
-                    results.append({'그룹': gk, '이메일': gd['recipient_email'], '상태': '실패', '사유': str(e)})
-                    add_log(f"✗ {gk}: {str(e)}", "error")
-                
-                # 랜덤 딜레이 적용
-                import random
-                random_delay = random.uniform(email_delay_min, email_delay_max)
-                time.sleep(random_delay)
-                if (i+1) % batch_size == 0 and i < total-1:
-                    time.sleep(batch_delay)
-            
-            server.quit()
-            st.session_state.send_results = results
-            st.session_state.sent_groups = sent_groups
-            
-            if not st.session_state.get('emergency_stop', False):
-                status_text.markdown("**완료!**")
-                add_log(f"발송 완료 - 성공: {success_cnt}, 실패: {fail_cnt}, 건너뜀: {skipped_cnt}", "info")
-                
-                # 발송 이력 DB 저장 (데이터 영속성)
-                try:
-                    init_database()
-                    save_send_history(results, datetime.now().strftime('%Y년 %m월'))
-                    add_log("발송 이력 DB 저장 완료", "info")
-                except Exception as db_err:
-                    add_log(f"DB 저장 실패: {str(db_err)}", "warning")
-            
-            if fail_cnt == 0:
-                st.success(f"전체 발송 완료! ({success_cnt}건)", icon="🎉")
-            else:
-                st.warning(f"완료: 성공 {success_cnt}건, 실패 {fail_cnt}건", icon="⚠")
+        findings = sanity_check(st.session_state.grouped_data)
+        if len(findings):
+            with st.expander(f"⚠️ 데이터 검증 경고 ({len(findings)}건)", expanded=True):
+                for group, message in findings[['group', 'message']].head(10).itertuples(index=False):  # 최대 10개만 표시
+                    st.warning(f"**{group}**: {message}")
+                if len(findings) > 10:
+                    st.caption(f"... 외 {len(findings) - 10}건")
+    
+    # 전체 발송 - 백그라운드 워커에서 실행 (리런/탭 닫기와 무관)
+    if send_btn and st.session_state.smtp_config and valid_groups and not send_job_active:
+        start_background_send(
+            valid_groups, templates,
+            email_delay_min, email_delay_max, batch_size, batch_delay
+        )
+    
+    # 진행 중인(또는 방금 끝난) 발송 작업 표시
+    render_send_job_panel()
     
     # 결과 리포트 - "심리적 마감" UX
     if st.session_state.send_results:
@@ -4483,132 +4468,66 @@ def render_step5():
                         f"<span style='color: #888;'>[{log['time']}]</span> {log['icon']} {log['message']}</div>",
                         unsafe_allow_html=True
                     )
+    
+    render_perf_panel()
 
 
 # ============================================================================
 # DATA PERSISTENCE - 이력 저장 및 조회 (레퍼런스 4)
 # ============================================================================
 
-import sqlite3
 import json
 import os
 
 DB_PATH = os.path.join(os.path.dirname(__file__), 'mail_history.db')
 
+# 이력 DB 연결 관리 (스레드별 연결 재사용, WAL, 스키마 1회 초기화)
+HISTORY_DB = HistoryDB(DB_PATH)
+
+# 발송 outbox (mail_history.db의 send_runs / send_outbox 테이블)
+SEND_OUTBOX = SendOutbox(HISTORY_DB)
+
 
 def init_database():
-    """SQLite 데이터베이스 초기화"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS send_history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            period TEXT,
-            company_name TEXT,
-            company_code TEXT,
-            recipient_email TEXT,
-            subject TEXT,
-            status TEXT,
-            reason TEXT,
-            row_count INTEGER,
-            total_amount TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    
-    # 인덱스 생성 (빠른 조회용)
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_period ON send_history(period)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_company ON send_history(company_name)')
-    cursor.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON send_history(timestamp)')
-    
-    conn.commit()
-    conn.close()
+    """SQLite 데이터베이스 초기화 (프로세스당 한 번만 실제 실행)"""
+    HISTORY_DB.ensure_schema()
 
 
 def save_send_history(results: List[dict], period: str = None):
-    """발송 결과를 DB에 저장"""
-    if not period:
-        period = datetime.now().strftime('%Y년 %m월')
-    
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    for r in results:
-        cursor.execute('''
-            INSERT INTO send_history (period, company_name, recipient_email, subject, status, reason, row_count)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            period,
-            r.get('그룹', ''),
-            r.get('이메일', ''),
-            r.get('subject', ''),
-            r.get('상태', ''),
-            r.get('사유', ''),
-            r.get('row_count', 0)
-        ))
-    
-    conn.commit()
-    conn.close()
+    """발송 결과를 DB에 저장 (executemany 일괄 저장)"""
+    HISTORY_DB.insert_history(results, period)
 
 
 def get_send_history(period: str = None, company: str = None, limit: int = 100, offset: int = 0) -> pd.DataFrame:
     """발송 이력 조회 (페이지네이션 지원)"""
-    conn = sqlite3.connect(DB_PATH)
-    
-    query = "SELECT * FROM send_history WHERE 1=1"
-    params = []
-    
-    if period:
-        query += " AND period = ?"
-        params.append(period)
-    
-    if company:
-        query += " AND company_name LIKE ?"
-        params.append(f"%{company}%")
-    
-    query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-    params.extend([limit, offset])
-    
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-    return df
+    return HISTORY_DB.read_history(period, company, limit, offset)
+
+
+def get_send_history_page(period: str = None, company: str = None, limit: int = HISTORY_PAGE_SIZE,
+                          after: tuple = None) -> Tuple[pd.DataFrame, Optional[tuple]]:
+    """발송 이력 한 페이지 (최신순, (timestamp, id) 커서 기반) - (페이지, 다음 커서)"""
+    return HISTORY_DB.read_history_page(period, company, limit=limit, after=after)
+
+
+def export_send_history(dest, fmt: str = 'csv', period: str = None, keyword: str = None) -> int:
+    """조건에 맞는 전체 이력을 CSV/XLSX로 스트리밍 저장 - 저장한 행 수"""
+    return HISTORY_DB.export_history(dest, fmt, period=period, keyword=keyword)
+
+
+def search_send_history(keyword: str, period: str = None, limit: int = HISTORY_PAGE_SIZE,
+                        offset: int = 0) -> pd.DataFrame:
+    """업체명/이메일 검색 (전문 검색 인덱스, 관련도순)"""
+    return HISTORY_DB.search_history(keyword, period, limit, offset)
+
+
+def count_send_history_search(keyword: str, period: str = None) -> int:
+    """검색 결과 전체 건수"""
+    return HISTORY_DB.count_search(keyword, period)
 
 
 def get_statistics(period: str = None) -> dict:
     """발송 통계 조회"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    where_clause = f"WHERE period = '{period}'" if period else ""
-    
-    # 총 발송 수
-    cursor.execute(f"SELECT COUNT(*) FROM send_history {where_clause}")
-    total = cursor.fetchone()[0]
-    
-    # 성공/실패 수
-    cursor.execute(f"SELECT status, COUNT(*) FROM send_history {where_clause} GROUP BY status")
-    status_counts = dict(cursor.fetchall())
-    
-    # 업체별 발송 수 (Top 10)
-    cursor.execute(f'''
-        SELECT company_name, COUNT(*) as cnt 
-        FROM send_history {where_clause} 
-        GROUP BY company_name 
-        ORDER BY cnt DESC LIMIT 10
-    ''')
-    top_companies = cursor.fetchall()
-    
-    conn.close()
-    
-    return {
-        'total': total,
-        'success': status_counts.get('성공', 0),
-        'failed': status_counts.get('실패', 0),
-        'skipped': status_counts.get('건너뜀', 0),
-        'top_companies': top_companies
-    }
+    return HISTORY_DB.statistics(period)
 
 
 def render_history_tab():
@@ -4625,7 +4544,7 @@ def render_history_tab():
         period_filter = st.text_input("정산월 검색", placeholder="예: 2025년 01월")
     
     with col2:
-        company_filter = st.text_input("업체명 검색", placeholder="업체명 일부 입력")
+        company_filter = st.text_input("업체명/이메일 검색", placeholder="업체명 또는 이메일 일부 입력")
     
     with col3:
         st.markdown("<br>", unsafe_allow_html=True)
@@ -4658,20 +4577,51 @@ def render_history_tab():
     st.divider()
     
     # 이력 테이블
-    df_history = get_send_history(
-        period=period_filter if period_filter else None,
-        company=company_filter if company_filter else None,
-        limit=50
-    )
+    keyword = company_filter.strip()
+    period_arg = period_filter if period_filter else None
+    
+    # 검색 조건이 바뀌면 1페이지부터
+    search_key = (period_filter, keyword)
+    if st.session_state.history_search_key != search_key:
+        st.session_state.history_search_key = search_key
+        st.session_state.history_page = 0
+        st.session_state.history_cursors = [None]
+    
+    if keyword:
+        total_matches = count_send_history_search(keyword, period_arg)
+        page_count = max(1, -(-total_matches // HISTORY_PAGE_SIZE))
+        page = min(st.session_state.history_page, page_count - 1)
+        df_history = search_send_history(
+            keyword,
+            period=period_arg,
+            limit=HISTORY_PAGE_SIZE,
+            offset=page * HISTORY_PAGE_SIZE
+        )
+    else:
+        # 최신순 커서 페이지네이션 - 페이지별 시작 커서를 세션에 보관
+        cursors = st.session_state.history_cursors
+        total_matches = stats['total']
+        page_count = max(1, -(-total_matches // HISTORY_PAGE_SIZE))
+        page = min(st.session_state.history_page, len(cursors) - 1)
+        df_history, next_cursor = get_send_history_page(
+            period=period_arg,
+            limit=HISTORY_PAGE_SIZE,
+            after=cursors[page]
+        )
+        if next_cursor is not None and len(cursors) == page + 1:
+            cursors.append(next_cursor)
+        if next_cursor is None:
+            page_count = page + 1
     
     if not df_history.empty:
-        st.markdown(f"**검색 결과: {len(df_history)}건**")
+        order_label = "관련도순" if keyword else "최신순"
+        st.markdown(f"**검색 결과: {total_matches}건** ({order_label}, {page + 1}/{page_count} 페이지)")
         
         # 상태별 색상
         def highlight_history(row):
-            if row['status'] == '성공':
+            if row['상태'] == '성공':
                 return ['background-color: #e8f5e9'] * len(row)
-            elif row['status'] == '실패':
+            elif row['상태'] == '실패':
                 return ['background-color: #ffebee'] * len(row)
             return [''] * len(row)
         
@@ -4685,10 +4635,99 @@ def render_history_tab():
             width='stretch',
             hide_index=True
         )
+        
+        if page_count > 1:
+            col_prev, col_page, col_next = st.columns([1, 2, 1])
+            with col_prev:
+                if st.button("◀ 이전", disabled=page == 0, width='stretch', key="history_prev"):
+                    st.session_state.history_page = page - 1
+                    st.rerun()
+            with col_page:
+                st.caption(f"{page * HISTORY_PAGE_SIZE + 1}–{page * HISTORY_PAGE_SIZE + len(df_history)}"
+                           f" / {total_matches}건")
+            with col_next:
+                if st.button("다음 ▶", disabled=page >= page_count - 1, width='stretch', key="history_next"):
+                    st.session_state.history_page = page + 1
+                    st.rerun()
+        
+        render_history_export(period_arg, keyword)
     else:
         st.info("발송 이력이 없습니다.", icon="ℹ️")
 
 
+def prune_history_exports(directory: str) -> None:
+    """내보내기 폴더 정리 - 만료된 파일과 최대 개수를 넘는 오래된 파일 삭제 (세션이 끝나도 남지 않도록)"""
+    try:
+        entries = [(e.stat().st_mtime, e.path) for e in os.scandir(directory) if e.is_file()]
+    except FileNotFoundError:
+        return
+    entries.sort(reverse=True)
+    expire_before = time.time() - HISTORY_EXPORT_EXPIRE_SECONDS
+    for i, (mtime, path) in enumerate(entries):
+        if i >= HISTORY_EXPORT_MAX_FILES or mtime < expire_before:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def remove_history_export(export: Optional[dict]) -> None:
+    """세션의 이전 내보내기 파일 삭제 (다른 세션의 정리로 이미 없을 수 있음)"""
+    if export and os.path.exists(export['path']):
+        os.remove(export['path'])
+
+
+def render_history_export(period: Optional[str], keyword: str):
+    """검색 조건에 맞는 전체 이력 내보내기 (청크 단위로 앱 내보내기 폴더에 기록)"""
+    with st.expander("📦 전체 이력 내보내기 (감사 제출용)", expanded=False):
+        st.caption("현재 정산월/검색 조건에 맞는 전체 이력을 파일로 저장합니다. "
+                   "화면에 표시된 페이지와 관계없이 모든 행이 포함됩니다.")
+        col_fmt, col_btn = st.columns([2, 1])
+        with col_fmt:
+            fmt = st.radio("형식", ["csv", "xlsx"], horizontal=True, key="history_export_fmt",
+                           format_func=lambda f: {"csv": "CSV (대용량 권장)", "xlsx": "Excel (.xlsx)"}[f])
+        with col_btn:
+            st.markdown("<br>", unsafe_allow_html=True)
+            prepare = st.button("📄 파일 생성", width='stretch', key="history_export_prepare")
+        
+        export_key = (period, keyword, fmt)
+        previous = st.session_state.history_export
+        # 조건이 바뀌면 이전 파일은 더 이상 받을 수 없으므로 바로 삭제
+        if previous and previous['key'] != export_key:
+            remove_history_export(previous)
+            previous = st.session_state.history_export = None
+        if prepare:
+            remove_history_export(previous)
+            export_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), HISTORY_EXPORT_DIR)
+            os.makedirs(export_dir, exist_ok=True)
+            prune_history_exports(export_dir)
+            path = os.path.join(export_dir, f"mail_history_{uuid.uuid4().hex}.{fmt}")
+            with st.spinner("내보내는 중..."):
+                rows = export_send_history(path, fmt, period=period, keyword=keyword or None)
+            stamp = datetime.now().strftime('%Y%m%d_%H%M')
+            label = (period or '전체').replace(' ', '')
+            previous = st.session_state.history_export = {
+                'key': export_key, 'path': path, 'rows': rows,
+                'name': f"발송이력_{label}_{stamp}.{fmt}",
+            }
+        
+        if previous and previous['key'] == export_key and os.path.exists(previous['path']):
+            title = f"{previous['name']} ({previous['rows']:,}건)"
+            # 파일은 생성/준비 버튼을 누른 실행에서 한 번만 읽음 - 그 밖의 rerun마다 다시 읽지 않음
+            ready = prepare or st.button(f"📥 {title} 다운로드 준비", width='stretch',
+                                         key="history_export_ready")
+            if ready:
+                mime = 'text/csv' if fmt == 'csv' else \
+                    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+                with open(previous['path'], 'rb') as f:
+                    data = f.read()
+                st.download_button(
+                    f"📥 {title} 다운로드",
+                    data=data, file_name=previous['name'], mime=mime,
+                    width='stretch', key="history_export_download"
+                )
+
+
 # ============================================================================
 # MAIN
 # ============================================================================
@@ -4704,8 +4743,23 @@ def main():
     # Custom CSS 적용
     st.markdown(CUSTOM_CSS, unsafe_allow_html=True)
     
-    init_session_state()
+    # 큰 세션 데이터(df/grouped_data 등)는 실행 사이에 저장소가 보관
+    # (오래 쓰지 않으면 디스크로 내보내고, 다시 접근하면 메모리 맵으로 복원)
+    store, session_id = get_session_store(), get_session_id()
+    session_data = (store.session(session_id, st.session_state)
+                    if store is not None and session_id is not None else nullcontext())
     
+    with session_data:
+        init_session_state()
+        
+        # 단계별 소요 시간 기록 - 이 스크립트 실행 동안 세션 트레이서 활성화
+        # (발송 워커 등 새 스레드에는 bind_tracer로 전달됨)
+        with activate_tracer(get_perf_tracer()):
+            render_app()
+
+
+def render_app():
+    """사이드바 + 페이지 라우팅 (main에서 세션 트레이서를 활성화한 뒤 호출)"""
     # 로컬 실행 가이드 다이얼로그
     if st.session_state.get('show_local_guide', False):
         show_guide = render_local_guide_dialog()
@@ -4737,6 +4791,12 @@ def main():
         
         # 현재 단계 렌더링
         step = st.session_state.current_step
+        
+        # 새로고침 등으로 세션이 초기화되어도 진행 중인 발송 작업은 다시 표시
+        if step != 5:
+            render_send_job_panel()
+        render_outbox_resume_panel()
+        
         if step == 1:
             render_step1()
         elif step == 2:
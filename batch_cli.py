@@ -0,0 +1,521 @@
+"""
+================================================================================
+🖥️ Headless Batch Runner (CLI)
+================================================================================
+Streamlit 화면 없이 5단계 파이프라인(시트 로드 → 이메일 병합 → 정리 →
+그룹화 → 렌더링 → 발송)을 한 번에 실행합니다.
+
+화면과 같은 모듈(data_loader, grouping_engine, email_template,
+smtp_dispatcher, outbox, history_db)을 그대로 사용하므로 결과는 화면에서
+발송한 것과 같고, 발송 기록도 같은 mail_history.db(outbox + 발송 이력)에
+남습니다. 중간에 중단되면 화면의 "미완료 발송 작업" 패널에서 이어서
+보낼 수 있습니다.
+
+사용 예 (월 정산 cron):
+    MM_SMTP_PASSWORD=앱비밀번호 python -m batch_cli 정산서.xlsx \\
+        --sheet 정산서 --config config_columns.json \\
+        --group-col CSO관리업체명 --email-col 이메일 \\
+        --provider "Hiworks (하이웍스)" --smtp-user me@company.com \\
+        --results results.json
+
+    # 발송 없이 렌더링만 확인
+    python -m batch_cli 정산서.xlsx --sheet 정산서 --group-col CSO관리업체명 \\
+        --email-col 이메일 --dry-run --results preview.json
+
+진행 상황은 stdout, 결과는 --results JSON 파일에 기록됩니다.
+--metrics를 지정하면 단계별 소요 시간(perf_trace)을 JSON Lines로 저장합니다.
+종료 코드: 0 = 전체 성공, 1 = 실패 건 있음, 2 = 설정/입력 오류
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+import argparse
+import json
+import os
+import sys
+import time
+
+from constants import (
+    SMTP_PROVIDERS, TEMPLATE_PRESETS, DEFAULT_SENDER_NAME,
+    DEFAULT_BATCH_SIZE, DEFAULT_EMAIL_DELAY_MIN, DEFAULT_EMAIL_DELAY_MAX, DEFAULT_BATCH_DELAY,
+    DEFAULT_SEND_BURST, DEFAULT_SMTP_POOL_SIZE, MAIL_HISTORY_DB_PATH,
+    validate_email,
+)
+from data_loader import WorkbookSource, load_cached_sheet, merge_email_data, clean_dataframe, parse_failure_summary
+from email_directory import (
+    EmailDirectory, EmailDirectoryStore, directory_key, find_email_directory, get_email_directory
+)
+from grouping_engine import group_data_with_wildcard
+from smtp_dispatcher import SMTPDispatcher, create_smtp_connection
+from render_pool import RenderItem, RenderSettings, iter_rendered_chunks, render_all
+from rate_limiter import TokenBucketRateLimiter
+from send_worker import new_send_job_id, result_row
+from history_db import HistoryDB
+from outbox import SendOutbox
+from perf_trace import Tracer, activate_tracer, span
+
+
+# SMTP 비밀번호를 읽을 환경 변수 (명령행 인자로 받지 않음 - ps/셸 기록 노출 방지)
+PASSWORD_ENV_VAR = "MM_SMTP_PASSWORD"
+
+DEFAULT_PRESET = "기본 (정산서)"
+
+# 컬럼 설정 JSON에서 읽는 키 (config_columns.json 형식 + 선택 키)
+COLUMN_CONFIG_KEYS = ('amount_cols', 'percent_cols', 'date_cols', 'id_cols', 'display_cols')
+
+
+class BatchError(Exception):
+    """설정/입력 오류 (종료 코드 2)"""
+
+
+def log(message: str) -> None:
+    print(message, flush=True)
+
+
+# ============================================================================
+# ⚙️ SETTINGS
+# ============================================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m batch_cli",
+        description="CSO 정산서 메일 머지 배치 실행 (Streamlit 없이 그룹화 → 렌더링 → 발송)",
+    )
+    parser.add_argument("workbook", help="정산 데이터 엑셀 파일 (.xlsx)")
+    parser.add_argument("--sheet", help="데이터 시트명 (기본: 첫 번째 시트)")
+    parser.add_argument("--config", help="컬럼 설정 JSON (config_columns.json 형식)")
+    parser.add_argument("--group-col", help="그룹 키 컬럼 (업체명) - 설정 JSON의 group_key_col보다 우선")
+    parser.add_argument("--email-col", help="이메일 컬럼 - 설정 JSON의 email_col보다 우선")
+
+    email_src = parser.add_argument_group("별도 이메일 시트")
+    email_src.add_argument("--email-workbook", help="이메일 목록 엑셀 (기본: 데이터 파일과 같음)")
+    email_src.add_argument("--email-sheet", help="이메일 목록 시트명 (지정하면 병합 수행)")
+    email_src.add_argument("--join-col-data", help="데이터 시트의 연결 컬럼")
+    email_src.add_argument("--join-col-email", help="이메일 시트의 연결 컬럼")
+
+    grouping = parser.add_argument_group("그룹화")
+    grouping.add_argument("--no-wildcard", action="store_true", help="'OO 합계' 행을 같은 그룹으로 묶지 않음")
+    grouping.add_argument("--wildcard-suffix", action="append", help="합계 행 접미사 (반복 가능, 기본 ' 합계')")
+    grouping.add_argument("--conflict", choices=["first", "most_common"], default="first",
+                          help="그룹 내 이메일이 여러 개일 때 선택 방식")
+    grouping.add_argument("--calculate-totals", action="store_true", help="금액 컬럼 합계 자동 계산")
+
+    template = parser.add_argument_group("템플릿")
+    template.add_argument("--templates", help="템플릿 JSON (subject, header_title, greeting, info, additional, footer)")
+    template.add_argument("--preset", default=DEFAULT_PRESET, choices=list(TEMPLATE_PRESETS),
+                          help="템플릿 JSON이 없을 때 사용할 프리셋")
+    template.add_argument("--tax-amount-col", help="세금계산서 발행 금액 컬럼 (지정 시 발행 정보 표시)")
+
+    smtp = parser.add_argument_group("SMTP")
+    smtp.add_argument("--provider", choices=list(SMTP_PROVIDERS), help="SMTP 제공자 (서버/포트 자동 설정)")
+    smtp.add_argument("--smtp-server", help="SMTP 서버 (제공자 설정보다 우선)")
+    smtp.add_argument("--smtp-port", type=int, help="SMTP 포트")
+    smtp.add_argument("--smtp-user", help="SMTP 로그인 이메일 (발신 주소)")
+    smtp.add_argument("--no-tls", action="store_true", help="587 등 평문 포트에서 STARTTLS 사용 안 함")
+    smtp.add_argument("--sender-name", default=DEFAULT_SENDER_NAME, help="발신자 표시 이름")
+
+    pacing = parser.add_argument_group("발송 속도")
+    pacing.add_argument("--delay-min", type=float, default=DEFAULT_EMAIL_DELAY_MIN,
+                        help="메일 간 최소 간격(초), 0이면 제한 없음")
+    pacing.add_argument("--delay-max", type=float, default=DEFAULT_EMAIL_DELAY_MAX, help="메일 간 최대 간격(초)")
+    pacing.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="배치 크기 (0이면 배치 휴식 없음)")
+    pacing.add_argument("--batch-delay", type=float, default=DEFAULT_BATCH_DELAY, help="배치 간 휴식(초)")
+    pacing.add_argument("--burst", type=int, default=DEFAULT_SEND_BURST, help="연속 발송 허용 건수")
+    pacing.add_argument("--pool-size", type=int, default=DEFAULT_SMTP_POOL_SIZE, help="동시 SMTP 연결 수")
+    pacing.add_argument("--render-workers", type=int, default=None,
+                        help="렌더링 프로세스 수 (기본: CPU 수, 1이면 직렬)")
+
+    output = parser.add_argument_group("출력")
+    output.add_argument("--results", help="결과 JSON 파일 경로")
+    output.add_argument("--metrics", help="단계별 소요 시간 JSON Lines 파일 경로")
+    output.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), MAIL_HISTORY_DB_PATH),
+                        help="발송 이력 DB 경로 (기본: 앱과 같은 mail_history.db)")
+    output.add_argument("--dry-run", action="store_true", help="렌더링까지만 수행하고 발송하지 않음")
+    return parser
+
+
+def load_json(path: Optional[str]) -> Dict[str, Any]:
+    if not path:
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise BatchError(f"JSON 파일을 읽을 수 없습니다: {path} ({e})")
+
+
+def resolve_templates(args: argparse.Namespace) -> Dict[str, str]:
+    """템플릿 JSON 또는 프리셋 → render_email_content용 templates 딕셔너리 (화면 Step 4와 같은 키)"""
+    preset = TEMPLATE_PRESETS[args.preset]
+    templates = {
+        'subject': preset.subject,
+        'header_title': preset.header,
+        'greeting': preset.body,
+        'info': '',
+        'additional': '',
+        'footer': preset.footer,
+    }
+    custom = load_json(args.templates)
+    # 프리셋 형식(header/body) 키도 허용
+    aliases = {'header': 'header_title', 'body': 'greeting'}
+    for key, value in custom.items():
+        key = aliases.get(key, key)
+        if key in templates and isinstance(value, str):
+            templates[key] = value
+    return templates
+
+
+def resolve_smtp_config(args: argparse.Namespace) -> Dict[str, Any]:
+    """create_smtp_connection용 설정 (화면 사이드바 연결 테스트와 같은 형식)"""
+    provider = SMTP_PROVIDERS.get(args.provider or '', {})
+    server = args.smtp_server or provider.get('server')
+    port = args.smtp_port or provider.get('port')
+    password = os.environ.get(PASSWORD_ENV_VAR, '')
+    missing = [name for name, value in (("--smtp-server/--provider", server), ("--smtp-port/--provider", port),
+                                        ("--smtp-user", args.smtp_user), (PASSWORD_ENV_VAR, password))
+               if not value]
+    if missing:
+        raise BatchError(f"SMTP 설정 누락: {', '.join(missing)}")
+    return {
+        'server': server,
+        'port': int(port),
+        'username': args.smtp_user,
+        'password': password,
+        'use_tls': not args.no_tls,
+    }
+
+
+# ============================================================================
+# 🗂️ PIPELINE (Step 1 → 3)
+# ============================================================================
+
+def open_workbook(path: str) -> WorkbookSource:
+    """엑셀 파일 열기 (내용 해시 계산, 시트는 아직 파싱하지 않음)"""
+    try:
+        return WorkbookSource.from_path(path)
+    except Exception as e:
+        raise BatchError(f"엑셀 로드 오류: {path} ({e})")
+
+
+def load_sheet(source: WorkbookSource, path: str, sheet: Optional[str]) -> Tuple[Any, str]:
+    """엑셀 시트 로드 - (DataFrame, 시트명)"""
+    try:
+        sheet_name = sheet or source.sheet_names[0]
+        if sheet_name not in source.sheet_names:
+            raise BatchError(f"시트를 찾을 수 없습니다: {sheet_name} (시트 목록: {', '.join(source.sheet_names)})")
+        df, _ = load_cached_sheet(source, sheet_name)
+    except BatchError:
+        raise
+    except Exception as e:
+        raise BatchError(f"엑셀 로드 오류: {path} ({e})")
+    if df.empty:
+        raise BatchError(f"시트에 데이터가 없습니다: {sheet_name}")
+    return df, sheet_name
+
+
+def load_sheet_from_path(path: str, sheet: Optional[str]) -> Tuple[Any, str]:
+    """엑셀 파일 시트 로드 - (DataFrame, 시트명)"""
+    return load_sheet(open_workbook(path), path, sheet)
+
+
+def load_email_directory(args: argparse.Namespace, join_email: str, email_col: str) -> EmailDirectory:
+    """
+    이메일 시트 → 조회용 디렉터리
+
+    같은 내용의 이메일 시트로 만든 디렉터리가 이력 DB에 있으면 시트를 파싱하지 않습니다
+    (매월 같은 이메일 목록 파일로 실행하는 경우).
+    """
+    path = args.email_workbook or args.workbook
+    source = open_workbook(path)
+    sheet_key = (source.content_hash, args.email_sheet)
+    store = EmailDirectoryStore(HistoryDB(args.db))
+
+    directory = find_email_directory(directory_key(sheet_key, join_email, email_col), store)
+    if directory is not None:
+        log(f"📧 이메일 디렉터리 재사용: {args.email_sheet} ({len(directory):,}개 키, 시트 파싱 생략)")
+        return directory
+
+    df_email, _ = load_sheet(source, path, args.email_sheet)
+    for col in (join_email, email_col):
+        if col not in df_email.columns:
+            raise BatchError(f"이메일 시트에 '{col}' 컬럼이 없습니다.")
+    directory = get_email_directory(df_email, join_email, email_col, sheet_key, store)
+    log(f"📧 이메일 디렉터리 생성: {args.email_sheet} ({len(df_email):,}행 → {len(directory):,}개 키)")
+    return directory
+
+
+def prepare_groups(args: argparse.Namespace, config: Dict[str, Any]) -> Dict[str, Any]:
+    """시트 로드 → 이메일 병합 → 정리 → 그룹화 (화면 Step 2 → 3과 같은 처리)"""
+    with span('load'):
+        df, sheet_name = load_sheet_from_path(args.workbook, args.sheet)
+    log(f"📄 {os.path.basename(args.workbook)} / {sheet_name}: {len(df):,}행 × {len(df.columns)}열")
+
+    group_col = args.group_col or config.get('group_key_col')
+    email_col = args.email_col or config.get('email_col')
+    if not group_col:
+        raise BatchError("그룹 키 컬럼을 지정하세요 (--group-col 또는 설정 JSON의 group_key_col)")
+
+    columns = list(df.columns)
+    df_work = df
+
+    if args.email_sheet:
+        join_data = args.join_col_data or config.get('join_col_data')
+        join_email = args.join_col_email or config.get('join_col_email')
+        if not (join_data and join_email and email_col):
+            raise BatchError("이메일 시트 병합에는 --join-col-data, --join-col-email, --email-col이 필요합니다.")
+        if join_data not in df_work.columns:
+            raise BatchError(f"데이터 시트에 '{join_data}' 컬럼이 없습니다.")
+        with span('merge'):
+            directory = load_email_directory(args, join_email, email_col)
+            df_work = merge_email_data(df_work, None, join_data, join_email, email_col, directory=directory)
+    elif email_col and email_col not in df_work.columns:
+        raise BatchError(f"이메일 컬럼이 없습니다: {email_col!r}")
+
+    if group_col not in df_work.columns:
+        raise BatchError(f"그룹 키 컬럼이 없습니다: {group_col!r}")
+
+    # 저장된 컬럼 설정 중 현재 시트에 있는 컬럼만 사용
+    col_config = {key: [c for c in config.get(key, []) if c in df_work.columns] for key in COLUMN_CONFIG_KEYS}
+    display_cols = col_config['display_cols'] or columns
+
+    with span('clean'):
+        df_cleaned = clean_dataframe(df_work, col_config['amount_cols'], col_config['percent_cols'],
+                                     col_config['date_cols'], col_config['id_cols'])
+    failures = parse_failure_summary(df_cleaned)
+    if failures:
+        log(f"⚠️ 숫자 변환 실패 (빈 값으로 처리): {failures}")
+    with span('grouping'):
+        grouped, conflicts = group_data_with_wildcard(
+            df_cleaned, group_col, email_col,
+            col_config['amount_cols'], col_config['percent_cols'], display_cols,
+            args.conflict, not args.no_wildcard,
+            args.wildcard_suffix or config.get('wildcard_suffixes') or [' 합계'],
+            args.calculate_totals or bool(config.get('calculate_totals_auto', False)),
+            tax_amount_col=args.tax_amount_col or config.get('tax_amount_col'),
+        )
+    log(f"🗂️ 그룹화: {len(grouped):,}개 그룹 (이메일 충돌 {len(conflicts)}건)")
+    return {
+        'sheet': sheet_name,
+        'grouped': grouped,
+        'conflicts': conflicts,
+        'parse_failures': df_cleaned.attrs['numeric_parse_failures'],
+        'display_cols': display_cols,
+        'amount_cols': col_config['amount_cols'],
+    }
+
+
+def split_targets(prepared: Dict[str, Any]) -> Tuple[List[RenderItem], List[Dict[str, str]]]:
+    """그룹 → 렌더링 대상 (원래 순서, 그룹 키, 데이터). 이메일이 없거나 형식이 틀린 그룹은 결과 행으로"""
+    targets: List[RenderItem] = []
+    skipped: List[Dict[str, str]] = []
+    for i, (gk, gd) in enumerate(prepared['grouped'].items()):
+        email = gd['recipient_email']
+        if not email or not validate_email(email):
+            skipped.append({'그룹': gk, '이메일': email or '', '상태': '건너뜀',
+                            '사유': '이메일 없음' if not email else '이메일 형식 오류'})
+        else:
+            targets.append((i, gk, gd))
+    return targets, skipped
+
+
+def render_failed_rows(rows: List[Dict[str, str]]) -> List[Dict[str, str]]:
+    return [{**r, '사유': f"렌더링 실패: {r['사유']}"} for r in rows]
+
+
+# ============================================================================
+# 📮 SEND (Step 5)
+# ============================================================================
+
+def send_jobs(args: argparse.Namespace, config: Dict[str, Any], targets: List[RenderItem],
+              settings: RenderSettings, skipped: List[Dict[str, str]], period: str,
+              run_id: str) -> Tuple[List[Dict[str, Any]], List[Dict[str, str]], float]:
+    """
+    렌더링과 발송을 겹쳐 실행 - 렌더링된 청크를 outbox에 등록하는 즉시 발송 큐로
+
+    발송 전에 대상 그룹 전부를 본문 없는 'queued' 행으로 outbox에 등록하고, 렌더링 청크마다
+    본문을 채운 뒤 발송 큐에 넣습니다. 메일 1건마다 outbox/이력을 기록하므로 Ctrl+C로 중단하면
+    렌더링 전의 그룹까지 남은 메일이 모두 outbox에 'queued'로 남아 화면에서 이어서 보낼 수 있습니다.
+
+    Returns:
+        (발송 결과 행, 렌더링 실패 행, 렌더링 완료까지 걸린 시간)
+    """
+    limiter = TokenBucketRateLimiter.from_delays(args.delay_min, args.delay_max, args.batch_size,
+                                                 args.batch_delay, burst=args.burst)
+    dispatcher = SMTPDispatcher(lambda: create_smtp_connection(config), config['username'],
+                                pool_size=max(1, args.pool_size), limiter=limiter,
+                                sender_name=args.sender_name)
+    error = dispatcher.check_connection()
+    if error:
+        dispatcher.close()
+        raise BatchError(f"SMTP 연결 실패: {error}")
+
+    history = HistoryDB(args.db)
+    outbox = SendOutbox(history)
+    outbox.create_run(run_id, [], period, config['username'],
+                      pending=[(i, gk, gd['recipient_email']) for i, gk, gd in targets], skipped_rows=skipped)
+    dispatcher.before_send = lambda job: outbox.mark_sending(run_id, job.group_key)
+
+    failed: List[Dict[str, str]] = []
+    render_started = time.perf_counter()
+    render_time = [0.0]
+
+    # 발송 스레드(dispatcher 입력 스레드)에서 실행 - 청크의 본문을 outbox에 커밋한 뒤 큐에 넣음
+    def rendered_jobs():
+        rendered = 0
+        for chunk_jobs, chunk_failed in iter_rendered_chunks(targets, settings, args.render_workers):
+            chunk_failed = render_failed_rows(chunk_failed)
+            outbox.fill_rendered(run_id, chunk_jobs, chunk_failed)
+            history.insert_history(chunk_failed, period)
+            failed.extend(chunk_failed)
+            rendered += len(chunk_jobs) + len(chunk_failed)
+            yield from chunk_jobs
+        render_time[0] = time.perf_counter() - render_started
+        log(f"🖋️ 렌더링: {rendered - len(failed):,}건 완료, 실패 {len(failed)}건 ({render_time[0]:.2f}s)")
+
+    log(f"🚀 발송 시작: {len(targets):,}건 (작업 ID {run_id}, 연결 {dispatcher.pool_size}개, "
+        f"렌더링과 동시 진행)")
+
+    rows: List[Dict[str, Any]] = []
+    width = len(str(len(targets)))
+    status = 'completed'
+    try:
+        for result in dispatcher.run(rendered_jobs()):
+            row = result_row(result)
+            outbox.mark_result(run_id, result.job.group_key, result.ok, row['사유'])
+            history.insert_history([{**row, 'subject': result.job.subject}], period)
+            rows.append({**row, 'subject': result.job.subject, 'attempts': result.attempts})
+            mark = "✓" if result.ok else "✗"
+            detail = f" ({row['사유']})" if row['사유'] else ""
+            log(f"[{len(rows):>{width}}/{len(targets)}] {mark} {row['그룹']} → {row['이메일']}{detail}")
+    except KeyboardInterrupt:
+        status = 'stopped'
+        dispatcher.stop()
+        log(f"🛑 중단됨 - 남은 {len(targets) - len(rows) - len(failed)}건은 화면의 미완료 발송 작업에서 "
+            f"이어서 보낼 수 있습니다 (작업 ID {run_id}).")
+    finally:
+        outbox.finish_run(run_id, status)
+        dispatcher.close()
+        history.close()
+    return rows, failed, render_time[0]
+
+
+# ============================================================================
+# 🏁 MAIN
+# ============================================================================
+
+def write_results(path: str, payload: Dict[str, Any]) -> None:
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, path)
+
+
+def run(args: argparse.Namespace) -> int:
+    """단계별 소요 시간을 기록하며 실행 (--metrics 파일은 오류로 끝나도 저장)"""
+    tracer = Tracer()
+    run_id = new_send_job_id()
+    try:
+        with activate_tracer(tracer):
+            return run_pipeline(args, run_id)
+    finally:
+        if args.metrics:
+            tracer.export_jsonl(args.metrics, run_id=None if args.dry_run else run_id,
+                                meta={'workbook': os.path.abspath(args.workbook), 'dry_run': bool(args.dry_run)})
+            log(f"⏱️ 성능 기록 저장: {args.metrics}")
+
+
+def run_pipeline(args: argparse.Namespace, run_id: str) -> int:
+    started = datetime.now()
+    t0 = time.perf_counter()
+    period = started.strftime('%Y년 %m월')
+    config = load_json(args.config)
+    templates = resolve_templates(args)
+    tax_amount_col = args.tax_amount_col or config.get('tax_amount_col')
+    # SMTP 설정은 시트 처리 전에 확인 (cron에서 설정 누락을 빨리 드러내기 위해)
+    smtp_config = None if args.dry_run else resolve_smtp_config(args)
+
+    with span('prep'):
+        prepared = prepare_groups(args, config)
+    t_grouped = time.perf_counter()
+
+    targets, skipped = split_targets(prepared)
+    settings = RenderSettings(templates, prepared['display_cols'], prepared['amount_cols'], period,
+                              tax_amount_col=tax_amount_col)
+    if smtp_config:
+        # 메시지 바이트까지 렌더링 단계에서 생성 - 발송 워커는 전송만
+        settings.sender_email = smtp_config['username']
+        settings.sender_name = args.sender_name
+    if skipped:
+        log(f"⏭️ 건너뜀: {len(skipped)}건 (이메일 없음/형식 오류)")
+
+    if args.dry_run or not targets:
+        with span('render'):
+            jobs, failed = render_all(targets, settings, args.render_workers)
+        failed = render_failed_rows(failed)
+        render_time = time.perf_counter() - t_grouped
+        log(f"🖋️ 렌더링: {len(jobs):,}건 완료, 실패 {len(failed)}건 ({render_time:.2f}s)")
+        sent_rows = [{'그룹': j.group_key, '이메일': j.recipient, '상태': '대기', '사유': '',
+                      'subject': j.subject, 'attempts': 0} for j in jobs]
+    else:
+        with span('send'):
+            sent_rows, failed, render_time = send_jobs(args, smtp_config, targets, settings, skipped,
+                                                       period, run_id)
+    prefilled = skipped + failed
+    n_jobs = len(targets) - len(failed)
+
+    # 결과는 원래 그룹 순서로
+    order = {gk: i for i, gk in enumerate(prepared['grouped'])}
+    results = sorted(prefilled + sent_rows, key=lambda r: order.get(r['그룹'], -1))
+    summary = {
+        'groups': len(prepared['grouped']),
+        'targets': n_jobs,
+        'success': sum(r['상태'] == '성공' for r in results),
+        'failed': sum(r['상태'] == '실패' for r in results),
+        'skipped': sum(r['상태'] == '건너뜀' for r in results),
+        'not_sent': n_jobs - sum(r['상태'] in ('성공', '실패') for r in sent_rows),
+    }
+    finished = datetime.now()
+    log(f"🏁 완료: 성공 {summary['success']} / 실패 {summary['failed']} / 건너뜀 {summary['skipped']}"
+        f"{' / 미발송 ' + str(summary['not_sent']) if summary['not_sent'] else ''}"
+        f" ({time.perf_counter() - t0:.1f}s)")
+
+    if args.results:
+        write_results(args.results, {
+            'run_id': None if args.dry_run else run_id,
+            'dry_run': bool(args.dry_run),
+            'workbook': os.path.abspath(args.workbook),
+            'sheet': prepared['sheet'],
+            'period': period,
+            'started_at': started.isoformat(timespec='seconds'),
+            'finished_at': finished.isoformat(timespec='seconds'),
+            'timings': {
+                'grouping_s': round(t_grouped - t0, 3),
+                'rendering_s': round(render_time, 3),
+                # 발송 모드에서는 렌더링과 겹쳐 진행되므로 렌더링 시간을 포함
+                'sending_s': round(time.perf_counter() - t_grouped, 3),
+            },
+            'summary': summary,
+            'conflicts': prepared['conflicts'],
+            'parse_failures': prepared['parse_failures'],
+            'results': results,
+        })
+        log(f"📝 결과 저장: {args.results}")
+
+    return 1 if summary['failed'] or (summary['not_sent'] and not args.dry_run) else 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return run(args)
+    except BatchError as e:
+        print(f"❌ {e}", file=sys.stderr, flush=True)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,13 @@
+"""
+================================================================================
+📈 Benchmarks
+================================================================================
+합성 CSO 정산 워크북 생성기 + 단계별 End-to-End 벤치마크
+
+    python -m benchmarks --companies 2000 --rows 20 --baseline benchmarks/results/base.json
+    python -m benchmarks.workbook_generator 500   # 생성기 자체 점검
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
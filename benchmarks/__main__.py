@@ -0,0 +1,6 @@
+import sys
+
+from benchmarks.e2e_benchmark import main
+
+
+sys.exit(main())
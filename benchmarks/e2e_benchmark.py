@@ -0,0 +1,366 @@
+"""
+================================================================================
+⏱️ End-to-End Benchmark Suite
+================================================================================
+합성 워크북으로 화면과 같은 함수를 단계별로 실행하고 소요 시간을 JSON
+리포트로 남깁니다. 이전 리포트(--baseline)와 비교해 느려진 단계를 표시합니다.
+
+측정 단계 (화면 Step 1 → 5와 같은 함수):
+    load_sheet               : app.load_sheet - 워크북 캐시를 비운 뒤 파싱 (콜드)
+    load_sheet_cached        : app.load_sheet - 캐시 적중 (Streamlit 리런)
+    merge_email_data         : 이메일 시트 병합 (디렉터리 캐시 없이 매번 생성)
+    clean_dataframe          : 금액/퍼센트 컬럼 숫자 변환
+    group_data_with_wildcard : 와일드카드 그룹화 + 합계
+    render_email_content     : 그룹별 본문 HTML (세금계산서 발행 정보 포함)
+    send_email               : app.send_email - 로컬 SMTP 싱크로 발송 (연결 1개)
+
+사용 예:
+    python -m benchmarks --companies 2000 --rows 20 --output benchmarks/results/base.json
+    # 코드 변경 후 같은 설정으로 다시 실행해 비교 (중앙값 기준 20% 이상 느려지면 ▲)
+    python -m benchmarks --companies 2000 --rows 20 --baseline benchmarks/results/base.json
+
+핵심 원칙:
+1. 단계마다 --repeat회 실행, 비교는 중앙값 기준 (첫 실행 편차 완화)
+2. 리포트에 워크북 설정/환경(Python, pandas, 커밋)을 함께 기록 - 설정이 다르면 비교하지 않음
+3. 메일은 127.0.0.1 싱크로만 발송 - 외부 SMTP 서버에 접속하지 않음
+4. 종료 코드: 0 = 완료, 1 = --fail-on-regression이고 느려진 단계 있음, 2 = 입력 오류
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.smtp_sink import SMTPSink
+from benchmarks.workbook_generator import (
+    EMAIL_COL, GROUP_KEY_COL, JOIN_COL, SUBTOTAL_SUFFIX, WorkbookSpec, write_workbook
+)
+
+
+REPORT_VERSION = 1
+
+# 중앙값이 기준 리포트보다 이 배율 이상이면 느려진 것으로 표시
+DEFAULT_REGRESSION_THRESHOLD = 1.2
+
+DEFAULT_RESULTS_PATH = os.path.join("benchmarks", "results", "latest.json")
+
+SENDER_EMAIL = "bench@example.com"
+
+
+def log(message: str) -> None:
+    print(message, flush=True)
+
+
+@dataclass
+class StageResult:
+    """단계 1개의 반복 측정 결과"""
+    name: str
+    items: int
+    runs: List[float] = field(default_factory=list)
+
+    @property
+    def median(self) -> float:
+        return statistics.median(self.runs)
+
+    def to_dict(self) -> Dict[str, Any]:
+        median = self.median
+        return {
+            'items': self.items,
+            'runs_s': [round(r, 6) for r in self.runs],
+            'min_s': round(min(self.runs), 6),
+            'median_s': round(median, 6),
+            'mean_s': round(statistics.fmean(self.runs), 6),
+            'per_item_us': round(median / self.items * 1e6, 3) if self.items else None,
+        }
+
+
+def time_stage(name: str, fn: Callable[[], Any], items: int, repeat: int,
+               setup: Optional[Callable[[], None]] = None) -> Tuple[StageResult, Any]:
+    """fn을 repeat회 실행 (setup은 측정에서 제외) - (측정 결과, 마지막 반환값)"""
+    result = StageResult(name, items)
+    value = None
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        value = fn()
+        result.runs.append(time.perf_counter() - start)
+    log(f"  {name:<26}: median {result.median * 1000:9.1f}ms ({items:,} items)")
+    return result, value
+
+
+def _app_functions():
+    """
+    app.py의 load_sheet/send_email - Streamlit 런타임 없이 import
+
+    import 중 컴포넌트 등록 경고(missing ScriptRunContext)는 그대로 출력되고,
+    측정 중 세션 상태 경고는 로그 레벨을 올려 숨깁니다.
+    """
+    import app
+    from streamlit import logger as st_logger
+    st_logger.set_log_level('error')
+    return app.load_sheet, app.send_email
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             timeout=5, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'git_commit': _git_commit(),
+    }
+
+
+# ============================================================================
+# 🏃 SUITE
+# ============================================================================
+
+def run_suite(spec: WorkbookSpec, repeat: int = 3, send_limit: int = 200,
+              smtp_latency: float = 0.0, workdir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    합성 워크북 생성 → 단계별 측정 → 리포트 딕셔너리
+
+    Args:
+        spec: 합성 워크북 설정
+        repeat: 단계별 반복 횟수
+        send_limit: send_email 단계에서 보낼 메일 수 (앞에서부터, 0이면 생략)
+        smtp_latency: 로컬 싱크의 DATA 응답 지연 (초)
+        workdir: 워크북 저장 폴더 (기본: 임시 폴더)
+    """
+    from constants import TEMPLATE_PRESETS
+    from data_loader import WORKBOOK_CACHE, WorkbookSource, clean_dataframe, merge_email_data
+    from email_template import render_email_content, render_tax_invoice_html
+    from grouping_engine import group_data_with_wildcard
+
+    load_sheet, send_email = _app_functions()
+
+    path = os.path.join(workdir or tempfile.mkdtemp(prefix="mm-bench-"), "synthetic_settlement.xlsx")
+    start = time.perf_counter()
+    synthetic = write_workbook(path, spec)
+    log(f"📄 합성 워크북: {spec.data_rows:,}행 / {spec.companies:,}개 업체 "
+        f"({os.path.getsize(path) / 1024 / 1024:.1f}MB, 생성 {time.perf_counter() - start:.1f}s)")
+
+    amount_cols = list(spec.amount_cols)
+    percent_cols = list(spec.percent_cols)
+    display_cols = spec.display_cols + [EMAIL_COL]
+    stages: List[StageResult] = []
+
+    def measure(name, fn, items, setup=None):
+        result, value = time_stage(name, fn, items, repeat, setup)
+        stages.append(result)
+        return value
+
+    def load_data_sheet():
+        df, error = load_sheet(WorkbookSource.from_path(path), spec.data_sheet)
+        if error:
+            raise RuntimeError(error)
+        return df
+
+    # 1. 시트 로드 (콜드: 매번 워크북 캐시를 비우고 새 WorkbookSource로 파싱)
+    df = measure('load_sheet', load_data_sheet, spec.data_rows, setup=WORKBOOK_CACHE.clear)
+    df_email, error = load_sheet(WorkbookSource.from_path(path), spec.email_sheet)
+    if error:
+        raise RuntimeError(error)
+    measure('load_sheet_cached', load_data_sheet, spec.data_rows)
+
+    # 2. 이메일 병합 → 숫자 정리 → 그룹화 (화면 Step 2 → 3)
+    df_merged = measure('merge_email_data',
+                        lambda: merge_email_data(df, df_email, JOIN_COL, JOIN_COL, EMAIL_COL),
+                        spec.data_rows)
+    df_cleaned = measure('clean_dataframe',
+                         lambda: clean_dataframe(df_merged, amount_cols, percent_cols, [], []),
+                         spec.data_rows)
+    grouped, conflicts = measure(
+        'group_data_with_wildcard',
+        lambda: group_data_with_wildcard(df_cleaned, GROUP_KEY_COL, EMAIL_COL, amount_cols, percent_cols,
+                                         display_cols, 'first', True, [SUBTOTAL_SUFFIX], True),
+        spec.data_rows)
+    if len(grouped) != spec.companies or len(conflicts) != len(synthetic.conflict_companies):
+        raise RuntimeError(f"그룹화 결과가 합성 데이터와 다릅니다: {len(grouped)}개 그룹, {len(conflicts)}개 충돌")
+
+    # 3. 본문 렌더링 (Step 5 발송 전 렌더링과 같은 인자)
+    preset = TEMPLATE_PRESETS["기본 (정산서)"]
+    templates = {'subject': preset.subject, 'header_title': preset.header, 'greeting': preset.body,
+                 'info': '', 'additional': '', 'footer': preset.footer}
+    tax_amount_col = amount_cols[-1] if amount_cols else None
+
+    def render_all():
+        rendered = []
+        for gk, gd in grouped.items():
+            tax_html = render_tax_invoice_html(gk, gd, tax_amount_col)
+            rendered.append((gk, gd['recipient_email'],
+                             render_email_content(gk, gd, display_cols, amount_cols, templates,
+                                                  extra_html_before_table=tax_html)))
+        return rendered
+
+    rendered = measure('render_email_content', render_all, len(grouped))
+
+    # 4. 발송 (로컬 싱크, 연결 1개 - 연결 시간은 측정에서 제외)
+    targets = [(gk, email, html) for gk, email, html in rendered if email][:max(0, send_limit)]
+    sink_stats = {}
+    if targets:
+        with SMTPSink(latency=smtp_latency) as sink:
+            server = sink.connect(SENDER_EMAIL)
+
+            def send_all():
+                failed = 0
+                for gk, email, html in targets:
+                    ok, _ = send_email(server, SENDER_EMAIL, email, f"[정산서] {gk}", html, "벤치마크")
+                    failed += not ok
+                return failed
+
+            failed = measure('send_email', send_all, len(targets))
+            server.quit()
+            sink_stats = {'received': sink.received, 'received_bytes': sink.received_bytes, 'failed_last_run': failed}
+        if sink_stats['received'] != len(targets) * repeat:
+            raise RuntimeError(f"싱크 수신 수가 다릅니다: {sink_stats['received']} != {len(targets) * repeat}")
+
+    return {
+        'report_version': REPORT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'spec': asdict(spec),
+        'settings': {'repeat': repeat, 'send_limit': send_limit, 'smtp_latency_s': smtp_latency},
+        'dataset': {'data_rows': spec.data_rows, 'email_rows': len(df_email), 'groups': len(grouped),
+                    'conflicts': len(conflicts), 'workbook_bytes': os.path.getsize(path),
+                    'grouped_nbytes': grouped.nbytes()},
+        'smtp_sink': sink_stats,
+        'stages': {stage.name: stage.to_dict() for stage in stages},
+    }
+
+
+# ============================================================================
+# 📊 REPORT
+# ============================================================================
+
+def write_report(path: str, report: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare_reports(current: Dict[str, Any], baseline: Dict[str, Any],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    단계별 중앙값 비교 - [{stage, baseline_s, current_s, ratio, regressed}]
+
+    워크북 설정(spec)이나 측정 설정(settings)이 다르면 비교할 수 없으므로 ValueError.
+    """
+    for key in ('spec', 'settings'):
+        if json.loads(json.dumps(current.get(key))) != baseline.get(key):  # 튜플 → 리스트 (JSON과 같은 형태)
+            raise ValueError(f"기준 리포트와 {key} 설정이 다릅니다 - 같은 설정으로 다시 실행하세요")
+    rows = []
+    for name, stage in current['stages'].items():
+        base = baseline.get('stages', {}).get(name)
+        if base is None:
+            continue
+        ratio = stage['median_s'] / base['median_s'] if base['median_s'] else float('inf')
+        rows.append({'stage': name, 'baseline_s': base['median_s'], 'current_s': stage['median_s'],
+                     'ratio': round(ratio, 3), 'regressed': ratio >= threshold})
+    return rows
+
+
+def format_comparison(rows: List[Dict[str, Any]], baseline: Dict[str, Any],
+                      threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> str:
+    commit = baseline.get('environment', {}).get('git_commit') or '?'
+    lines = [f"기준 리포트 대비 ({baseline.get('created_at')}, 커밋 {commit}, 중앙값):"]
+    for row in rows:
+        mark = "▲ 느려짐" if row['regressed'] else ("▽ 빨라짐" if row['ratio'] <= 1 / threshold else "")
+        lines.append(f"  {row['stage']:<26}: {row['baseline_s'] * 1000:9.1f}ms → "
+                     f"{row['current_s'] * 1000:9.1f}ms ({row['ratio']:.2f}x) {mark}".rstrip())
+    return "\n".join(lines)
+
+
+# ============================================================================
+# 🏁 MAIN
+# ============================================================================
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="합성 정산 워크북으로 로드 → 병합 → 정리 → 그룹화 → 렌더링 → 발송 단계별 소요 시간 측정",
+    )
+    defaults = WorkbookSpec()
+    parser.add_argument("--companies", type=int, default=defaults.companies, help="업체(그룹) 수")
+    parser.add_argument("--rows", type=int, default=defaults.rows_per_company, help="업체당 데이터 행 수")
+    parser.add_argument("--amount-cols", nargs="+", default=list(defaults.amount_cols), help="금액 컬럼명")
+    parser.add_argument("--percent-cols", nargs="*", default=list(defaults.percent_cols), help="퍼센트 컬럼명")
+    parser.add_argument("--no-subtotals", action="store_true", help="업체별 ' 합계' 소계 행 생략")
+    parser.add_argument("--conflict-rate", type=float, default=defaults.conflict_rate,
+                        help="이메일이 충돌하는 업체 비율 (0~1)")
+    parser.add_argument("--missing-email-rate", type=float, default=defaults.missing_email_rate,
+                        help="이메일이 없는 업체 비율 (0~1)")
+    parser.add_argument("--seed", type=int, default=defaults.seed, help="난수 시드")
+    parser.add_argument("--repeat", type=int, default=3, help="단계별 반복 횟수 (중앙값 사용)")
+    parser.add_argument("--send-limit", type=int, default=200, help="send_email 단계 발송 수 (0이면 생략)")
+    parser.add_argument("--smtp-latency-ms", type=float, default=0.0, help="로컬 SMTP 싱크 응답 지연 (ms)")
+    parser.add_argument("--output", default=DEFAULT_RESULTS_PATH, help="결과 JSON 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                        help="느려짐 판정 배율 (중앙값 기준)")
+    parser.add_argument("--fail-on-regression", action="store_true", help="느려진 단계가 있으면 종료 코드 1")
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.companies < 1 or args.rows < 1 or args.repeat < 1 or not args.amount_cols:
+        print("❌ --companies/--rows/--repeat는 1 이상, --amount-cols는 1개 이상이어야 합니다", file=sys.stderr)
+        return 2
+    baseline = load_report(args.baseline) if args.baseline else None
+
+    spec = WorkbookSpec(companies=args.companies, rows_per_company=args.rows,
+                        amount_cols=args.amount_cols, percent_cols=args.percent_cols,
+                        subtotal_rows=not args.no_subtotals, conflict_rate=args.conflict_rate,
+                        missing_email_rate=args.missing_email_rate, seed=args.seed)
+    report = run_suite(spec, repeat=args.repeat, send_limit=args.send_limit,
+                       smtp_latency=args.smtp_latency_ms / 1000)
+    write_report(args.output, report)
+    log(f"💾 결과 저장: {args.output}")
+
+    if baseline is None:
+        return 0
+    try:
+        rows = compare_reports(report, baseline, args.threshold)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+    log(format_comparison(rows, baseline, args.threshold))
+    return 1 if args.fail_on_regression and any(row['regressed'] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
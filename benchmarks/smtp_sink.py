@@ -0,0 +1,114 @@
+"""
+================================================================================
+📮 Local SMTP Sink (벤치마크용)
+================================================================================
+실제 메일을 보내지 않고 발송 경로(연결 → AUTH → MAIL/RCPT/DATA)를 끝까지
+실행하기 위한 최소 SMTP 서버입니다. 받은 메시지는 버리고 개수만 셉니다.
+
+핵심 원칙:
+1. 127.0.0.1의 빈 포트에 바인딩 - 외부로 나가는 트래픽 없음
+2. latency로 실제 서버의 DATA 응답 지연을 흉내 (기본 0)
+3. 연결마다 스레드 1개 (SMTPDispatcher 연결 풀 동시 발송 측정 가능)
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+import smtplib
+import socketserver
+import threading
+import time
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    """AUTH 허용, DATA 수신 후 카운트"""
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        self._reply("220 localhost sink")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self._reply("250-localhost")
+                self._reply("250 AUTH PLAIN LOGIN")
+            elif cmd.startswith("AUTH"):
+                self._reply("235 ok")
+            elif cmd.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self._reply("250 ok")
+            elif cmd == "DATA":
+                self._reply("354 go ahead")
+                size = 0
+                while True:
+                    data = self.rfile.readline()
+                    if data in (b".\r\n", b""):
+                        break
+                    size += len(data)
+                if server.latency:
+                    time.sleep(server.latency)
+                with server.lock:
+                    server.received += 1
+                    server.received_bytes += size
+                self._reply("250 queued")
+            elif cmd == "QUIT":
+                self._reply("221 bye")
+                return
+            else:
+                self._reply("500 unknown")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    로컬 SMTP 수신 서버
+
+    사용 예:
+        with SMTPSink(latency=0.01) as sink:
+            server = sink.connect()
+            send_email(server, ...)
+            sink.received  # 받은 메시지 수
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float = 0.0):
+        super().__init__(("127.0.0.1", 0), _SinkHandler)
+        self.lock = threading.Lock()
+        self.latency = latency
+        self.received = 0
+        self.received_bytes = 0
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> "SMTPSink":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def connect(self, username: str = "bench@example.com", password: str = "bench") -> smtplib.SMTP:
+        """로그인까지 마친 smtplib 연결 (앱의 평문 SMTP 경로와 동일)"""
+        server = smtplib.SMTP("127.0.0.1", self.port, timeout=10)
+        server.login(username, password)
+        return server
+
+    def smtp_config(self) -> dict:
+        """SMTPDispatcher/배치 CLI용 설정 딕셔너리"""
+        return {'server': '127.0.0.1', 'port': self.port, 'username': 'bench@example.com',
+                'password': 'bench', 'use_tls': False, 'provider': 'local sink'}
+
+    def __enter__(self) -> "SMTPSink":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
@@ -48,6 +48,9 @@ DEFAULT_BATCH_SIZE = 10
 DEFAULT_EMAIL_DELAY_MIN = 5  # 초
 DEFAULT_EMAIL_DELAY_MAX = 10  # 초
 DEFAULT_BATCH_DELAY = 30  # 초
+DEFAULT_SEND_BURST = 1  # 토큰 버킷 크기 (연속 발송 허용 건수)
+DEFAULT_SMTP_POOL_SIZE = 2  # 동시 SMTP 연결 수
+MAX_SMTP_POOL_SIZE = 5
 MAX_RETRY_COUNT = 3
 
 
@@ -205,6 +208,8 @@ SESSION_STATE_DEFAULTS: Dict[str, Any] = {
     'calculate_totals_auto': False,
     'grouped_data': {},
     'email_conflicts': [],
+    'prep_pipeline': None,  # Step 2 → 3 단계 캐시 (PrepPipeline, 세션별로 생성)
+    'perf_tracer': None,  # 단계별 소요 시간 (perf_trace.Tracer, 세션별로 생성)
     
     # 템플릿
     'subject_template': TEMPLATE_PRESETS["기본 (정산서)"].subject,
@@ -225,12 +230,23 @@ SESSION_STATE_DEFAULTS: Dict[str, Any] = {
     'email_delay_min': DEFAULT_EMAIL_DELAY_MIN,
     'email_delay_max': DEFAULT_EMAIL_DELAY_MAX,
     'batch_delay': DEFAULT_BATCH_DELAY,
+    'send_burst': DEFAULT_SEND_BURST,
+    'smtp_pool_size': DEFAULT_SMTP_POOL_SIZE,
     
     # 캐시 및 상태
     'column_settings_cache': {},
     'activity_log': [],
     'emergency_stop': False,
     'sent_groups': set(),
+    'send_job_id': None,  # 백그라운드 발송 작업 ID
+    'send_job_seen': 0,  # 세션에 반영한 작업 결과 수
+    'send_job_finalized': None,  # 완료 로그를 기록한 작업 ID
+    'send_job_rendered_final': None,  # 결과 리포트 화면으로 전환한 작업 ID
+    'workbook_cache_logged': set(),  # 운영 로그에 기록한 (파일 해시, 시트) 목록
+    'history_page': 0,  # 발송 내역 검색 결과 페이지 (0부터)
+    'history_search_key': None,  # 페이지를 계산한 검색 조건 (조건이 바뀌면 1페이지로)
+    'history_cursors': [None],  # 최신순 목록의 페이지별 시작 커서 (timestamp, id)
+    'history_export': None,  # 생성한 내보내기 파일 정보 (경로, 파일명, 행 수, 조건)
     
     # UI 상태
     'show_smtp_settings': False,
@@ -249,6 +265,36 @@ SESSION_STATE_DEFAULTS: Dict[str, Any] = {
 
 CONFIG_COLUMNS_PATH = "config_columns.json"
 MAIL_HISTORY_DB_PATH = "mail_history.db"
+PERF_METRICS_DIR = "perf_metrics"  # 발송 작업별 단계 소요 시간 (JSON Lines)
+
+
+# ============================================================================
+# 📊 HISTORY DASHBOARD
+# ============================================================================
+
+HISTORY_PAGE_SIZE = 50  # 발송 내역 탭 페이지당 행 수
+HISTORY_EXPORT_DIR = "history_exports"  # 전체 이력 내보내기 파일 (세션별 최신 1개)
+HISTORY_EXPORT_MAX_FILES = 20  # 내보내기 폴더에 남길 최대 파일 수 (오래된 것부터 삭제)
+HISTORY_EXPORT_EXPIRE_SECONDS = 24 * 60 * 60  # 이 시간이 지난 내보내기 파일은 삭제
+
+
+# ============================================================================
+# 🗄️ CACHE SETTINGS
+# ============================================================================
+
+WORKBOOK_CACHE_MAX_BYTES = 512 * 1024 * 1024  # 파싱된 시트 캐시 예산 (512MB, 프로세스 전역)
+UPLOAD_HASH_MEMO_SIZE = 256  # 업로드 file_id → 내용 해시 기억 개수 (오래된 것부터 제거)
+
+
+# ============================================================================
+# 💾 SESSION SPILL SETTINGS
+# ============================================================================
+
+SESSION_SPILL_ENABLED = False  # 세션 데이터 디스크 보관 (secrets.toml의 SESSION_SPILL로 켬)
+SESSION_SPILL_DIR = "session_spill"  # 세션 스냅샷 폴더 (Arrow IPC + manifest)
+SESSION_SPILL_IDLE_SECONDS = 10 * 60  # 이 시간 동안 쓰지 않은 세션은 디스크로
+SESSION_SPILL_EXPIRE_SECONDS = 24 * 60 * 60  # 이 시간 동안 쓰지 않은 세션은 삭제
+SESSION_MEMORY_BUDGET_BYTES = 1024 * 1024 * 1024  # 서버 전체 세션 데이터 예산 (1GB, 넘으면 오래된 세션부터 디스크)
 
 
 # ============================================================================
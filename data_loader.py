@@ -0,0 +1,604 @@
+"""
+================================================================================
+📂 Workbook Loader & Cache Module
+================================================================================
+업로드된 엑셀 워크북을 파싱하고, 파싱 결과를 프로세스 단위로 캐시합니다.
+
+Streamlit은 위젯 값이 바뀔 때마다 스크립트 전체를 다시 실행하므로
+같은 파일/시트를 매번 다시 파싱하게 됩니다. 이 모듈은 업로드 내용의
+해시 + 시트명을 키로 파싱된 DataFrame을 보관하여 두 번째 실행부터
+파싱을 완전히 건너뜁니다.
+
+핵심 원칙:
+1. 키 = (업로드 내용 해시, 시트명) - 파일명이 같아도 내용이 다르면 별도 항목
+2. 바이트 예산 기반 LRU 제거 - 오래 사용하지 않은 시트부터 제거
+3. 캐시된 DataFrame은 읽기 전용으로 취급 (호출자는 copy 후 수정)
+
+Step 2 → 3 데이터 준비(이메일 병합, 숫자 컬럼 정리)도 이 모듈에 있어
+Streamlit 없이(CLI 배치 실행 등) 같은 처리를 재사용할 수 있습니다.
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from dataclasses import dataclass, field
+import hashlib
+import io
+import os
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # 선택 의존성 - 없으면 숫자 변환을 pandas 문자열 연산으로
+    pa = pc = None
+
+from constants import UPLOAD_HASH_MEMO_SIZE, WORKBOOK_CACHE_MAX_BYTES
+from email_directory import EmailDirectory
+from frame_lineage import ORIGINAL_STR_ATTR, OriginalText, derive_frame
+from perf_trace import count, traced
+
+
+# ============================================================================
+# 🔑 CONTENT HASH
+# ============================================================================
+
+def compute_content_hash(data: bytes) -> str:
+    """업로드 바이트의 내용 해시 (blake2b, 32자 hex)"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def estimate_frame_bytes(df: Optional[pd.DataFrame]) -> int:
+    """
+    DataFrame이 차지하는 메모리(바이트)를 추정합니다.
+    attrs에 보관된 원본 문자열 DataFrame도 함께 계산합니다.
+    """
+    if df is None:
+        return 0
+
+    total = int(df.memory_usage(index=True, deep=True).sum())
+    for value in df.attrs.values():
+        if isinstance(value, pd.DataFrame):
+            total += int(value.memory_usage(index=True, deep=True).sum())
+        elif isinstance(value, OriginalText):
+            total += value.stored_nbytes()
+    return total
+
+
+# ============================================================================
+# 🗄️ WORKBOOK CACHE (LRU by byte budget)
+# ============================================================================
+
+class WorkbookCache:
+    """
+    파싱된 시트 DataFrame 캐시 - 바이트 예산 기반 LRU
+
+    Streamlit 세션들은 같은 프로세스의 여러 스레드에서 실행되므로
+    모든 접근은 Lock으로 보호합니다.
+    """
+
+    def __init__(self, max_bytes: int = WORKBOOK_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[pd.DataFrame, int]]" = OrderedDict()
+        self._sheet_names: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, content_hash: str, sheet_name: str) -> Optional[pd.DataFrame]:
+        """캐시 조회 - 적중 시 가장 최근 사용 위치로 이동"""
+        key = (content_hash, sheet_name)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, content_hash: str, sheet_name: str, df: pd.DataFrame) -> None:
+        """캐시 저장 - 예산 초과 시 가장 오래된 항목부터 제거"""
+        key = (content_hash, sheet_name)
+        nbytes = estimate_frame_bytes(df)
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            # 단일 항목이 예산보다 크면 보관하지 않음
+            if nbytes > self.max_bytes:
+                return
+
+            self._entries[key] = (df, nbytes)
+            self.current_bytes += nbytes
+
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def get_or_load(self, content_hash: str, sheet_name: str,
+                    loader: Callable[[], pd.DataFrame]) -> Tuple[pd.DataFrame, bool]:
+        """
+        캐시 조회 후 없으면 loader()로 파싱하여 저장합니다.
+
+        Returns:
+            (DataFrame, 캐시 적중 여부) 튜플
+        """
+        df = self.get(content_hash, sheet_name)
+        if df is not None:
+            return df, True
+
+        df = loader()
+        self.put(content_hash, sheet_name, df)
+        return df, False
+
+    def get_sheet_names(self, content_hash: str) -> Optional[List[str]]:
+        with self._lock:
+            names = self._sheet_names.get(content_hash)
+            return list(names) if names is not None else None
+
+    def put_sheet_names(self, content_hash: str, sheet_names: List[str]) -> None:
+        with self._lock:
+            self._sheet_names[content_hash] = list(sheet_names)
+
+    def stats(self) -> Dict[str, Any]:
+        """적중/미스 카운터 및 사용량"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sheet_names.clear()
+            self.current_bytes = 0
+
+
+# 프로세스 전역 캐시 인스턴스 (모든 세션 공유)
+WORKBOOK_CACHE = WorkbookCache()
+
+
+# ============================================================================
+# 📄 WORKBOOK SOURCE
+# ============================================================================
+
+# Streamlit UploadedFile.file_id → 내용 해시 (리런마다 재해시 방지) - 최근 업로드만 LRU로 보관
+_hash_memo: "OrderedDict[Tuple[str, int], str]" = OrderedDict()
+_hash_memo_lock = threading.Lock()
+
+
+def _memo_content_hash(memo_key: Optional[Tuple[str, int]], data: bytes) -> str:
+    """업로드 내용 해시 - 같은 업로드(file_id, 크기)는 다시 해시하지 않음"""
+    if memo_key is None:
+        return compute_content_hash(data)
+    with _hash_memo_lock:
+        content_hash = _hash_memo.get(memo_key)
+        if content_hash is not None:
+            _hash_memo.move_to_end(memo_key)
+            return content_hash
+    content_hash = compute_content_hash(data)
+    with _hash_memo_lock:
+        _hash_memo[memo_key] = content_hash
+        _hash_memo.move_to_end(memo_key)
+        while len(_hash_memo) > UPLOAD_HASH_MEMO_SIZE:
+            _hash_memo.popitem(last=False)
+    return content_hash
+
+
+@dataclass
+class WorkbookSource:
+    """
+    업로드된 워크북 핸들
+
+    pd.ExcelFile은 실제로 시트를 파싱해야 할 때(캐시 미스)만 엽니다.
+    캐시 적중 시에는 openpyxl 워크북을 전혀 열지 않습니다.
+    """
+    name: str
+    content_hash: str
+    data: bytes = field(repr=False)
+    _excel_file: Optional[pd.ExcelFile] = field(default=None, repr=False)
+
+    @classmethod
+    def from_upload(cls, uploaded_file) -> "WorkbookSource":
+        """Streamlit UploadedFile(또는 name 속성이 있는 파일 객체)에서 생성"""
+        data = uploaded_file.getvalue()
+        file_id = getattr(uploaded_file, 'file_id', None)
+        memo_key = (file_id, len(data)) if file_id else None
+        content_hash = _memo_content_hash(memo_key, data)
+        return cls(name=uploaded_file.name, content_hash=content_hash, data=data)
+
+    @classmethod
+    def from_path(cls, path: str) -> "WorkbookSource":
+        """로컬 파일 경로에서 생성 (CLI 배치 실행용)"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        return cls(name=os.path.basename(path), content_hash=compute_content_hash(data), data=data)
+
+    @property
+    def excel_file(self) -> pd.ExcelFile:
+        if self._excel_file is None:
+            self._excel_file = pd.ExcelFile(io.BytesIO(self.data))
+        return self._excel_file
+
+    @property
+    def sheet_names(self) -> List[str]:
+        names = WORKBOOK_CACHE.get_sheet_names(self.content_hash)
+        if names is None:
+            names = list(self.excel_file.sheet_names)
+            WORKBOOK_CACHE.put_sheet_names(self.content_hash, names)
+        return names
+
+
+@traced('load.parse')
+def parse_sheet(xlsx: pd.ExcelFile, sheet_name: str) -> pd.DataFrame:
+    """
+    시트 파싱 - 엑셀 원본 형식 유지 (단일 파싱)
+
+    - 숫자에 콤마 있으면 콤마 포함 문자열로 보존
+    - 바코드/코드는 숫자 그대로 유지
+
+    openpyxl 파싱은 한 번만 수행하고(dtype=object, 셀 값 그대로),
+    그 결과에서 원본 문자열 뷰(dtype=str과 동일)와 숫자 계산용 뷰
+    (기본 타입 추론과 동일)를 모두 만듭니다. 원본 문자열 뷰는 숫자 계산용
+    뷰와 값이 다른 컬럼만 따로 보관합니다 (OriginalText).
+    """
+    # 셀 값을 변환 없이 그대로 읽음 (유일한 read_excel 호출)
+    df_raw = pd.read_excel(xlsx, sheet_name=sheet_name, dtype=object)
+
+    df = _infer_column_types(df_raw)
+    # 원본 문자열 데이터 저장 (컬럼별 원본 형식 확인용)
+    df.attrs[ORIGINAL_STR_ATTR] = OriginalText.from_raw(df_raw, df)
+    return df
+
+
+def _infer_column_types(df_raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    read_excel 기본 타입 추론과 동일한 숫자 계산용 뷰
+
+    파서와 같은 순서로 추론합니다:
+    1. 숫자 변환 (숫자형 문자열 포함)
+    2. bool 변환 (결측 없이 전부 bool인 경우)
+    3. 나머지 object 컬럼은 DataFrame 생성 시 날짜형 자동 추론
+    """
+    columns = {}
+    for i in range(df_raw.shape[1]):
+        values = df_raw.iloc[:, i]
+        try:
+            columns[i] = pd.to_numeric(values).to_numpy()
+            continue
+        except (ValueError, TypeError):
+            pass
+
+        array = values.to_numpy(dtype=object)
+        if len(array) and all(isinstance(v, bool) for v in array):
+            columns[i] = array.astype(bool)
+        else:
+            columns[i] = array
+
+    df = pd.DataFrame(columns, index=df_raw.index)
+    df.columns = df_raw.columns
+    return df
+
+
+def load_cached_sheet(source: WorkbookSource, sheet_name: str) -> Tuple[pd.DataFrame, bool]:
+    """
+    캐시를 거쳐 시트를 로드합니다.
+
+    Returns:
+        (DataFrame, 캐시 적중 여부) 튜플
+    """
+    df, cache_hit = WORKBOOK_CACHE.get_or_load(
+        source.content_hash, sheet_name,
+        lambda: parse_sheet(source.excel_file, sheet_name)
+    )
+    count('workbook_cache.hit' if cache_hit else 'workbook_cache.miss')
+    return df, cache_hit
+
+
+# ============================================================================
+# 🧹 DATA PREPARATION (Step 2 → 3)
+# ============================================================================
+
+def merge_email_data(df_data, df_email, join_col_data, join_col_email, email_col,
+                     directory: Optional[EmailDirectory] = None):
+    """
+    이메일 데이터 병합 - 이메일 디렉터리(해시 인덱스) 조회로 이메일 컬럼을 붙임
+
+    데이터 시트는 복사하지 않습니다 (열 데이터와 attrs의 원본 문자열을 공유하는 파생 프레임).
+    데이터 시트에 이미 같은 이름의 이메일 컬럼이 있으면 병합 결과로 바꿉니다.
+
+    Args:
+        directory: 미리 만든 디렉터리 (get_email_directory). 없으면 이 호출에서 생성
+    """
+    if directory is None:
+        directory = EmailDirectory.from_frame(df_email, join_col_email, email_col)
+    return derive_frame(df_data, {email_col: directory.lookup(df_data[join_col_data])})
+
+
+# ============================================================================
+# 🔢 NUMERIC COERCION (금액/비율 컬럼)
+# ============================================================================
+
+# 숫자 변환 시 제거할 구분 문자 (제거 후 앞뒤 공백 strip)
+AMOUNT_STRIP_CHARS = ',₩원'
+PERCENT_STRIP_CHARS = ',%'
+
+# pyarrow 경로에서 바로 int64로 캐스팅하는 셀 (나머지는 pd.to_numeric)
+# '+5'처럼 '+'로 시작하는 셀은 int64 캐스팅이 거부하므로 pd.to_numeric으로 보냄
+_ARROW_INT_PATTERN = r'^-?[0-9]{1,18}$'
+
+# 셀별 type() - object 배열 전체에 C 루프로 적용
+_cell_types = np.frompyfunc(type, 1, 1)
+
+
+def _number_cell_mask(values: pd.Series) -> np.ndarray:
+    """
+    object 컬럼에서 이미 int/float인 셀 위치 (엑셀 숫자 셀)
+
+    bool은 int의 하위 타입이지만 기존처럼 변환 실패로 처리되도록 제외합니다.
+    """
+    if values.dtype != object:
+        return np.zeros(len(values), dtype=bool)
+    types = _cell_types(values.to_numpy())
+    return np.asarray((types == int) | (types == float), dtype=bool)
+
+
+def _strip_pattern(strip_chars: str) -> str:
+    """구분 문자 → 정규식 문자 클래스 1개 (문자열로 전달 - re.Pattern은 셀마다 파이썬 re로 처리됨)"""
+    return '[' + re.escape(strip_chars) + ']'
+
+
+def _to_numbers(text: pd.Series, pattern: str) -> pd.Series:
+    """기존 변환 - 구분 문자 제거 → strip → pd.to_numeric"""
+    return pd.to_numeric(text.str.replace(pattern, '', regex=True).str.strip(), errors='coerce')
+
+
+def _parse_text_blocks(text: pd.Series, strip_chars: str, sizes: List[int]) -> List[pd.Series]:
+    """
+    이어 붙인 문자열 셀 → 컬럼(블록)별 숫자 Series (값/dtype은 _to_numbers와 동일)
+
+    pyarrow가 있으면 구분 문자 제거/공백 제거/정수 판별/int64 캐스팅을 전체 셀에 Arrow 커널로
+    한 번씩만 실행하고, 정수가 아닌 셀만 컬럼별로 기존 방식으로 변환합니다.
+    없으면 정규식 치환 + strip을 전체 셀에 한 번 실행하고 컬럼별로 pd.to_numeric 합니다.
+    """
+    pattern = _strip_pattern(strip_chars)
+    bounds = np.cumsum([0] + sizes)
+    blocks = [slice(bounds[i], bounds[i + 1]) for i in range(len(sizes))]
+
+    if pc is None or len(text) == 0:
+        cleaned = text.str.replace(pattern, '', regex=True).str.strip()
+        return [pd.to_numeric(cleaned.iloc[b], errors='coerce') for b in blocks]
+
+    arr = pa.array(text.array, type=pa.large_string(), from_pandas=True)
+    for ch in strip_chars:
+        arr = pc.replace_substring(arr, ch, '')
+    arr = pc.utf8_trim_whitespace(arr)
+    is_int = pc.fill_null(pc.match_substring_regex(arr, _ARROW_INT_PATTERN), False).to_numpy(zero_copy_only=False)
+    ints = np.zeros(len(text), dtype=np.int64)
+    ints[is_int] = pc.cast(pc.filter(arr, is_int), pa.int64()).to_numpy()
+
+    results = []
+    for block in blocks:
+        block_is_int = is_int[block]
+        if block_is_int.all():
+            results.append(pd.Series(ints[block]))
+            continue
+        rest = _to_numbers(text.iloc[block].iloc[~block_is_int], pattern)
+        if rest.dtype.kind not in 'if':
+            results.append(_to_numbers(text.iloc[block], pattern))
+            continue
+        out = np.empty(len(block_is_int), dtype=rest.dtype)
+        out[block_is_int] = ints[block][block_is_int]
+        out[~block_is_int] = rest.to_numpy()
+        results.append(pd.Series(out))
+    return results
+
+
+def coerce_numeric_columns(df: pd.DataFrame, columns: List[str], strip_chars: str) -> Dict[str, int]:
+    """
+    여러 컬럼을 한 번에 숫자로 변환 (df의 컬럼을 교체) - 컬럼별 변환 실패 셀 수 반환
+
+    - 이미 숫자형인 컬럼은 그대로 둠
+    - object 컬럼의 int/float 셀(엑셀 숫자 셀)은 문자열로 바꾸지 않고 바로 사용
+    - 나머지(문자열) 셀은 모든 컬럼을 세로로 이어 붙여 한 번에 변환
+
+    결과 값과 컬럼별 dtype은 기존 방식(astype(str) → 문자 제거 → pd.to_numeric)과 같습니다.
+    변환 실패 = 값이 있었지만 숫자가 아닌 셀 (빈 셀/공백/구분 문자만 있는 셀은 제외).
+    """
+    plans = []
+    for col in dict.fromkeys(columns):
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            continue
+        plans.append((col, _number_cell_mask(values)))
+    if not plans:
+        return {}
+
+    pattern = _strip_pattern(strip_chars)
+    text = pd.concat([df[col].iloc[~is_number].astype(str) for col, is_number in plans], ignore_index=True)
+    sizes = [len(is_number) - int(is_number.sum()) for _, is_number in plans]
+    blocks = _parse_text_blocks(text, strip_chars, sizes)
+
+    failures: Dict[str, int] = {}
+    offset = 0
+    for (col, is_number), n_text, text_numbers in zip(plans, sizes, blocks):
+        n_rows = len(is_number)
+
+        # 변환 실패 = 숫자가 되지 못한 셀 중 값이 있었던 셀 (빈 문자열/nan 제외)
+        missing = text_numbers.isna().to_numpy()
+        if missing.any():
+            leftover = text.iloc[offset:offset + n_text].iloc[missing].str.replace(pattern, '', regex=True).str.strip()
+            n_failed = int((leftover.notna() & (leftover != '') & ~leftover.isin(['nan', 'None'])).sum())
+            if n_failed:
+                failures[col] = n_failed
+        offset += n_text
+
+        parts = [text_numbers]
+        if n_text < n_rows:
+            parts.append(pd.to_numeric(df[col].iloc[is_number], errors='coerce'))
+        if n_rows and all(p.dtype.kind == 'i' for p in parts):
+            out = np.empty(n_rows, dtype=np.int64)
+        elif n_rows and all(p.dtype.kind in 'if' for p in parts):
+            out = np.empty(n_rows, dtype=np.float64)
+        else:
+            # 빈 시트/int64 범위 밖 정수 등 - 기존 방식 그대로 (값과 dtype 보존)
+            df[col] = _to_numbers(df[col].astype(str), pattern)
+            continue
+        out[~is_number] = text_numbers.to_numpy()
+        if n_text < n_rows:
+            out[is_number] = parts[1].to_numpy()
+        df[col] = pd.Series(out, index=df.index, name=col)
+    return failures
+
+
+def clean_dataframe(df, amount_cols, percent_cols, date_cols, id_cols):
+    """
+    데이터 정리 - 엑셀 원본 유지, 숫자 컬럼만 numeric 변환
+
+    원본은 복사하지 않고 얕은 프레임에서 숫자 컬럼만 교체합니다 (나머지 컬럼과
+    attrs의 원본 문자열은 공유). 컬럼별 변환 실패 셀 수는
+    attrs['numeric_parse_failures']에 {컬럼: 건수}로 남깁니다.
+    """
+    # attrs는 변환 후에 붙임 (변환 중 컬럼을 꺼낼 때마다 attrs가 deepcopy되지 않도록)
+    df_cleaned = pd.DataFrame(df, copy=False)
+
+    # 숫자 컬럼만 numeric 변환 (합계 계산을 위해)
+    # 나머지는 엑셀 원본 그대로 유지
+    failures = coerce_numeric_columns(df_cleaned, amount_cols, AMOUNT_STRIP_CHARS)
+    failures.update(coerce_numeric_columns(df_cleaned, percent_cols, PERCENT_STRIP_CHARS))
+
+    # id_cols, date_cols는 원본 그대로 유지 (형식 변환 안 함)
+    df_cleaned.attrs = {**df.attrs, 'numeric_parse_failures': failures}
+    return df_cleaned
+
+
+def parse_failure_summary(df_cleaned: pd.DataFrame) -> str:
+    """clean_dataframe의 컬럼별 변환 실패 요약 (예: "처방액 3건, 수수료율 1건") - 없으면 빈 문자열"""
+    failures = df_cleaned.attrs.get('numeric_parse_failures') or {}
+    return ', '.join(f"{col} {count:,}건" for col, count in failures.items())
+
+
+# ============================================================================
+# 🧪 MODULE TEST (단일 파싱 벤치마크)
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+    import time
+    from openpyxl import Workbook
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"=== Single-pass Sheet Loading Benchmark ({n_rows:,} rows) ===")
+
+    # 합성 정산 시트 생성 (write_only 모드)
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("정산서")
+    ws.append(["CSO관리업체명", "거래처코드", "품목명", "처방액", "수수료율", "총 수수료액", "비고"])
+    for i in range(n_rows):
+        company = f"업체{i // 20:05d}"
+        ws.append([
+            company if i % 20 else f"{company} 합계",
+            f"{880000000 + i:013d}",
+            f"품목{i % 500}",
+            (i * 137) % 5_000_000,
+            0.35 if i % 3 else None,
+            f"{(i * 31) % 900_000:,}",
+            None,
+        ])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    data = buffer.getvalue()
+    print(f"  Workbook size: {len(data) / 1024 / 1024:.1f} MB")
+
+    def double_read(xlsx: pd.ExcelFile, sheet_name: str) -> pd.DataFrame:
+        df_str = pd.read_excel(xlsx, sheet_name=sheet_name, dtype=str)
+        df = pd.read_excel(xlsx, sheet_name=sheet_name)
+        df.attrs['original_str'] = df_str
+        return df
+
+    timings = {}
+    frames = {}
+    for label, fn in [("double read_excel", double_read), ("single pass", parse_sheet)]:
+        xlsx = pd.ExcelFile(io.BytesIO(data))
+        start = time.perf_counter()
+        frames[label] = fn(xlsx, "정산서")
+        timings[label] = time.perf_counter() - start
+        print(f"  {label:<18}: {timings[label]:.2f}s")
+
+    baseline, single = frames["double read_excel"], frames["single pass"]
+    pd.testing.assert_frame_equal(baseline.attrs['original_str'], single.attrs['original_str'].frame())
+    baseline.attrs, single.attrs = {}, {}
+    pd.testing.assert_frame_equal(baseline, single)
+
+    print(f"  Speedup: {timings['double read_excel'] / timings['single pass']:.2f}x")
+    print("\n✅ Outputs identical!")
+
+    # ------------------------------------------------------------------------
+    # 숫자 변환 (넓은 시트: 금액 컬럼 30개 + 비율 컬럼)
+    # ------------------------------------------------------------------------
+    print(f"\n=== Numeric Coercion Benchmark ({n_rows:,} rows × 31 numeric cols, "
+          f"{'pyarrow' if pc is not None else 'pandas'}) ===")
+
+    def legacy_clean(df, amount_cols, percent_cols):
+        df_cleaned = df.copy()
+        for col in amount_cols:
+            df_cleaned[col] = pd.to_numeric(
+                df_cleaned[col].astype(str).str.replace(',', '').str.replace('₩', '').str.replace('원', '').str.strip(),
+                errors='coerce'
+            )
+        for col in percent_cols:
+            df_cleaned[col] = pd.to_numeric(
+                df_cleaned[col].astype(str).str.replace(',', '').str.replace('%', '').str.strip(),
+                errors='coerce'
+            )
+        return df_cleaned
+
+    wide = single.copy()
+    amount_cols = ["처방액", "총 수수료액"]
+    for k in range(28):
+        # 엑셀 숫자 셀과 "1,234원" 문자열 셀이 섞인 컬럼
+        wide[f"금액{k}"] = wide["처방액"].astype(object).where(wide.index % 2 == 0, wide["총 수수료액"] + "원")
+        amount_cols.append(f"금액{k}")
+    wide.loc[wide.index % 1000 == 7, "금액0"] = "-"
+    wide.loc[wide.index % 1000 == 13, "금액1"] = "+5"
+    wide.loc[wide.index % 1000 == 17, "금액1"] = "+1,000원"
+    wide["수수료율"] = wide["수수료율"].astype(object)
+    wide.loc[wide.index % 1000 == 19, "수수료율"] = "+35%"
+    wide.attrs['original_str'] = wide.astype(str)
+
+    start = time.perf_counter()
+    expected = legacy_clean(wide, amount_cols, ["수수료율"])
+    legacy_time = time.perf_counter() - start
+    start = time.perf_counter()
+    cleaned = clean_dataframe(wide, amount_cols, ["수수료율"], [], [])
+    coerce_time = time.perf_counter() - start
+    print(f"  copy + per-column replace : {legacy_time:.2f}s")
+    print(f"  coercion engine           : {coerce_time:.2f}s")
+    print(f"  Speedup: {legacy_time / coerce_time:.2f}x")
+    print(f"  Parse failures: {parse_failure_summary(cleaned)}")
+
+    expected.attrs, cleaned.attrs = {}, {}
+    pd.testing.assert_frame_equal(expected, cleaned)
+    assert "original_str" in wide.attrs and "numeric_parse_failures" not in wide.attrs
+    print("\n✅ Numeric coercion identical!")
@@ -0,0 +1,363 @@
+"""
+================================================================================
+📇 Email Directory (사업자번호/업체코드 → 이메일)
+================================================================================
+별도 이메일 시트를 조인 키 → 이메일 해시 인덱스로 한 번만 만들어 두고,
+데이터 시트에는 벡터화된 Index.get_indexer 조회로 이메일 컬럼을 붙입니다.
+
+기존 merge_email_data는 Step 2 → 3으로 넘어갈 때마다 두 시트를 복사하고
+_join_key 컬럼을 astype(str).str.strip()으로 다시 만들고 이메일 시트를
+중복 제거한 뒤 DataFrame.merge를 실행했습니다. 이메일 시트는 매달 거의
+같으므로 시트 내용 해시 단위로 한 번만 인덱스를 만들면 됩니다.
+
+핵심 원칙:
+1. 키 = (시트 내용 해시, 시트명, 조인 컬럼, 이메일 컬럼)
+2. 조인 키 정규화/중복 처리는 기존과 동일 (str 변환 + 앞뒤 공백 제거, 첫 행 우선)
+3. 프로세스 메모리 LRU(세션 공유) + 선택적 SQLite 보관(mail_history.db)
+   - 배치 CLI는 같은 이메일 시트면 다음 실행에서 시트 파싱 자체를 생략
+4. 데이터 시트는 복사하지 않음 - 이메일 컬럼 하나만 새로 만들어 붙임
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, List, Optional, Tuple
+from collections import OrderedDict
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from history_db import HistoryDB
+
+
+# 프로세스 메모리에 보관할 디렉터리 수 (세션 공유)
+EMAIL_DIRECTORY_CACHE_SIZE = 8
+
+# SQLite에 보관할 디렉터리 수 (최근 생성 순, 월 1회 업로드 기준 약 1년)
+EMAIL_DIRECTORY_KEEP = 12
+
+# (시트 내용 해시, 시트명, 조인 컬럼, 이메일 컬럼)
+DirectoryKey = Tuple[str, str, str, str]
+
+
+def normalize_join_keys(values: pd.Series) -> pd.Series:
+    """조인 키 정규화 - 기존 _join_key와 동일 (str 변환 후 앞뒤 공백 제거)"""
+    return values.astype(str).str.strip()
+
+
+# ============================================================================
+# 📇 DIRECTORY
+# ============================================================================
+
+class EmailDirectory:
+    """
+    조인 키 → 이메일 해시 인덱스 (읽기 전용)
+
+    사용 예:
+        directory = EmailDirectory.from_frame(df_email, '사업자번호', '이메일')
+        df_data['이메일'] = directory.lookup(df_data['사업자번호'])
+    """
+
+    def __init__(self, keys: pd.Index, emails: Any, key: Optional[DirectoryKey] = None):
+        self.keys = keys
+        self.emails = emails  # keys와 같은 순서의 배열 (ExtensionArray 또는 ndarray)
+        self.key = key
+
+    @classmethod
+    def from_frame(cls, df_email: pd.DataFrame, join_col: str, email_col: str,
+                   key: Optional[DirectoryKey] = None) -> "EmailDirectory":
+        """이메일 시트에서 생성 - 같은 조인 키가 여러 번 나오면 첫 행 사용 (drop_duplicates와 동일)"""
+        join_keys = normalize_join_keys(df_email[join_col])
+        first = ~join_keys.duplicated(keep='first').to_numpy()
+        keys = pd.Index(join_keys.to_numpy()[first])
+        return cls(keys, df_email[email_col].array[first], key)
+
+    @classmethod
+    def from_records(cls, records: List[Tuple[str, Any]], key: Optional[DirectoryKey] = None) -> "EmailDirectory":
+        """(조인 키, 이메일) 목록에서 생성 (SQLite 복원용, 이메일 None → NaN)"""
+        emails = np.array([np.nan if email is None else email for _, email in records], dtype=object)
+        return cls(pd.Index([join_key for join_key, _ in records], dtype=object), emails, key)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def lookup(self, join_values: pd.Series) -> pd.Series:
+        """
+        조인 키 컬럼 → 이메일 컬럼 (같은 인덱스, 없는 키는 NaN)
+
+        숫자/문자열 컬럼은 고유값만 정규화해 조회합니다. object 컬럼은 1과 1.0처럼 같은 값으로
+        묶이지만 문자열이 다른 경우가 있어 행 단위로 정규화합니다.
+        """
+        if join_values.dtype == object:
+            positions = self.keys.get_indexer(normalize_join_keys(join_values))
+        else:
+            codes, uniques = pd.factorize(join_values, use_na_sentinel=False)
+            unique_positions = self.keys.get_indexer(normalize_join_keys(pd.Series(uniques)))
+            positions = unique_positions[codes]
+        emails = pd.api.extensions.take(self.emails, positions, allow_fill=True)
+        return pd.Series(emails, index=join_values.index)
+
+    def records(self) -> List[Tuple[str, Any]]:
+        """(조인 키, 이메일) 목록 - NaN은 None"""
+        return [(str(k), None if pd.isna(e) else e) for k, e in zip(self.keys, self.emails)]
+
+
+# ============================================================================
+# 🗄️ MEMORY CACHE (LRU by entry count)
+# ============================================================================
+
+class EmailDirectoryCache:
+    """프로세스 단위 디렉터리 캐시 (스레드 안전)"""
+
+    def __init__(self, max_entries: int = EMAIL_DIRECTORY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[DirectoryKey, EmailDirectory]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: DirectoryKey) -> Optional[EmailDirectory]:
+        with self._lock:
+            directory = self._entries.get(key)
+            if directory is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return directory
+
+    def put(self, directory: EmailDirectory) -> None:
+        with self._lock:
+            self._entries[directory.key] = directory
+            self._entries.move_to_end(directory.key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# 프로세스 전역 캐시 인스턴스 (모든 세션 공유)
+EMAIL_DIRECTORY_CACHE = EmailDirectoryCache()
+
+
+# ============================================================================
+# 💾 SQLITE STORE (선택)
+# ============================================================================
+
+class EmailDirectoryStore:
+    """
+    mail_history.db에 디렉터리 보관 - 프로세스 재시작 후에도 같은 이메일 시트는 다시 만들지 않음
+
+    테이블은 HistoryDB.ensure_schema() 때 함께 생성됩니다.
+    최근 EMAIL_DIRECTORY_KEEP개만 남기고 오래된 디렉터리는 저장할 때 정리합니다.
+    """
+
+    def __init__(self, db: HistoryDB, keep: int = EMAIL_DIRECTORY_KEEP):
+        self.db = db
+        self.keep = keep
+        db.add_schema(self._create_tables)
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection) -> None:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS email_directories (
+                directory_key TEXT PRIMARY KEY,
+                sheet_hash TEXT,
+                sheet_name TEXT,
+                join_col TEXT,
+                email_col TEXT,
+                entries INTEGER,
+                built_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS email_directory_entries (
+                directory_key TEXT NOT NULL,
+                join_key TEXT NOT NULL,
+                email TEXT,
+                PRIMARY KEY (directory_key, join_key)
+            ) WITHOUT ROWID
+        ''')
+
+    @staticmethod
+    def _key_text(key: DirectoryKey) -> str:
+        return '\x1f'.join(key)
+
+    def load(self, key: DirectoryKey) -> Optional[EmailDirectory]:
+        self.db.ensure_schema()
+        conn = self.db.connection()
+        key_text = self._key_text(key)
+        if conn.execute("SELECT 1 FROM email_directories WHERE directory_key = ?", (key_text,)).fetchone() is None:
+            return None
+        records = conn.execute(
+            "SELECT join_key, email FROM email_directory_entries WHERE directory_key = ?", (key_text,)
+        ).fetchall()
+        return EmailDirectory.from_records(records, key)
+
+    def save(self, directory: EmailDirectory) -> None:
+        key_text = self._key_text(directory.key)
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.execute("DELETE FROM email_directory_entries WHERE directory_key = ?", (key_text,))
+            conn.execute(
+                '''INSERT OR REPLACE INTO email_directories
+                   (directory_key, sheet_hash, sheet_name, join_col, email_col, entries)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                (key_text, *directory.key, len(directory))
+            )
+            conn.executemany(
+                "INSERT INTO email_directory_entries (directory_key, join_key, email) VALUES (?, ?, ?)",
+                [(key_text, join_key, email) for join_key, email in directory.records()]
+            )
+            stale = [row[0] for row in conn.execute(
+                "SELECT directory_key FROM email_directories ORDER BY built_at DESC, rowid DESC LIMIT -1 OFFSET ?",
+                (self.keep,)
+            )]
+            for stale_key in stale:
+                conn.execute("DELETE FROM email_directory_entries WHERE directory_key = ?", (stale_key,))
+                conn.execute("DELETE FROM email_directories WHERE directory_key = ?", (stale_key,))
+
+
+def directory_key(sheet_key: Tuple[str, str], join_col: str, email_col: str) -> DirectoryKey:
+    return (str(sheet_key[0]), str(sheet_key[1]), str(join_col), str(email_col))
+
+
+def find_email_directory(key: DirectoryKey, store: Optional[EmailDirectoryStore] = None) -> Optional[EmailDirectory]:
+    """
+    이미 만든 디렉터리 조회 (메모리 캐시 → SQLite) - 없으면 None
+
+    SQLite에 있으면 이메일 시트를 파싱하지 않고도 병합할 수 있습니다 (CLI 월 정산 실행).
+    """
+    directory = EMAIL_DIRECTORY_CACHE.get(key)
+    if directory is None and store is not None:
+        try:
+            directory = store.load(key)
+        except sqlite3.Error:
+            directory = None  # 보관소 오류는 무시하고 새로 생성
+        if directory is not None:
+            EMAIL_DIRECTORY_CACHE.put(directory)
+    return directory
+
+
+def get_email_directory(df_email: pd.DataFrame, join_col: str, email_col: str,
+                        sheet_key: Optional[Tuple[str, str]] = None,
+                        store: Optional[EmailDirectoryStore] = None) -> EmailDirectory:
+    """
+    디렉터리 조회 - 메모리 캐시 → SQLite → 새로 생성 순
+
+    Args:
+        sheet_key: (시트 내용 해시, 시트명). 없으면 캐시하지 않고 매번 생성
+        store: SQLite 보관소 (없으면 메모리 캐시만 사용)
+    """
+    if sheet_key is None:
+        return EmailDirectory.from_frame(df_email, join_col, email_col)
+
+    key = directory_key(sheet_key, join_col, email_col)
+    directory = find_email_directory(key, store)
+    if directory is not None:
+        return directory
+
+    directory = EmailDirectory.from_frame(df_email, join_col, email_col, key)
+    if store is not None:
+        try:
+            store.save(directory)
+        except sqlite3.Error:
+            pass
+    EMAIL_DIRECTORY_CACHE.put(directory)
+    return directory
+
+
+# ============================================================================
+# 🧪 MODULE TEST (기존 merge 대비 결과 동일성 + 속도)
+# ============================================================================
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+    import time
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    n_companies = max(1, n_rows // 20)
+    print(f"=== Email Directory Test ({n_rows:,} data rows, {n_companies:,} companies) ===")
+
+    rng = np.random.default_rng(7)
+    codes = rng.integers(0, int(n_companies * 1.1), n_rows)  # 10%는 이메일 시트에 없음
+    df_data = pd.DataFrame({
+        "업체": [f"업체{c:05d}" for c in codes],
+        "사업자번호": [f"{c:010d}" if c % 3 else c for c in codes],  # 문자열/숫자 혼합
+        "금액": rng.integers(1_000, 100_000, n_rows),
+    })
+    email_codes = list(range(n_companies)) + [5, 8]  # 중복 키 → 첫 행 사용
+    df_email = pd.DataFrame({
+        "사업자번호": [f" {c:010d} " if c % 2 else f"{c:010d}" for c in email_codes],
+        "이메일": [f"cso{c}@example.com" if c % 50 else None for c in email_codes[:-2]] + ["dup5@x.com", "dup8@x.com"],
+    })
+
+    def legacy_merge(df_data, df_email, join_col_data, join_col_email, email_col):
+        """기존 구현 (copy + _join_key + drop_duplicates + merge)"""
+        df_data = df_data.copy()
+        df_email = df_email.copy()
+        df_data['_join_key'] = df_data[join_col_data].astype(str).str.strip()
+        df_email['_join_key'] = df_email[join_col_email].astype(str).str.strip()
+        df_merged = df_data.merge(df_email[['_join_key', email_col]].drop_duplicates('_join_key'),
+                                  on='_join_key', how='left')
+        df_merged.drop('_join_key', axis=1, inplace=True)
+        return df_merged
+
+    from data_loader import merge_email_data
+
+    # 숫자/문자열/혼합(object) 조인 컬럼 모두 기존 merge와 같은 결과
+    for variant in (df_data["사업자번호"].map(str), pd.Series(codes), df_data["사업자번호"]):
+        frame = df_data.assign(사업자번호=variant)
+        pd.testing.assert_frame_equal(
+            merge_email_data(frame, df_email, "사업자번호", "사업자번호", "이메일").reset_index(drop=True),
+            legacy_merge(frame, df_email, "사업자번호", "사업자번호", "이메일"), check_dtype=False)
+    df_data["사업자번호"] = df_data["사업자번호"].map(str).astype("string")
+
+    start = time.perf_counter()
+    expected = legacy_merge(df_data, df_email, "사업자번호", "사업자번호", "이메일")
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    directory = get_email_directory(df_email, "사업자번호", "이메일", ("hash", "사업자"))
+    build_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    merged = merge_email_data(df_data, df_email, "사업자번호", "사업자번호", "이메일", directory=directory)
+    lookup_time = time.perf_counter() - start
+
+    pd.testing.assert_frame_equal(merged.reset_index(drop=True), expected, check_dtype=False)
+    assert get_email_directory(df_email, "사업자번호", "이메일", ("hash", "사업자")) is directory
+    assert list(df_data.columns) == ["업체", "사업자번호", "금액"]  # 원본은 그대로
+    assert merged["금액"].values is df_data["금액"].values or np.shares_memory(merged["금액"].values,
+                                                                          df_data["금액"].values)
+    print(f"  legacy copy + merge  : {legacy_time * 1000:.1f}ms")
+    print(f"  directory build (1x) : {build_time * 1000:.1f}ms ({len(directory):,} keys)")
+    print(f"  directory lookup     : {lookup_time * 1000:.1f}ms")
+
+    # SQLite 보관 → 새 프로세스처럼 메모리 캐시 비우고 복원
+    db_path = os.path.join(tempfile.mkdtemp(), "directory.db")
+    db = HistoryDB(db_path)
+    store = EmailDirectoryStore(db, keep=2)
+    EMAIL_DIRECTORY_CACHE.clear()
+    get_email_directory(df_email, "사업자번호", "이메일", ("hash", "사업자"), store)
+    EMAIL_DIRECTORY_CACHE.clear()
+    start = time.perf_counter()
+    restored = get_email_directory(df_email, "사업자번호", "이메일", ("hash", "사업자"), store)
+    restore_time = time.perf_counter() - start
+    merged = merge_email_data(df_data, df_email, "사업자번호", "사업자번호", "이메일", directory=restored)
+    pd.testing.assert_frame_equal(merged.reset_index(drop=True), expected, check_dtype=False)
+    for month in ("hash2", "hash3"):
+        get_email_directory(df_email, "사업자번호", "이메일", (month, "사업자"), store)
+    kept = db.connection().execute("SELECT COUNT(*) FROM email_directories").fetchone()[0]
+    assert kept == 2
+    print(f"  SQLite restore       : {restore_time * 1000:.1f}ms (kept {kept} directories)")
+    db.close()
+
+    print("\n✅ Directory merge matches legacy merge!")
@@ -19,9 +19,15 @@ Version: 2.0.0
 from typing import Dict, List, Optional, Any
 from jinja2 import Template, Environment, BaseLoader
 from datetime import datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, astuple
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
 import html
 import math
+import threading
+
+from perf_trace import count, span, traced
 
 
 # ============================================================================
@@ -81,7 +87,22 @@ class EmailStyleConfig:
     warning_border: str = "#ffc107"
     
     def to_inline_styles(self) -> Dict[str, str]:
-        """스타일 딕셔너리를 inline CSS로 변환"""
+        """
+        스타일 딕셔너리를 inline CSS로 변환 (인스턴스별 메모이즈)
+        
+        필드 값이 바뀌면 다시 계산합니다. 반환된 딕셔너리는 읽기 전용으로 사용하세요.
+        """
+        key = astuple(self)
+        cached = self.__dict__.get('_inline_styles_cache')
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        
+        styles = self._build_inline_styles()
+        self.__dict__['_inline_styles_cache'] = (key, styles)
+        return styles
+    
+    def _build_inline_styles(self) -> Dict[str, str]:
+        """inline CSS 문자열 생성"""
         styles = {
             "container": f"""
                 font-family: {self.font_family};
@@ -342,6 +363,73 @@ EMAIL_TEMPLATE = """
 """
 
 
+# ============================================================================
+# ⚡ COMPILED TEMPLATE REGISTRY
+# ============================================================================
+# 같은 템플릿 소스를 수신자마다 다시 컴파일하지 않도록
+# 공유 Environment에서 컴파일한 Template 객체를 소스 해시 기준으로 보관합니다.
+
+TEMPLATE_CACHE_SIZE = 128
+
+# Template(source)와 동일한 기본 설정의 공유 Environment
+_JINJA_ENV = Environment(loader=BaseLoader())
+
+
+class TemplateRegistry:
+    """컴파일된 Jinja2 템플릿 레지스트리 - 소스 해시 키, LRU 제거"""
+    
+    def __init__(self, env: Environment, max_size: int = TEMPLATE_CACHE_SIZE):
+        self.env = env
+        self.max_size = max_size
+        self._templates: "OrderedDict[str, Template]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def source_key(source: str) -> str:
+        return hashlib.sha1(source.encode('utf-8')).hexdigest()
+    
+    def get(self, source: str) -> Template:
+        """컴파일된 템플릿 반환 - 없으면 컴파일 후 저장"""
+        key = self.source_key(source)
+        with self._lock:
+            template = self._templates.get(key)
+            if template is not None:
+                self._templates.move_to_end(key)
+                self.hits += 1
+                count('template.cache_hit')
+                return template
+            self.misses += 1
+        count('template.cache_miss')
+        
+        # 컴파일은 Lock 밖에서 수행 (구문 오류는 호출자에게 그대로 전달)
+        with span('template.compile'):
+            template = self.env.from_string(source)
+        with self._lock:
+            self._templates[key] = template
+            self._templates.move_to_end(key)
+            while len(self._templates) > self.max_size:
+                self._templates.popitem(last=False)
+        return template
+    
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._templates)}
+    
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+
+
+TEMPLATE_REGISTRY = TemplateRegistry(_JINJA_ENV)
+
+
+def get_compiled_template(source: str) -> Template:
+    """템플릿 소스를 컴파일된 Template으로 반환 (레지스트리 캐시 사용)"""
+    return TEMPLATE_REGISTRY.get(source)
+
+
 # ============================================================================
 # 📊 DATA FORMATTERS
 # ============================================================================
@@ -545,7 +633,7 @@ def render_email_html(
     if style is None:
         style = DEFAULT_STYLE
     
-    template = Template(EMAIL_TEMPLATE)
+    template = get_compiled_template(EMAIL_TEMPLATE)
     styles = style.to_inline_styles()
     
     # 금액 컬럼이 아닌 컬럼 수 계산 (합계 행의 colspan용)
@@ -632,6 +720,7 @@ def render_email(
     return render_email_html(context)
 
 
+@traced('render.email')
 def render_email_content(
     group_key: str,
     group_data: Dict[str, Any],
@@ -666,17 +755,17 @@ def render_email_content(
     try:
         # 본문 템플릿 렌더링
         greeting_text = templates.get('greeting', '')
-        greeting = Template(greeting_text).render(**template_vars)
+        greeting = get_compiled_template(greeting_text).render(**template_vars)
         greeting = greeting.replace('\n', '<br>')
         
         info_text = templates.get('info', '')
-        info_message = Template(info_text).render(**template_vars) if info_text else ''
+        info_message = get_compiled_template(info_text).render(**template_vars) if info_text else ''
         
         additional_text = templates.get('additional', '')
-        additional = Template(additional_text).render(**template_vars) if additional_text else ''
+        additional = get_compiled_template(additional_text).render(**template_vars) if additional_text else ''
         
         footer_text = templates.get('footer', '')
-        footer = Template(footer_text).render(**template_vars) if footer_text else ''
+        footer = get_compiled_template(footer_text).render(**template_vars) if footer_text else ''
         
     except Exception:
         # 템플릿 렌더링 실패 시 원본 텍스트 사용
@@ -738,6 +827,93 @@ def render_preview(
     """
 
 
+# ============================================================================
+# 🧾 TAX INVOICE INFO
+# ============================================================================
+
+# 세금계산서 발행 정보 HTML 조각 캐시 크기 (그룹 키 × 금액)
+TAX_INVOICE_CACHE_SIZE = 8192
+
+
+def _parse_amount(value) -> Optional[float]:
+    """표시 문자열 금액 → float (콤마/원 제거, 빈 값이거나 변환 불가면 None)"""
+    try:
+        amt_str = str(value).replace(',', '').replace('원', '').strip()
+        if amt_str and amt_str not in ['', '-', 'nan', 'None']:
+            return float(amt_str)
+    except (ValueError, TypeError):
+        pass
+    return None
+
+
+def tax_invoice_amount(group_data: Dict[str, Any], tax_amount_col: str) -> float:
+    """
+    그룹의 세금계산서 발행 금액 - 합계 행의 tax_amount_col 값, 없거나 0이면 totals (둘 다 없으면 0)
+
+    GroupedDataset의 그룹은 그룹화 때 모든 그룹을 한 번에 계산한 값을, 렌더링 워커로 보낸
+    dict는 함께 보낸 값(tax_amounts)을 사용합니다. 그 외 dict만 행을 훑습니다.
+    """
+    if hasattr(group_data, 'tax_amount'):
+        return group_data.tax_amount(tax_amount_col)
+    precomputed = (group_data.get('tax_amounts') or {}).get(tax_amount_col)
+    if precomputed is not None:
+        return precomputed
+
+    tax_amount = 0
+    for row in group_data.get('rows', []):
+        is_total_row = any('합계' in str(v) for v in row.values())
+        if is_total_row and tax_amount_col in row:
+            amount = _parse_amount(row[tax_amount_col])
+            if amount is not None:
+                tax_amount = amount
+
+    # 합계 행에서 못 찾으면 totals에서
+    if tax_amount == 0:
+        totals = group_data.get('totals', {})
+        if tax_amount_col in totals:
+            tax_amount = _parse_amount(totals[tax_amount_col]) or 0
+    return tax_amount
+
+
+@lru_cache(maxsize=TAX_INVOICE_CACHE_SIZE)
+def tax_invoice_fragment(group_key: str, tax_amount: float) -> str:
+    """세금계산서 발행 정보 HTML 조각 - (그룹 키, 금액)별 캐시 (미리보기와 발송이 같은 조각 재사용)"""
+    return f'''
+            <div style="background: linear-gradient(135deg, #fff9c4 0%, #fff59d 100%); 
+                        padding: 16px 20px; border-radius: 10px; margin: 16px 0;
+                        border-left: 4px solid #ffc107; border: 1px solid #ffca28;">
+                <strong style="color: #856404; font-size: 1.1em;">🧾 세금계산서 발행 정보</strong>
+                <div style="margin-top: 12px; display: flex; justify-content: space-between; align-items: center; flex-wrap: wrap; gap: 8px;">
+                    <div>
+                        <span style="color: #665c00;">CSO관리업체명:</span>
+                        <strong style="color: #333; margin-left: 8px;">{group_key}</strong>
+                    </div>
+                    <div style="white-space: nowrap;">
+                        <span style="color: #665c00;">발행 금액:</span>
+                        <strong style="color: #856404; font-size: 1.3em; margin-left: 8px; white-space: nowrap;">₩{tax_amount:,.0f}</strong>
+                    </div>
+                </div>
+            </div>
+            '''
+
+
+@traced('render.tax_invoice')
+def render_tax_invoice_html(group_key: str, group_data: Dict[str, Any],
+                            tax_amount_col: Optional[str]) -> str:
+    """
+    그룹 데이터에서 세금계산서 발행 정보 HTML 생성
+
+    금액은 tax_invoice_amount(미리 계산한 값 우선), HTML은 tax_invoice_fragment 캐시를 사용합니다.
+    금액이 없으면 빈 문자열을 반환합니다.
+    """
+    if not tax_amount_col:
+        return ""
+    tax_amount = tax_invoice_amount(group_data, tax_amount_col)
+    if tax_amount > 0:
+        return tax_invoice_fragment(group_key, float(tax_amount))
+    return ""
+
+
 # ============================================================================
 # 🔧 UTILITY EXPORTS
 # ============================================================================
@@ -745,7 +921,7 @@ def render_preview(
 # 기존 style.py와의 호환성을 위해 get_styles 함수 제공
 def get_styles() -> Dict[str, str]:
     """스타일 딕셔너리 반환 (기존 API 호환)"""
-    return DEFAULT_STYLE.to_inline_styles()
+    return dict(DEFAULT_STYLE.to_inline_styles())
 
 
 # 기본 템플릿 상수 (기존 코드 호환)
@@ -0,0 +1,613 @@
+"""
+================================================================================
+🗜️ Compact Grouped Dataset (grouped_data 열 단위 저장)
+================================================================================
+그룹화 결과(grouped_data)를 그룹별 dict + 행별 dict 대신 열 단위 배열로
+보관하고, 기존 코드가 쓰던 dict 모양 그대로 읽을 수 있게 합니다.
+
+기존 구조는 행마다 {컬럼명: 표시 문자열} dict를 하나씩 만들었기 때문에
+모든 행이 모든 컬럼명을 키로 반복해서 들고 있었습니다. 20만 행이면
+세션(브라우저)마다 수백 MB가 st.session_state에 남았습니다.
+
+저장 구조:
+    columns    : 표시 컬럼 순서 (모든 그룹 공유)
+    categories : 컬럼별 고유 표시 문자열 표 (같은 문자열은 한 번만 저장)
+    codes      : int32 (컬럼 수 × 전체 행 수) - 그룹 순서로 이어 붙인 행의 문자열 번호
+    offsets    : 그룹 i의 행 = codes[:, offsets[i]:offsets[i + 1]]
+    total_values : float64 (그룹 수 × 합계 컬럼 수) - 표시 문자열 totals와 같은 합계의 숫자 값
+    tax_amounts  : 컬럼명 → float64 (그룹 수) - 그룹별 세금계산서 발행 금액 (컬럼당 한 번 계산)
+
+핵심 원칙:
+1. dict 모양 그대로 - grouped[key]['rows'], .get('totals'), .items() 등 기존 코드 변경 없음
+2. 행 dict는 읽을 때 그 그룹 것만 만듦 (Step 3 표/미리보기/렌더링 1개 그룹 단위)
+3. 읽기 전용 - 그룹화 결과를 고치려면 다시 그룹화
+4. 피클링하면 그룹 1개는 일반 dict로 변환 (렌더링 프로세스 풀에 전체 데이터를 보내지 않음)
+5. 발송 전 검증(sanity_check)은 그룹별 배열로 모든 그룹을 한 번에 판정 (그룹/합계 루프 없음)
+6. 세금계산서 발행 금액은 고유 문자열 표에서 한 번에 계산 (미리보기/발송마다 행을 훑지 않음)
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Sequence as SequenceType
+from collections.abc import Mapping, Sequence
+import operator
+
+import numpy as np
+import pandas as pd
+
+from constants import EMAIL_PATTERN
+
+
+GROUP_FIELDS = ('recipient_email', 'rows', 'totals', 'row_count', 'has_conflict', 'conflict_emails')
+
+
+def encode_column(values: np.ndarray) -> tuple:
+    """표시 문자열 배열 → (int32 번호, 고유 문자열 표)"""
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    return codes.astype(np.int32, copy=False), np.asarray(uniques, dtype=object)
+
+
+# ============================================================================
+# 👁️ VIEWS (기존 dict/list 모양)
+# ============================================================================
+
+class GroupRows(Sequence):
+    """그룹 1개의 행 목록 - 행 dict(컬럼명 → 표시 문자열)를 읽을 때 만듦"""
+
+    __slots__ = ('_dataset', '_start', '_stop')
+
+    def __init__(self, dataset: "GroupedDataset", start: int, stop: int):
+        self._dataset = dataset
+        self._start = start
+        self._stop = stop
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        # 요청한 행(구간)만 만듦 - 인덱스를 전체 행 위치로 옮김
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self._dataset.row_dicts(self._start, self._stop)[index]
+            return self._dataset.row_dicts(self._start + start, self._start + max(start, stop))
+        i = operator.index(index)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("group row index out of range")
+        return self._dataset.row_dicts(self._start + i, self._start + i + 1)[0]
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter(self._dataset.row_dicts(self._start, self._stop))
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (GroupRows, list, tuple)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"GroupRows({len(self)} rows)"
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+class GroupView(Mapping):
+    """
+    그룹 1개 - 기존 grouped_data[key] dict와 같은 키
+
+    recipient_email, rows, totals, row_count, has_conflict, conflict_emails
+    """
+
+    __slots__ = ('_dataset', '_index')
+
+    def __init__(self, dataset: "GroupedDataset", index: int):
+        self._dataset = dataset
+        self._index = index
+
+    def __getitem__(self, name: str) -> Any:
+        ds, i = self._dataset, self._index
+        if name == 'recipient_email':
+            return ds.emails[i]
+        if name == 'rows':
+            return GroupRows(ds, int(ds.offsets[i]), int(ds.offsets[i + 1]))
+        if name == 'totals':
+            return dict(ds.totals[i]) if ds.totals is not None else {}
+        if name == 'row_count':
+            return int(ds.offsets[i + 1] - ds.offsets[i])
+        if name == 'has_conflict':
+            return bool(ds.conflict_emails[i])
+        if name == 'conflict_emails':
+            return list(ds.conflict_emails[i])
+        raise KeyError(name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(GROUP_FIELDS)
+
+    def __len__(self) -> int:
+        return len(GROUP_FIELDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """기존 구조 그대로의 dict (rows는 행 dict 리스트)"""
+        group = {name: self[name] for name in GROUP_FIELDS}
+        group['rows'] = list(group['rows'])
+        return group
+
+    def tax_amount(self, column: str) -> float:
+        """세금계산서 발행 금액 (0이면 발행 정보 없음) - GroupedDataset.tax_invoice_amounts 참고"""
+        return float(self._dataset.tax_invoice_amounts(column)[self._index])
+
+    def __repr__(self) -> str:
+        return f"GroupView({self._dataset.group_keys[self._index]!r}, {self['row_count']} rows)"
+
+    def __reduce__(self):
+        # 이미 계산한 발행 금액은 함께 보냄 (워커에서 행을 다시 훑지 않도록)
+        group = self.to_dict()
+        if self._dataset.tax_amounts:
+            group['tax_amounts'] = {column: float(amounts[self._index])
+                                    for column, amounts in self._dataset.tax_amounts.items()}
+        return dict, (group,)
+
+
+# ============================================================================
+# 🗜️ DATASET
+# ============================================================================
+
+class GroupedDataset(Mapping):
+    """
+    그룹 키 → GroupView (삽입 순서 = 그룹화 순서)
+
+    사용 예:
+        grouped = GroupedDataset.from_columns(keys, positions, display_columns, display_cols, emails, ...)
+        grouped['업체A']['rows'][0]['품목명']
+        {k: v for k, v in grouped.items() if v['recipient_email']}
+    """
+
+    def __init__(self, keys: List[str], columns: List[str], categories: List[np.ndarray],
+                 codes: np.ndarray, offsets: np.ndarray, emails: List[Optional[str]],
+                 totals: Optional[List[Dict[str, str]]], conflict_emails: List[List[str]],
+                 total_columns: Optional[List[str]] = None, total_values: Optional[np.ndarray] = None):
+        self.group_keys = keys
+        self.columns = columns
+        self.categories = categories
+        self.codes = codes
+        self.offsets = offsets
+        self.emails = emails
+        self.totals = totals
+        self.conflict_emails = conflict_emails
+        self.total_columns = list(total_columns) if total_columns is not None else []
+        self.total_values = (np.asarray(total_values, dtype=np.float64) if total_values is not None
+                             else np.full((len(keys), 0), np.nan))
+        self.tax_amounts: Dict[str, np.ndarray] = {}
+        self._index = {key: i for i, key in enumerate(keys)}
+
+    @classmethod
+    def from_columns(cls, keys: List[str], positions: SequenceType[np.ndarray],
+                     display_columns: List[np.ndarray], display_cols: List[str],
+                     emails: List[Optional[str]], totals: Optional[List[Dict[str, str]]] = None,
+                     conflict_emails: Optional[List[List[str]]] = None,
+                     total_columns: Optional[List[str]] = None,
+                     total_values: Optional[np.ndarray] = None) -> "GroupedDataset":
+        """
+        전체 행의 표시 문자열 컬럼 + 그룹별 행 위치로 생성
+
+        Args:
+            positions: 그룹별 행 위치 (표시 순서 - 합계 행은 맨 뒤)
+            display_columns: display_cols 순서의 표시 문자열 배열 (전체 행)
+            total_values: totals와 같은 합계의 숫자 값 (그룹 수 × total_columns)
+        """
+        lengths = np.fromiter((len(p) for p in positions), dtype=np.int64, count=len(positions))
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        order = (np.concatenate(positions).astype(np.intp, copy=False) if len(positions)
+                 else np.zeros(0, dtype=np.intp))
+
+        codes = np.empty((len(display_cols), len(order)), dtype=np.int32)
+        categories = []
+        for c, column in enumerate(display_columns):
+            codes[c], uniques = encode_column(column[order])
+            categories.append(uniques)
+        return cls(list(keys), list(display_cols), categories, codes, offsets, list(emails), totals,
+                   conflict_emails if conflict_emails is not None else [[] for _ in keys],
+                   total_columns, total_values)
+
+    @classmethod
+    def from_dict(cls, grouped: Dict[str, Dict[str, Any]],
+                  display_cols: Optional[List[str]] = None) -> "GroupedDataset":
+        """기존 구조(dict)에서 생성 - display_cols가 없으면 첫 행의 컬럼 순서"""
+        if display_cols is None:
+            first = next((g['rows'][0] for g in grouped.values() if g.get('rows')), {})
+            display_cols = list(first)
+        keys = list(grouped)
+        rows = [row for g in grouped.values() for row in g.get('rows', [])]
+        columns = [np.array([row.get(col, '') for row in rows], dtype=object) for col in display_cols]
+        positions, start = [], 0
+        for g in grouped.values():
+            n = len(g.get('rows', []))
+            positions.append(np.arange(start, start + n))
+            start += n
+        has_totals = any(g.get('totals') for g in grouped.values())
+        totals = [dict(g.get('totals') or {}) for g in grouped.values()] if has_totals else None
+        total_columns, total_values = parse_totals(totals) if totals is not None else (None, None)
+        return cls.from_columns(
+            keys, positions, columns, display_cols, [g.get('recipient_email') for g in grouped.values()],
+            totals, [list(g.get('conflict_emails') or []) for g in grouped.values()],
+            total_columns, total_values,
+        )
+
+    # ------------------------------------------------------------------
+    # Mapping
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key: str) -> GroupView:
+        return GroupView(self, self._index[key])
+
+    def __contains__(self, key) -> bool:
+        return key in self._index
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.group_keys)
+
+    def __len__(self) -> int:
+        return len(self.group_keys)
+
+    def __repr__(self) -> str:
+        return f"GroupedDataset({len(self.group_keys)} groups, {self.codes.shape[1]} rows, {len(self.columns)} cols)"
+
+    # ------------------------------------------------------------------
+    # Rows
+    # ------------------------------------------------------------------
+
+    def row_dicts(self, start: int, stop: int) -> List[Dict[str, str]]:
+        """전체 행 중 [start, stop) 구간을 행 dict 리스트로"""
+        if stop <= start:
+            return []
+        cells = [category[codes] for category, codes in zip(self.categories, self.codes[:, start:stop])]
+        columns = self.columns
+        return [dict(zip(columns, values)) for values in zip(*cells)]
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        """기존 구조 그대로 (그룹별 dict + 행 dict 리스트)"""
+        return {key: self[key].to_dict() for key in self.group_keys}
+
+    def tax_invoice_amounts(self, column: str) -> np.ndarray:
+        """
+        그룹별 세금계산서 발행 금액 (float64, 그룹 순서) - 컬럼당 한 번 계산 후 보관
+
+        금액은 그룹의 마지막 합계 행(어느 컬럼이든 '합계'가 들어간 행)의 column 값이고,
+        합계 행 값이 없거나 0이면 totals[column]을 사용합니다. 둘 다 없으면 0.
+        '합계' 포함 여부와 금액 파싱은 컬럼별 고유 문자열 표에서 한 번씩만 계산합니다.
+        """
+        cached = self.tax_amounts.get(column)
+        if cached is not None:
+            return cached
+        n_groups = len(self.group_keys)
+        amounts = np.zeros(n_groups)
+        if column in self.columns and self.row_total:
+            is_total_row = np.zeros(self.row_total, dtype=bool)
+            for category, codes in zip(self.categories, self.codes):
+                marked = pd.Series(category, dtype=object).astype(str).str.contains('합계', regex=False)
+                is_total_row |= marked.to_numpy(dtype=bool)[codes]
+            c = self.columns.index(column)
+            values = parse_amount_strings(self.categories[c])[self.codes[c]]
+            found = np.flatnonzero(is_total_row & ~np.isnan(values))
+            last = np.full(n_groups, -1, dtype=np.int64)
+            np.maximum.at(last, np.searchsorted(self.offsets, found, side='right') - 1, found)
+            has_row = last >= 0
+            amounts[has_row] = values[last[has_row]]
+        if self.totals is not None:
+            missing = np.flatnonzero(amounts == 0)
+            fallback = parse_amount_strings([self.totals[i].get(column) for i in missing])
+            amounts[missing] = np.nan_to_num(fallback, nan=0.0)
+        self.tax_amounts[column] = amounts
+        return amounts
+
+    @property
+    def row_total(self) -> int:
+        return int(self.codes.shape[1])
+
+    def nbytes(self) -> int:
+        """배열 + 고유 문자열 표의 대략적인 메모리 (그룹별 이메일/합계 제외)"""
+        import sys
+        strings = sum(sys.getsizeof(s) for category in self.categories for s in category)
+        return int(self.codes.nbytes + self.offsets.nbytes + self.total_values.nbytes
+                   + sum(a.nbytes for a in self.tax_amounts.values())
+                   + sum(c.nbytes for c in self.categories) + strings)
+
+
+def parse_amount_strings(values: SequenceType[Any]) -> np.ndarray:
+    """표시 문자열 금액("1,250,000", "3,000원") → float64 (빈 값이나 숫자로 읽을 수 없는 값은 NaN)"""
+    raw = pd.Series(values, dtype=object)
+    text = raw.astype(str).str.replace(',', '', regex=False).str.replace('원', '', regex=False).str.strip()
+    return pd.to_numeric(text.where(raw.notna()), errors='coerce').to_numpy(dtype=np.float64)
+
+
+def parse_totals(totals: List[Dict[str, Any]]) -> tuple:
+    """
+    표시 문자열 합계("1,250,000", "3,000원") → (합계 컬럼, float64 그룹 수 × 컬럼 수)
+
+    숫자 합계 없이 만든 grouped_data(dict)에만 사용합니다. 숫자로 읽을 수 없는 값은 NaN.
+    """
+    columns = list(dict.fromkeys(col for t in totals for col in t))
+    values = np.full((len(totals), len(columns)), np.nan)
+    for c, col in enumerate(columns):
+        values[:, c] = parse_amount_strings([t.get(col) for t in totals])
+    return columns, values
+
+
+def tax_invoice_amounts(grouped_data: Mapping, column: str) -> np.ndarray:
+    """모든 그룹의 세금계산서 발행 금액 (그룹 순서) - dict 구조는 GroupedDataset으로 변환 후 계산"""
+    dataset = grouped_data if isinstance(grouped_data, GroupedDataset) else GroupedDataset.from_dict(grouped_data)
+    return dataset.tax_invoice_amounts(column)
+
+
+# ============================================================================
+# 🔍 SANITY CHECK (발송 전 검증)
+# ============================================================================
+
+FINDING_MESSAGES = {
+    'zero_amount': "금액 0원 ({column})",
+    'no_email': "이메일 주소 없음",
+    'invalid_email': "이메일 형식 오류 ({email})",
+    'no_data': "데이터 행 없음",
+}
+
+
+def sanity_check(grouped_data: Mapping) -> pd.DataFrame:
+    """
+    발송 전 데이터 검증 - 모든 그룹을 배열 연산 한 번씩으로 판정
+
+    판정 항목:
+        zero_amount   : 금액 합계가 0 (합계 컬럼별, 숫자 합계가 있을 때만)
+        no_email      : 수신 이메일 없음
+        invalid_email : 수신 이메일 형식 오류
+        no_data       : 데이터 행 없음
+
+    Returns:
+        발견 항목 표 (group, type, column, message) - 그룹 순서, 그룹 안에서는 위 항목 순서.
+        문제가 없으면 빈 표.
+    """
+    dataset = grouped_data if isinstance(grouped_data, GroupedDataset) else GroupedDataset.from_dict(grouped_data)
+    emails = pd.Series(dataset.emails, dtype='string').str.strip()
+    has_email = emails.fillna('').ne('').to_numpy(dtype=bool)
+    valid_email = emails.str.match(EMAIL_PATTERN.pattern).fillna(False).to_numpy(dtype=bool)
+    row_counts = np.diff(dataset.offsets)
+
+    # (플래그, 종류, 컬럼) - 그룹 안에서는 이 순서 (합계 컬럼별 0원이 먼저)
+    checks = [(dataset.total_values[:, c] == 0, 'zero_amount', col)
+              for c, col in enumerate(dataset.total_columns)]
+    checks += [(~has_email, 'no_email', None),
+               (has_email & ~valid_email, 'invalid_email', None),
+               (row_counts == 0, 'no_data', None)]
+
+    hits = [np.flatnonzero(flags) for flags, _, _ in checks]
+    group_ids = np.concatenate(hits)
+    ranks = np.repeat(np.arange(len(checks)), [len(h) for h in hits])
+    order = np.lexsort((ranks, group_ids))
+    group_ids, ranks = group_ids[order], ranks[order]
+    kinds = np.array([kind for _, kind, _ in checks], dtype=object)[ranks]
+    columns = np.array([column for _, _, column in checks], dtype=object)[ranks]
+
+    # 메시지는 발견 항목에 대해서만 만듦 (이메일 형식 오류만 그룹마다 다름)
+    found_emails = np.asarray(dataset.emails, dtype=object)[group_ids]
+    messages = [FINDING_MESSAGES[kind].format(column=column, email=email)
+                for kind, column, email in zip(kinds, columns, found_emails)]
+    return pd.DataFrame({
+        'group': np.asarray(dataset.group_keys, dtype=object)[group_ids],
+        'type': pd.Categorical(kinds, categories=list(FINDING_MESSAGES)),
+        'column': columns,
+        'message': messages,
+    })
+
+
+# ============================================================================
+# 🧪 MODULE TEST (기존 dict 구조 대비 메모리 + 동일성)
+# ============================================================================
+
+if __name__ == "__main__":
+    import pickle
+    import sys
+    import time
+    import tracemalloc
+
+    # grouping_engine이 import한 모듈의 클래스와 비교 (이 파일은 __main__으로 실행됨)
+    from grouped_dataset import GroupedDataset, sanity_check, tax_invoice_amounts
+    from grouping_engine import group_data_with_wildcard
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rows_per_group = 40
+    n_groups = max(1, n_rows // (rows_per_group + 1))
+    print(f"=== Grouped Dataset Memory Benchmark ({n_groups:,} groups, "
+          f"{n_groups * (rows_per_group + 1):,} rows) ===")
+
+    records = []
+    for g in range(n_groups):
+        for r in range(rows_per_group):
+            records.append({"CSO관리업체명": f"업체{g:05d}", "거래처코드": f"H{g:05d}{r:02d}",
+                            "거래처명": f"거래처{g:05d}-{r:02d}", "품목명": f"품목{r % 30}",
+                            "처방액": f"{(r + 1) * 12_345:,}", "수수료율": "35%",
+                            "총 수수료액": f"{(r + 1) * 4_321:,}", "이메일": f"cso{g}@example.com"})
+        records.append({"CSO관리업체명": f"업체{g:05d} 합계", "거래처코드": None, "거래처명": None,
+                        "품목명": None, "처방액": None, "수수료율": None,
+                        "총 수수료액": f"{sum((r + 1) * 4_321 for r in range(rows_per_group)):,}",
+                        "이메일": None})
+    df = pd.DataFrame(records)
+    display_cols = list(df.columns)
+    del records
+
+    from grouping_engine import build_display_columns, partition_groups
+
+    def legacy_group(df):
+        """기존 구조 (그룹별 dict + 행마다 {컬럼명: 표시 문자열} dict)"""
+        partition = partition_groups(df, "CSO관리업체명", "이메일")
+        matrix = list(zip(*build_display_columns(df, display_cols)))
+        return {key: {'recipient_email': partition.emails[i],
+                      'rows': [dict(zip(display_cols, matrix[p])) for p in partition.positions[i]],
+                      'totals': {}, 'row_count': len(partition.positions[i]),
+                      'has_conflict': bool(partition.conflict_emails[i]),
+                      'conflict_emails': partition.conflict_emails[i]}
+                for i, key in enumerate(partition.keys)}
+
+    def build_dataset(df):
+        return group_data_with_wildcard(df, "CSO관리업체명", "이메일", ["총 수수료액"], [], display_cols,
+                                        calculate_totals=False)[0]
+
+    def retained(build):
+        """결과가 계속 들고 있는 메모리 (중간 결과는 해제된 뒤) + 소요 시간 (tracemalloc 없이 측정)"""
+        start = time.perf_counter()
+        build(df)
+        elapsed = time.perf_counter() - start
+        tracemalloc.start()
+        result = build(df)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return result, size, elapsed
+
+    legacy, legacy_bytes, legacy_time = retained(legacy_group)
+    grouped, dataset_bytes, build_time = retained(build_dataset)
+
+    assert isinstance(grouped, GroupedDataset) and len(grouped) == n_groups
+    assert grouped == legacy and legacy == grouped  # dict 모양 비교 (양방향)
+    assert list(grouped.keys()) == list(legacy) and dict(grouped).keys() == legacy.keys()
+    first = grouped["업체00000"]
+    assert first['rows'][-1]["총 수수료액"] == legacy["업체00000"]['rows'][-1]["총 수수료액"]
+    assert first['row_count'] == rows_per_group + 1 and first.get('totals') == {}
+    assert GroupedDataset.from_dict(legacy, display_cols) == legacy
+    assert pickle.loads(pickle.dumps(first)) == legacy["업체00000"]  # 워커로는 그룹 1개만 dict로 전송
+    assert type(pickle.loads(pickle.dumps(first))) is dict
+    legacy_rows = legacy["업체00000"]['rows']
+    for index in (0, 5, -1, -len(legacy_rows)):  # 인덱스/구간은 해당 행만 만듦
+        assert first['rows'][index] == legacy_rows[index]
+    for part in (slice(2, 6), slice(-3, None), slice(None, None, 2), slice(8, 3)):
+        assert first['rows'][part] == legacy_rows[part]
+    for index in (len(legacy_rows), -len(legacy_rows) - 1):
+        try:
+            first['rows'][index]
+            raise AssertionError(index)
+        except IndexError:
+            pass
+
+    print(f"  legacy dict rows     : {legacy_bytes / 1024 / 1024:8.1f}MB (build {legacy_time:.2f}s)")
+    print(f"  GroupedDataset       : {dataset_bytes / 1024 / 1024:8.1f}MB (build {build_time:.2f}s, "
+          f"nbytes {grouped.nbytes() / 1024 / 1024:.1f}MB)")
+    print(f"  Reduction            : {legacy_bytes / max(dataset_bytes, 1):.1f}x")
+
+    # 그룹 1개 읽기 (Step 3 표/렌더링) 비용
+    start = time.perf_counter()
+    for key in grouped.group_keys[:1000]:
+        list(grouped[key]['rows'])
+    per_group = (time.perf_counter() - start) / min(1000, n_groups)
+    print(f"  rows of one group    : {per_group * 1e6:.0f}µs ({rows_per_group + 1} rows)")
+
+    # 큰 그룹 1개 - 행 1개 읽기와 DataFrame 생성 (Step 3 표)
+    big = GroupedDataset.from_columns(["큰업체"], [np.arange(min(len(df), 20_000))],
+                                      [np.asarray(df[c].astype(str), dtype=object) for c in display_cols],
+                                      display_cols, ["big@example.com"])
+    big_rows = big["큰업체"]['rows']
+    start = time.perf_counter()
+    big_rows[0]
+    one_row = time.perf_counter() - start
+    start = time.perf_counter()
+    pd.DataFrame(list(big_rows))
+    frame_time = time.perf_counter() - start
+    print(f"  big group ({len(big_rows):,} rows) : rows[0] {one_row * 1e6:.0f}µs, "
+          f"DataFrame {frame_time * 1000:.1f}ms")
+
+    # 발송 전 검증 - 기존 그룹/합계 루프(문자열 재파싱)와 같은 판정 + 이메일 형식 오류
+
+    def legacy_sanity_check(grouped_data):
+        warnings = []
+        for group_name, data in grouped_data.items():
+            for col, val in (data.get('totals') or {}).items():
+                try:
+                    if float(str(val).replace(',', '').replace('원', '')) == 0:
+                        warnings.append((group_name, 'zero_amount', f"금액 0원 ({col})"))
+                except ValueError:
+                    pass
+            if not data.get('recipient_email'):
+                warnings.append((group_name, 'no_email', "이메일 주소 없음"))
+            if data.get('row_count', 0) == 0:
+                warnings.append((group_name, 'no_data', "데이터 행 없음"))
+        return warnings
+
+    checked = df.copy()
+    checked["총 수수료액"] = pd.to_numeric(checked["총 수수료액"].str.replace(',', ''))
+    checked.loc[checked["CSO관리업체명"] == "업체00003", "총 수수료액"] = 0
+    checked.loc[checked["CSO관리업체명"] == "업체00004", "이메일"] = None
+    checked.loc[checked["CSO관리업체명"] == "업체00005", "이메일"] = "cso5@example"
+    with_totals = group_data_with_wildcard(checked, "CSO관리업체명", "이메일", ["총 수수료액"], [],
+                                           display_cols)[0]
+    assert with_totals.total_columns == ["총 수수료액"] and with_totals.total_values.shape == (n_groups, 1)
+    findings = sanity_check(with_totals)
+    print(findings.head().to_string())
+    assert [tuple(r) for r in findings[['group', 'type', 'message']].itertuples(index=False)
+            if r.type != 'invalid_email'] == [
+        # 0원 합계는 표시 문자열이 빈칸이라 기존 루프는 놓쳤음 (숫자 합계로 판정)
+        ("업체00003", 'zero_amount', "금액 0원 (총 수수료액)"), ("업체00004", 'no_email', "이메일 주소 없음")]
+    assert findings.loc[findings['type'] == 'invalid_email', 'group'].tolist() == ["업체00005"]
+
+    # 숫자 합계 없이 만든 dict 구조 - 표시 문자열을 한 번에 파싱해서 같은 판정
+    legacy_groups = {f"그룹{i}": {'recipient_email': None if i % 7 == 0 else f"g{i}@example.com",
+                                 'rows': [] if i % 11 == 0 else [{'금액': '1,000'}],
+                                 'row_count': 0 if i % 11 == 0 else 1,
+                                 'totals': {'금액': '0원' if i % 5 == 0 else f"{i * 1_000:,}원", '비고': 'N/A'}}
+                     for i in range(1, 5_001)}
+    expected = legacy_sanity_check(legacy_groups)
+    findings = sanity_check(legacy_groups)
+    assert [tuple(r) for r in findings[['group', 'type', 'message']].itertuples(index=False)] == expected
+    assert sanity_check({}).empty
+
+    dataset = GroupedDataset.from_dict(legacy_groups)
+    start = time.perf_counter()
+    legacy_sanity_check(dataset)
+    legacy_check_time = time.perf_counter() - start
+    start = time.perf_counter()
+    sanity_check(dataset)
+    check_time = time.perf_counter() - start
+    print(f"  sanity check (5,000) : {check_time * 1000:.1f}ms (legacy loop {legacy_check_time * 1000:.1f}ms, "
+          f"{len(expected)} findings)")
+
+    # 세금계산서 발행 금액 - 모든 그룹을 한 번에 계산 (기존: 그룹마다 행 × 컬럼 문자열 검사)
+    from email_template import render_tax_invoice_html, tax_invoice_amount
+
+    def legacy_tax_html(group_key, group_data, col):
+        # 기존 행 스캔 경로 (dict는 미리 계산한 값이 없으면 행을 훑음)
+        return render_tax_invoice_html(group_key, {k: v for k, v in group_data.items() if k != 'tax_amounts'}, col)
+
+    amounts = tax_invoice_amounts(with_totals, "총 수수료액")
+    assert with_totals.tax_amounts["총 수수료액"] is amounts
+    for key in list(with_totals)[:200]:
+        legacy = with_totals[key].to_dict()
+        assert tax_invoice_amount(legacy, "총 수수료액") == with_totals[key].tax_amount("총 수수료액")
+        assert render_tax_invoice_html(key, with_totals[key], "총 수수료액") == legacy_tax_html(key, legacy, "총 수수료액")
+    assert (amounts > 0).all()  # 모든 업체에 합계 행 금액이 있음
+    shipped = pickle.loads(pickle.dumps(with_totals["업체00001"]))  # 워커로는 계산한 금액도 함께 전송
+    assert shipped['tax_amounts'] == {"총 수수료액": amounts[1]}
+
+    # 합계 행 없는 그룹은 totals, 합계 행이 여러 개면 마지막 값 (dict 구조도 같은 결과)
+    tax_groups = {f"그룹{i}": {'recipient_email': f"g{i}@example.com",
+                               'rows': [{'구분': '상품', '금액': f"{i:,}"}]
+                               + ([{'구분': '소계 합계', '금액': '1,000원'}, {'구분': '합계', '금액': f"{i * 10:,}"}]
+                                  if i % 3 == 0 else []),
+                               'row_count': 1 + 2 * (i % 3 == 0),
+                               'totals': {'금액': '' if i % 4 == 0 else f"{i * 100:,}"}}
+                  for i in range(5_000)}
+    amounts = tax_invoice_amounts(tax_groups, '금액')
+    assert amounts.tolist() == [tax_invoice_amount(g, '금액') for g in tax_groups.values()]
+    assert tax_invoice_amounts({}, '금액').shape == (0,)
+
+    dataset = GroupedDataset.from_dict(tax_groups)
+    start = time.perf_counter()
+    legacy_html = [legacy_tax_html(k, g, '금액') for k, g in tax_groups.items()]
+    legacy_tax_time = time.perf_counter() - start
+    start = time.perf_counter()
+    html = [render_tax_invoice_html(k, dataset[k], '금액') for k in dataset]
+    tax_time = time.perf_counter() - start
+    assert html == legacy_html
+    print(f"  tax invoice (5,000)  : {tax_time * 1000:.1f}ms incl. amounts (legacy row scan "
+          f"{legacy_tax_time * 1000:.1f}ms)")
+
+    print("\n✅ Grouped dataset matches legacy structure!")
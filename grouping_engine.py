@@ -0,0 +1,396 @@
+"""
+================================================================================
+🧮 Columnar Grouping Engine
+================================================================================
+그룹화 결과(rows)의 표시 문자열을 컬럼 단위로 한 번에 계산합니다.
+
+기존에는 그룹마다 iterrows()로 행을 돌며 셀마다 원본 문자열을 조회했기
+때문에 (행 수 × 컬럼 수)만큼 Python 루프가 돌았습니다. 이 모듈은 전체
+DataFrame에 대해 컬럼별 마스크로 표시 문자열 컬럼을 한 번 만들고,
+그룹화 단계에서는 그룹의 행 위치 순서로 열 단위 GroupedDataset에 담습니다
+(grouped_dataset.py - 행마다 dict를 만들지 않음).
+
+표시 규칙 (기존 동작과 완전히 동일):
+1. NaN/None → 빈칸
+2. 숫자 0 → 빈칸
+3. 엑셀 원본 문자열이 있으면 원본 그대로 (원본이 '0', 'nan' 등이면 빈칸)
+4. 원본이 없으면 값 그대로 변환 (정수형 float은 소수점 제거, 콤마 없음)
+
+와일드카드 그룹화(group_data_with_wildcard)도 이 모듈에 있어 Streamlit
+화면과 CLI 배치 실행이 같은 그룹화 로직을 사용합니다.
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Dict, List, Optional
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from frame_lineage import ORIGINAL_STR_ATTR, original_text_frame
+from grouped_dataset import GroupedDataset
+
+
+# 원본 문자열이 이 값이면 빈칸 처리
+ORIGINAL_BLANK_VALUES = frozenset(['nan', 'none', 'nat', '', '0', '0.0', '0.00'])
+# 원본이 없을 때 값 문자열이 이 값이면 빈칸 처리
+VALUE_BLANK_VALUES = frozenset(['nan', 'none', 'nat', '', '0', '0.0'])
+
+
+# ============================================================================
+# 🔣 CELL FALLBACK (원본 문자열이 없는 셀)
+# ============================================================================
+
+def _value_to_display(value) -> str:
+    """원본 문자열이 없는 셀의 표시 문자열 (NaN/0은 이미 걸러진 상태)"""
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and value == int(value):
+            return str(int(value))
+        return str(value)
+
+    str_val = str(value).strip()
+    if str_val.lower() in VALUE_BLANK_VALUES:
+        return ''
+    return str_val
+
+
+# ============================================================================
+# 📐 DISPLAY COLUMNS
+# ============================================================================
+
+def _align_original(original_str_df: Optional[pd.DataFrame], index: pd.Index,
+                    columns: List[str]) -> Optional[pd.DataFrame]:
+    """
+    원본 문자열 DataFrame(또는 OriginalText)을 데이터 행 인덱스에 맞춰 정렬합니다.
+    중복 인덱스 라벨은 원본 조회가 불가능하므로(기존 .loc 조회와 동일) 제외합니다.
+    """
+    if original_str_df is None:
+        return None
+
+    cols = [c for c in columns if c in original_str_df.columns]
+    if not cols:
+        return None
+
+    orig = original_text_frame(original_str_df, cols)
+    if not orig.index.is_unique:
+        orig = orig[~orig.index.duplicated(keep=False)]
+    return orig.reindex(index=index)
+
+
+def _normalize_original(original: pd.Series):
+    """
+    원본 문자열 컬럼의 str(v).strip() 결과와 마스크를 계산합니다.
+    문자열 컬럼은 고유값 단위로만 변환하여 행 수만큼 Python 루프를 돌지 않습니다.
+
+    Returns:
+        (정리된 문자열 배열, 빈 문자열/결측 마스크, 빈칸 처리 대상 마스크)
+    """
+    if pd.api.types.is_string_dtype(original.dtype):
+        codes, uniques = pd.factorize(original)
+        stripped = np.array([str(u).strip() for u in np.asarray(uniques, dtype=object)] + [''], dtype=object)
+        empty = stripped == ''
+        blank = np.array([v.lower() in ORIGINAL_BLANK_VALUES for v in stripped], dtype=bool)
+        return stripped[codes], empty[codes], blank[codes]
+
+    notna = original.notna().to_numpy()
+    stripped = np.array([str(v).strip() if ok else '' for v, ok in zip(original.to_numpy(dtype=object), notna)],
+                        dtype=object)
+    empty = stripped == ''
+    blank = np.array([v.lower() in ORIGINAL_BLANK_VALUES for v in stripped], dtype=bool)
+    return stripped, empty, blank
+
+
+def display_column(values: pd.Series, original: Optional[pd.Series] = None) -> np.ndarray:
+    """
+    한 컬럼 전체의 표시 문자열 배열을 계산합니다.
+
+    Args:
+        values: 데이터 컬럼 (clean_dataframe 이후 값)
+        original: 같은 행 순서로 정렬된 엑셀 원본 문자열 컬럼 (없으면 None)
+
+    Returns:
+        표시 문자열 object 배열
+    """
+    n = len(values)
+    out = np.full(n, '', dtype=object)
+    if n == 0:
+        return out
+
+    is_na = values.isna().to_numpy()
+    objects = None
+
+    # 숫자 0 마스크 (문자열 컬럼은 0이 될 수 없음)
+    if values.dtype.kind in 'biuf':
+        is_zero = (values.to_numpy() == 0) & ~is_na
+    elif pd.api.types.is_string_dtype(values.dtype):
+        is_zero = np.zeros(n, dtype=bool)
+    else:
+        objects = values.astype(object).to_numpy()
+        is_zero = np.fromiter(
+            (isinstance(v, (int, float)) and v == 0 for v in objects),
+            dtype=bool, count=n
+        ) & ~is_na
+
+    pending = ~(is_na | is_zero)
+
+    # 원본 문자열 우선
+    if original is not None:
+        orig_values, orig_empty, orig_blank = _normalize_original(original)
+        has_orig = pending & ~orig_empty
+
+        use_orig = has_orig & ~orig_blank
+        out[use_orig] = orig_values[use_orig]
+        pending &= ~has_orig
+
+    # 원본 없는 셀만 개별 변환
+    if pending.any():
+        # iterrows()가 돌려주던 값과 동일한 Python 객체 (Timestamp, int, float, str ...)
+        if objects is None:
+            objects = values.astype(object).to_numpy()
+        positions = np.flatnonzero(pending)
+        out[positions] = [_value_to_display(v) for v in objects[positions]]
+
+    return out
+
+
+def build_display_columns(df: pd.DataFrame, display_cols: List[str],
+                          original_str_df: Optional[pd.DataFrame] = None,
+                          column_cache: Optional[Dict[str, np.ndarray]] = None) -> List[np.ndarray]:
+    """
+    전체 행의 표시 문자열을 컬럼별로 만듭니다.
+
+    Args:
+        column_cache: 컬럼명 → 표시 문자열 배열. 주어지면 있는 컬럼은 재사용하고
+            새로 계산한 컬럼을 채워 넣습니다 (같은 df에 대해서만 사용).
+
+    Returns:
+        display_cols 순서의 표시 문자열 배열 리스트 - 각 배열은 행 위치(0..n-1) 순서
+    """
+    n = len(df)
+    cache = column_cache if column_cache is not None else {}
+    missing = [c for c in display_cols if c not in cache]
+    orig_aligned = _align_original(original_str_df, df.index, missing) if missing else None
+
+    columns = []
+    for col in display_cols:
+        if col not in cache:
+            if col not in df.columns:
+                cache[col] = np.full(n, '', dtype=object)
+            else:
+                original = orig_aligned[col] if orig_aligned is not None and col in orig_aligned.columns else None
+                cache[col] = display_column(df[col], original)
+        columns.append(cache[col])
+    return columns
+
+
+def total_row_flags(values: pd.Series, suffixes: List[str]) -> pd.Series:
+    """
+    합계 행 여부 (str(값)이 접미사로 끝나면 1, 아니면 0) - 그룹 내 정렬 키로 사용
+
+    Returns:
+        values와 같은 인덱스의 int64 Series
+    """
+    def is_total(value) -> bool:
+        return any(str(value).endswith(s) for s in suffixes)
+
+    if pd.api.types.is_string_dtype(values.dtype):
+        # 문자열 컬럼: 고유값 단위로만 판정 (결측값은 개별 판정)
+        codes, uniques = pd.factorize(values)
+        unique_flags = np.array([is_total(u) for u in np.asarray(uniques, dtype=object)] + [False], dtype=bool)
+        flags = unique_flags[codes]
+        for p in np.flatnonzero(codes < 0):
+            flags[p] = is_total(values.iloc[p])
+    else:
+        flags = np.array([is_total(v) for v in values.astype(object)], dtype=bool)
+
+    return pd.Series(flags.astype('int64'), index=values.index)
+
+
+# ============================================================================
+# 🗂️ WILDCARD GROUPING
+# ============================================================================
+
+@dataclass
+class GroupPartition:
+    """
+    그룹 분할 결과 - 그룹 키 컬럼/이메일/와일드카드 설정에만 의존
+
+    표시 컬럼 순서, 합계 자동 계산 여부가 바뀌어도 그대로 재사용할 수 있습니다.
+    """
+    keys: List[str] = field(default_factory=list)
+    positions: List[np.ndarray] = field(default_factory=list)      # 그룹 행 위치 (합계 행은 맨 뒤)
+    sum_positions: List[np.ndarray] = field(default_factory=list)  # 합산 대상 행 위치 (합계 행 제외)
+    emails: List[Optional[str]] = field(default_factory=list)
+    conflict_emails: List[List[str]] = field(default_factory=list)
+    conflicts: List[Dict] = field(default_factory=list)
+
+
+@dataclass
+class GroupTotals:
+    """
+    그룹별 금액 합계 - 숫자(발송 전 검증 등 계산용) + 표시 문자열(메일 본문 합계 행)
+
+    values[i, c] = 그룹 i의 columns[c] 합계 (숫자로 합산할 수 없는 컬럼은 NaN)
+    """
+    columns: List[str]
+    values: np.ndarray
+    formatted: List[Dict[str, str]]
+
+
+def partition_groups(df, group_key_col, email_col, conflict_resolution='first', use_wildcard=True,
+                     wildcard_suffixes=None) -> GroupPartition:
+    """와일드카드 그룹 분할 + 그룹별 수신 이메일 결정"""
+    if wildcard_suffixes is None:
+        wildcard_suffixes = [" 합계"]
+    
+    partition = GroupPartition()
+    
+    def get_base_key(val):
+        val_str = str(val).strip()
+        for suffix in wildcard_suffixes:
+            if val_str.endswith(suffix):
+                return val_str[:-len(suffix)].strip()
+        return val_str
+    
+    key_names = None
+    if use_wildcard:
+        # 기본 키는 고유값 단위로만 계산하고 프레임에 컬럼을 추가하지 않음
+        # (정렬된 기본 키 번호로 groupby - 기본 키 문자열 정렬 순서와 같음)
+        key_values = df[group_key_col]
+        codes, uniques = pd.factorize(key_values, use_na_sentinel=False)
+        base_keys = np.array([get_base_key(v) for v in np.asarray(uniques, dtype=object)], dtype=object)
+        key_names, base_codes = np.unique(base_keys, return_inverse=True)
+        group_keys = pd.Series(base_codes.reshape(-1)[codes], index=df.index)
+        total_flags = total_row_flags(key_values, wildcard_suffixes).to_numpy()
+    else:
+        group_keys = df[group_key_col]
+    
+    # 그룹 순회는 이메일(또는 키) 컬럼 하나만 잘라서 수행 - 그룹마다 전체 컬럼을 복사하지 않음
+    has_email_col = bool(email_col) and email_col in df.columns
+    grouped = (df[email_col] if has_email_col else group_keys).groupby(group_keys)
+    group_positions = grouped.indices
+    
+    for base_key, group_emails in grouped:
+        base_key_str = str(key_names[base_key] if key_names is not None else base_key)
+        if not base_key_str or base_key_str.lower() in ['nan', 'none', '(비어 있음)']:
+            continue
+        
+        # 이메일 컬럼 존재 여부 확인
+        if has_email_col:
+            unique_emails = [str(e).strip() for e in group_emails.dropna().unique()
+                            if str(e).strip() and str(e).strip().lower() not in ['nan', 'none', '']]
+        else:
+            unique_emails = []
+        
+        has_conflict = len(unique_emails) > 1
+        if len(unique_emails) == 0:
+            recipient_email = None
+        elif len(unique_emails) == 1:
+            recipient_email = unique_emails[0]
+        else:
+            if conflict_resolution == 'first':
+                recipient_email = unique_emails[0]
+            elif conflict_resolution == 'most_common' and has_email_col:
+                recipient_email = str(group_emails.value_counts().index[0])
+            else:
+                recipient_email = unique_emails[0] if unique_emails else None
+            partition.conflicts.append({'group_key': base_key_str, 'emails': unique_emails,
+                                        'selected': recipient_email})
+        
+        # 그룹 내 행 위치 (합계 행은 맨 뒤로 정렬)
+        positions = group_positions[base_key]
+        if use_wildcard:
+            order = pd.Series(total_flags[positions]).sort_values().index.to_numpy()
+            positions = positions[order]
+            # 와일드카드 사용 시: 합계 행을 제외한 데이터만 합산
+            sum_positions = positions[total_flags[positions] == 0]
+        else:
+            # 와일드카드 미사용 시: 전체 데이터 합산
+            sum_positions = positions
+        
+        partition.keys.append(base_key_str)
+        partition.positions.append(positions)
+        partition.sum_positions.append(sum_positions)
+        partition.emails.append(recipient_email)
+        partition.conflict_emails.append(unique_emails if has_conflict else [])
+    
+    return partition
+
+
+def compute_group_totals(df, partition: GroupPartition, amount_cols) -> GroupTotals:
+    """
+    그룹별 금액 합계 (합계 자동 계산이 켜진 경우에만 사용)
+
+    숫자 컬럼은 컬럼마다 bincount 한 번으로 모든 그룹을 합산합니다 (NaN은 0으로, Series.sum과 동일).
+    숫자 합계는 표시 문자열과 함께 보관해 검증 단계에서 문자열을 다시 파싱하지 않습니다.
+    """
+    n_groups = len(partition.keys)
+    columns = [col for col in amount_cols if col in df.columns]
+    all_totals: List[Dict[str, str]] = [{} for _ in range(n_groups)]
+    values = np.full((n_groups, len(columns)), np.nan)
+    if n_groups == 0:
+        return GroupTotals(columns, values, all_totals)
+
+    lengths = [len(p) for p in partition.sum_positions]
+    flat = np.concatenate(partition.sum_positions).astype(np.intp, copy=False)
+    group_ids = np.repeat(np.arange(n_groups), lengths)
+
+    for c, col in enumerate(columns):
+        column = df[col]
+        if column.dtype.kind in 'biuf':
+            weights = np.nan_to_num(column.to_numpy(dtype=float, na_value=np.nan)[flat])
+            sums = np.bincount(group_ids, weights=weights, minlength=n_groups)
+            values[:, c] = sums
+        else:
+            sums = [column.iloc[p].sum() for p in partition.sum_positions]
+            values[:, c] = pd.to_numeric(pd.Series(sums, dtype=object), errors='coerce')
+        for totals, total_val in zip(all_totals, sums):
+            totals[col] = f"{total_val:,.0f}" if total_val != 0 else ''
+    return GroupTotals(columns, values, all_totals)
+
+
+def assemble_groups(partition: GroupPartition, display_columns: List[np.ndarray], display_cols,
+                    totals: Optional[GroupTotals] = None,
+                    tax_amount_col: Optional[str] = None) -> GroupedDataset:
+    """
+    분할 결과 + 표시 문자열 컬럼 → grouped_data (GroupedDataset, 기존 dict 모양으로 읽힘)
+    
+    totals가 None이면(합계 자동 계산 꺼짐) 모든 그룹의 totals는 빈 딕셔너리입니다.
+    tax_amount_col을 주면 그룹별 세금계산서 발행 금액을 여기서 한 번에 계산해 둡니다.
+    """
+    # ============================================================
+    # 엑셀 원본 형식 완전 유지 + NaN/0만 빈칸 처리
+    # - 엑셀에서 콤마 있으면 콤마 그대로
+    # - 바코드/코드 등 콤마 없는 숫자는 그대로
+    # 표시 문자열은 전체 행에 대해 미리 계산됨 → 그룹 행 위치 순서로 열 단위 보관
+    # ============================================================
+    grouped = GroupedDataset.from_columns(
+        partition.keys, partition.positions, display_columns, list(display_cols),
+        partition.emails, [dict(t) for t in totals.formatted] if totals is not None else None,
+        [list(emails) for emails in partition.conflict_emails],
+        total_columns=list(totals.columns) if totals is not None else None,
+        total_values=totals.values if totals is not None else None,
+    )
+    if tax_amount_col:
+        grouped.tax_invoice_amounts(tax_amount_col)
+    return grouped
+
+
+def group_data_with_wildcard(df, group_key_col, email_col, amount_cols, percent_cols, display_cols,
+                             conflict_resolution='first', use_wildcard=True,
+                             wildcard_suffixes=None, calculate_totals=True, tax_amount_col=None):
+    """와일드카드 그룹화 (분할 → 표시 문자열 → 합계 → 조립)"""
+    partition = partition_groups(df, group_key_col, email_col, conflict_resolution,
+                                 use_wildcard, wildcard_suffixes)
+    
+    # 표시 문자열을 전체 행에 대해 한 번만 계산 (컬럼 단위 벡터 연산)
+    # attrs의 원본 문자열 DataFrame은 그룹 슬라이스마다 deepcopy되므로 분리해서 사용
+    display_columns = build_display_columns(df, display_cols, df.attrs.get(ORIGINAL_STR_ATTR, None))
+    
+    # calculate_totals가 False이면 totals는 빈 딕셔너리 유지 (합계 행 표시 안함)
+    totals = compute_group_totals(df, partition, amount_cols) if calculate_totals else None
+    
+    return assemble_groups(partition, display_columns, display_cols, totals, tax_amount_col), partition.conflicts
@@ -0,0 +1,725 @@
+"""
+================================================================================
+🗃️ History Database Layer
+================================================================================
+발송 이력 DB(mail_history.db) 연결 관리 계층
+
+기존에는 init_database / save_send_history / get_send_history / get_statistics가
+호출될 때마다 sqlite3.connect()로 새 연결을 열었고, 스키마 생성도 화면이
+그려질 때마다 반복되었으며, 이력 저장은 행마다 cursor.execute()를 호출했습니다.
+
+이 모듈의 원칙:
+1. 연결 재사용 - 스레드별 연결 1개 (발송 워커 스레드와 화면 스레드가 각자 사용)
+2. WAL 저널 - 발송 중 기록(쓰기)과 이력 조회(읽기)가 서로 막지 않음
+3. 스키마 초기화는 DB 파일당 한 번만 수행
+4. 일괄 저장은 executemany + 단일 트랜잭션
+5. 통계는 요약 테이블(기간/상태/업체별 건수)을 저장과 같은 트랜잭션에서 갱신
+   → 대시보드 통계 조회 비용이 이력 크기와 무관
+6. 업체명/이메일 검색은 FTS5 trigram 그림자 인덱스(트리거로 동기화) 사용
+   → '%키워드%' LIKE 전체 스캔 대신 인덱스 조회, 한글 부분 일치 지원
+7. 이력 목록은 (timestamp, id) 커서 기반 페이지네이션, 내보내기는 청크 단위 스트리밍
+   → 깊은 페이지도 일정한 속도, 1년치 내보내기도 DataFrame 하나로 모으지 않음
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+import csv
+import io
+import sqlite3
+import threading
+
+import pandas as pd
+
+
+# 이력 저장 시 컬럼 순서 (send_results 행 → send_history 컬럼)
+HISTORY_INSERT_SQL = '''
+    INSERT INTO send_history (period, company_name, recipient_email, subject, status, reason, row_count)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+# 요약 테이블에서 "전체 기간"을 나타내는 키
+ALL_PERIODS = '*'
+
+STATUS_STATS_UPSERT_SQL = '''
+    INSERT INTO history_stats_status (period, status, cnt) VALUES (?, ?, ?)
+    ON CONFLICT (period, status) DO UPDATE SET cnt = cnt + excluded.cnt
+'''
+COMPANY_STATS_UPSERT_SQL = '''
+    INSERT INTO history_stats_company (period, company_name, cnt) VALUES (?, ?, ?)
+    ON CONFLICT (period, company_name) DO UPDATE SET cnt = cnt + excluded.cnt
+'''
+
+# 요약 테이블 형식이 바뀌면 올려서 재구축
+STATS_VERSION = '1'
+
+
+# 전문 검색 인덱스 (FTS5 trigram) - 형식이 바뀌면 올려서 재구축
+SEARCH_VERSION = '1'
+
+# trigram 인덱스는 3글자 이상 검색어에만 사용 가능 (더 짧으면 LIKE로 대체)
+SEARCH_MIN_CHARS = 3
+
+# 검색 순위 가중치 (bm25: company_name, recipient_email)
+SEARCH_WEIGHTS = (2.0, 1.0)
+
+
+# 이력 페이지 커서 - 페이지 마지막 행의 (timestamp, id)
+HistoryCursor = Tuple[str, int]
+
+# 내보내기 청크 크기 (행) 및 컬럼 (DB 컬럼 → 파일 헤더)
+EXPORT_CHUNK_SIZE = 5_000
+HISTORY_EXPORT_COLUMNS = {
+    'id': 'ID',
+    'timestamp': '발송시간',
+    'period': '정산월',
+    'company_name': '업체명',
+    'recipient_email': '수신이메일',
+    'subject': '제목',
+    'status': '상태',
+    'reason': '사유',
+    'row_count': '행수',
+}
+
+# xlsx 시트당 최대 행 수 (헤더 포함) - 넘으면 다음 시트로
+XLSX_MAX_ROWS = 1_048_576
+
+
+def fts_phrase(text: str) -> str:
+    """검색어 → FTS5 구문 문자열 (따옴표로 감싸 연산자/특수문자 무력화)"""
+    return '"' + text.replace('"', '""') + '"'
+
+
+def history_params(results: Iterable[dict], period: str) -> Iterator[tuple]:
+    """send_results 형식 행 → INSERT 파라미터 튜플"""
+    for r in results:
+        yield (
+            period,
+            r.get('그룹', ''),
+            r.get('이메일', ''),
+            r.get('subject', ''),
+            r.get('상태', ''),
+            r.get('사유', ''),
+            r.get('row_count', 0),
+        )
+
+
+class HistoryDB:
+    """
+    mail_history.db 연결 관리자
+
+    - connection(): 현재 스레드 전용 연결 (처음 호출 시 생성, WAL/PRAGMA 설정)
+    - transaction(): BEGIN IMMEDIATE ~ COMMIT/ROLLBACK 컨텍스트
+    - ensure_schema(): 기본 스키마 + 등록된 스키마 훅을 한 번만 실행
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self.search_enabled = False
+        self._schema_hooks: List[Callable[[sqlite3.Connection], None]] = []
+
+    # ------------------------------------------------------------------------
+    # 연결
+    # ------------------------------------------------------------------------
+
+    def connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: 트랜잭션은 transaction()에서 명시적으로 관리
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=30000')
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """쓰기 트랜잭션 - 블록이 정상 종료되면 COMMIT, 예외면 ROLLBACK"""
+        conn = self.connection()
+        if conn.in_transaction:
+            # 중첩 호출은 바깥 트랜잭션에 합류
+            yield conn
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def close(self) -> None:
+        """현재 스레드의 연결 닫기"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    # ------------------------------------------------------------------------
+    # 스키마
+    # ------------------------------------------------------------------------
+
+    def add_schema(self, hook: Callable[[sqlite3.Connection], None]) -> None:
+        """추가 테이블 생성 훅 등록 (ensure_schema 때 같은 트랜잭션에서 실행)"""
+        with self._schema_lock:
+            self._schema_hooks.append(hook)
+            if self._schema_ready:
+                with self.transaction() as conn:
+                    hook(conn)
+
+    def ensure_schema(self) -> None:
+        """스키마 생성 - 인스턴스당 한 번만 실행 (이후 호출은 즉시 반환)"""
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            with self.transaction() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS send_history (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                        period TEXT,
+                        company_name TEXT,
+                        company_code TEXT,
+                        recipient_email TEXT,
+                        subject TEXT,
+                        status TEXT,
+                        reason TEXT,
+                        row_count INTEGER,
+                        total_amount TEXT,
+                        created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                    )
+                ''')
+                # 인덱스 생성 (빠른 조회용)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_period ON send_history(period)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_company ON send_history(company_name)')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_timestamp ON send_history(timestamp)')
+                # 기간 필터 + 최신순 커서 페이지네이션용 (인덱스 항목에 id(rowid) 포함)
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_period_timestamp ON send_history(period, timestamp)')
+                self._create_stats_tables(conn)
+                self.search_enabled = self._create_search_index(conn)
+                for hook in self._schema_hooks:
+                    hook(conn)
+            self._schema_ready = True
+
+    @staticmethod
+    def _create_stats_tables(conn: sqlite3.Connection) -> None:
+        """통계 요약 테이블 생성 - 처음 만들 때(또는 형식 변경 시) 기존 이력으로 재구축"""
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS history_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS history_stats_status (
+                period TEXT NOT NULL,
+                status TEXT NOT NULL,
+                cnt INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, status)
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS history_stats_company (
+                period TEXT NOT NULL,
+                company_name TEXT NOT NULL,
+                cnt INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (period, company_name)
+            )
+        ''')
+        # Top 10 업체 조회용 (기간 내 건수 내림차순)
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_stats_company_rank '
+                     'ON history_stats_company(period, cnt DESC)')
+
+        row = conn.execute("SELECT value FROM history_meta WHERE key = 'stats_version'").fetchone()
+        if row and row[0] == STATS_VERSION:
+            return
+
+        # 기존 이력으로 요약 재구축 (1회)
+        conn.execute('DELETE FROM history_stats_status')
+        conn.execute('DELETE FROM history_stats_company')
+        for period_expr in ("COALESCE(period, '')", "?"):
+            params = () if period_expr != "?" else (ALL_PERIODS,)
+            conn.execute(f'''
+                INSERT INTO history_stats_status (period, status, cnt)
+                SELECT {period_expr}, COALESCE(status, ''), COUNT(*) FROM send_history GROUP BY 1, 2
+            ''', params)
+            conn.execute(f'''
+                INSERT INTO history_stats_company (period, company_name, cnt)
+                SELECT {period_expr}, COALESCE(company_name, ''), COUNT(*) FROM send_history GROUP BY 1, 2
+            ''', params)
+        conn.execute("INSERT OR REPLACE INTO history_meta (key, value) VALUES ('stats_version', ?)",
+                     (STATS_VERSION,))
+
+    @staticmethod
+    def _create_search_index(conn: sqlite3.Connection) -> bool:
+        """
+        업체명/이메일 전문 검색 인덱스 생성 (send_history의 외부 콘텐츠 FTS5 테이블)
+
+        INSERT/UPDATE/DELETE 트리거로 send_history와 같은 트랜잭션에서 동기화됩니다.
+        SQLite에 FTS5 trigram 토크나이저가 없으면(3.34 미만) False를 반환하고
+        검색은 LIKE로 대체됩니다.
+        """
+        try:
+            conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS send_history_fts USING fts5(
+                    company_name, recipient_email,
+                    content='send_history', content_rowid='id',
+                    tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError:
+            return False
+
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS send_history_fts_ai AFTER INSERT ON send_history BEGIN
+                INSERT INTO send_history_fts (rowid, company_name, recipient_email)
+                VALUES (new.id, new.company_name, new.recipient_email);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS send_history_fts_ad AFTER DELETE ON send_history BEGIN
+                INSERT INTO send_history_fts (send_history_fts, rowid, company_name, recipient_email)
+                VALUES ('delete', old.id, old.company_name, old.recipient_email);
+            END
+        ''')
+        conn.execute('''
+            CREATE TRIGGER IF NOT EXISTS send_history_fts_au
+            AFTER UPDATE OF company_name, recipient_email ON send_history BEGIN
+                INSERT INTO send_history_fts (send_history_fts, rowid, company_name, recipient_email)
+                VALUES ('delete', old.id, old.company_name, old.recipient_email);
+                INSERT INTO send_history_fts (rowid, company_name, recipient_email)
+                VALUES (new.id, new.company_name, new.recipient_email);
+            END
+        ''')
+
+        row = conn.execute("SELECT value FROM history_meta WHERE key = 'search_version'").fetchone()
+        if not (row and row[0] == SEARCH_VERSION):
+            # 기존 이력으로 인덱스 재구축 (1회)
+            conn.execute("INSERT INTO send_history_fts (send_history_fts) VALUES ('rebuild')")
+            conn.execute("INSERT OR REPLACE INTO history_meta (key, value) VALUES ('search_version', ?)",
+                         (SEARCH_VERSION,))
+        return True
+
+    def _uses_search_index(self, text: str) -> bool:
+        return self.search_enabled and len(text) >= SEARCH_MIN_CHARS
+
+    # ------------------------------------------------------------------------
+    # 이력 저장 / 조회
+    # ------------------------------------------------------------------------
+
+    def insert_history(self, results: Iterable[dict], period: Optional[str] = None) -> int:
+        """발송 결과 일괄 저장 (executemany, 단일 트랜잭션) - 저장한 행 수 반환"""
+        if not period:
+            period = datetime.now().strftime('%Y년 %m월')
+        self.ensure_schema()
+        params = list(history_params(results, period))
+        if not params:
+            return 0
+        # 요약 테이블 증분 (기간별 + 전체)
+        status_counts: Counter = Counter()
+        company_counts: Counter = Counter()
+        for p in params:
+            period_key, company, status = p[0] or '', p[1] or '', p[4] or ''
+            status_counts[(period_key, status)] += 1
+            status_counts[(ALL_PERIODS, status)] += 1
+            company_counts[(period_key, company)] += 1
+            company_counts[(ALL_PERIODS, company)] += 1
+
+        with self.transaction() as conn:
+            conn.executemany(HISTORY_INSERT_SQL, params)
+            conn.executemany(STATUS_STATS_UPSERT_SQL, [(*k, n) for k, n in status_counts.items()])
+            conn.executemany(COMPANY_STATS_UPSERT_SQL, [(*k, n) for k, n in company_counts.items()])
+        return len(params)
+
+    def _history_filter(self, period: Optional[str] = None, company: Optional[str] = None,
+                        keyword: Optional[str] = None) -> Tuple[str, List[Any]]:
+        """목록/내보내기 공통 WHERE절 (company: 업체명 부분 일치, keyword: 업체명 또는 이메일)"""
+        where = "1=1"
+        params: List[Any] = []
+
+        if period:
+            where += " AND period = ?"
+            params.append(period)
+
+        if company:
+            if self._uses_search_index(company):
+                where += " AND id IN (SELECT rowid FROM send_history_fts WHERE send_history_fts MATCH ?)"
+                params.append(f"company_name : {fts_phrase(company)}")
+            else:
+                where += " AND company_name LIKE ?"
+                params.append(f"%{company}%")
+
+        if keyword:
+            if self._uses_search_index(keyword):
+                where += " AND id IN (SELECT rowid FROM send_history_fts WHERE send_history_fts MATCH ?)"
+                params.append(fts_phrase(keyword))
+            else:
+                where += " AND (company_name LIKE ? OR recipient_email LIKE ?)"
+                params.extend([f"%{keyword}%", f"%{keyword}%"])
+
+        return where, params
+
+    def read_history(self, period: Optional[str] = None, company: Optional[str] = None,
+                     limit: int = 100, offset: int = 0) -> pd.DataFrame:
+        """발송 이력 조회 (OFFSET 방식 - 깊은 페이지는 read_history_page 사용)"""
+        self.ensure_schema()
+        where, params = self._history_filter(period, company)
+        query = f"SELECT * FROM send_history WHERE {where} ORDER BY timestamp DESC, id DESC LIMIT ? OFFSET ?"
+        return pd.read_sql_query(query, self.connection(), params=params + [limit, offset])
+
+    def read_history_page(self, period: Optional[str] = None, company: Optional[str] = None,
+                          keyword: Optional[str] = None, limit: int = 50,
+                          after: Optional[HistoryCursor] = None
+                          ) -> Tuple[pd.DataFrame, Optional[HistoryCursor]]:
+        """
+        발송 이력 한 페이지 (최신순, 커서 기반)
+
+        after 커서보다 오래된 행부터 limit개를 읽으므로 페이지 깊이와 무관하게
+        인덱스 범위 조회 한 번으로 끝납니다.
+
+        Returns:
+            (페이지 DataFrame, 다음 페이지 커서 - 마지막 페이지면 None)
+        """
+        self.ensure_schema()
+        where, params = self._history_filter(period, company, keyword)
+        if after is not None:
+            where += " AND (timestamp, id) < (?, ?)"
+            params.extend(after)
+        query = f"SELECT * FROM send_history WHERE {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+        df = pd.read_sql_query(query, self.connection(), params=params + [limit + 1])
+
+        next_cursor = None
+        if len(df) > limit:
+            df = df.iloc[:limit]
+            last = df.iloc[-1]
+            next_cursor = (last['timestamp'], int(last['id']))
+        return df, next_cursor
+
+    def iter_history(self, period: Optional[str] = None, company: Optional[str] = None,
+                     keyword: Optional[str] = None,
+                     chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+        """조건에 맞는 전체 이력을 chunk_size 행씩 (최신순)"""
+        cursor: Optional[HistoryCursor] = None
+        while True:
+            chunk, cursor = self.read_history_page(period, company, keyword, chunk_size, cursor)
+            if not chunk.empty:
+                yield chunk
+            if cursor is None:
+                return
+
+    def export_history(self, dest: Union[str, BinaryIO], fmt: str = 'csv',
+                       period: Optional[str] = None, company: Optional[str] = None,
+                       keyword: Optional[str] = None, chunk_size: int = EXPORT_CHUNK_SIZE) -> int:
+        """
+        조건에 맞는 전체 이력을 CSV/XLSX로 스트리밍 저장 - 저장한 행 수 반환
+
+        청크 단위로 읽어 바로 기록하므로 메모리에는 한 청크만 올라갑니다.
+        CSV는 Excel에서 한글이 깨지지 않도록 UTF-8 BOM으로 저장하고,
+        XLSX는 openpyxl write-only 모드로 저장합니다 (시트 행 한도를 넘으면 다음 시트).
+        """
+        chunks = self.iter_history(period, company, keyword, chunk_size)
+        columns = list(HISTORY_EXPORT_COLUMNS)
+        header = list(HISTORY_EXPORT_COLUMNS.values())
+        written = 0
+
+        if fmt == 'csv':
+            binary = open(dest, 'wb') if isinstance(dest, str) else dest
+            text = io.TextIOWrapper(binary, encoding='utf-8-sig', newline='')
+            try:
+                csv.writer(text).writerow(header)
+                for chunk in chunks:
+                    chunk[columns].to_csv(text, header=False, index=False, lineterminator='\r\n')
+                    written += len(chunk)
+                text.flush()
+            finally:
+                text.detach()
+                if isinstance(dest, str):
+                    binary.close()
+            return written
+
+        if fmt == 'xlsx':
+            from openpyxl import Workbook
+
+            wb = Workbook(write_only=True)
+            ws, sheet_rows = None, XLSX_MAX_ROWS
+            for chunk in chunks:
+                for row in chunk[columns].astype(object).where(chunk[columns].notna(), None).itertuples(
+                        index=False, name=None):
+                    if sheet_rows >= XLSX_MAX_ROWS:
+                        ws = wb.create_sheet(f"발송이력{len(wb.worksheets) + 1}" if wb.worksheets else "발송이력")
+                        ws.append(header)
+                        sheet_rows = 1
+                    ws.append(row)
+                    sheet_rows += 1
+                written += len(chunk)
+            if ws is None:
+                wb.create_sheet("발송이력").append(header)
+            wb.save(dest)
+            return written
+
+        raise ValueError(f"지원하지 않는 내보내기 형식: {fmt}")
+
+    def _search_filter(self, keyword: str, period: Optional[str]) -> Tuple[str, str, List[Any], bool]:
+        """검색 조건 (FROM절, WHERE절, 파라미터, 순위 사용 여부)"""
+        if self._uses_search_index(keyword):
+            source = "send_history_fts JOIN send_history h ON h.id = send_history_fts.rowid"
+            where = "send_history_fts MATCH ?"
+            params: List[Any] = [fts_phrase(keyword)]
+            ranked = True
+        else:
+            source = "send_history h"
+            where = "(h.company_name LIKE ? OR h.recipient_email LIKE ?)"
+            params = [f"%{keyword}%", f"%{keyword}%"]
+            ranked = False
+        if period:
+            where += " AND h.period = ?"
+            params.append(period)
+        return source, where, params, ranked
+
+    def search_history(self, keyword: str, period: Optional[str] = None,
+                       limit: int = 50, offset: int = 0) -> pd.DataFrame:
+        """
+        업체명/수신 이메일 부분 일치 검색 - 관련도(bm25) 순, 같은 순위는 최신순
+
+        결과에는 관련도 점수 rank 컬럼이 추가됩니다 (작을수록 관련도 높음).
+        """
+        self.ensure_schema()
+        source, where, params, ranked = self._search_filter(keyword, period)
+        rank_expr = "bm25(send_history_fts, ?, ?)" if ranked else "0.0"
+        rank_params: List[Any] = list(SEARCH_WEIGHTS) if ranked else []
+        query = f'''
+            SELECT h.*, {rank_expr} AS rank
+            FROM {source}
+            WHERE {where}
+            ORDER BY rank, h.timestamp DESC, h.id DESC
+            LIMIT ? OFFSET ?
+        '''
+        return pd.read_sql_query(query, self.connection(),
+                                 params=rank_params + params + [limit, offset])
+
+    def count_search(self, keyword: str, period: Optional[str] = None) -> int:
+        """search_history() 전체 결과 건수 (페이지 수 계산용)"""
+        self.ensure_schema()
+        source, where, params, _ = self._search_filter(keyword, period)
+        return self.connection().execute(
+            f"SELECT COUNT(*) FROM {source} WHERE {where}", params
+        ).fetchone()[0]
+
+    def statistics(self, period: Optional[str] = None) -> Dict[str, Any]:
+        """발송 통계 조회 - 요약 테이블에서 읽음 (이력 크기와 무관)"""
+        self.ensure_schema()
+        conn = self.connection()
+        period_key = period if period else ALL_PERIODS
+
+        # 상태별 건수
+        status_counts = dict(conn.execute(
+            "SELECT status, cnt FROM history_stats_status WHERE period = ?", (period_key,)
+        ).fetchall())
+
+        # 업체별 발송 수 (Top 10)
+        top_companies = conn.execute('''
+            SELECT company_name, cnt
+            FROM history_stats_company
+            WHERE period = ?
+            ORDER BY cnt DESC LIMIT 10
+        ''', (period_key,)).fetchall()
+
+        return {
+            'total': sum(status_counts.values()),
+            'success': status_counts.get('성공', 0),
+            'failed': status_counts.get('실패', 0),
+            'skipped': status_counts.get('건너뜀', 0),
+            'top_companies': top_companies
+        }
+
+
+# ============================================================================
+# 🧪 MODULE TEST (1M 행 저장/조회 벤치마크)
+# ============================================================================
+
+if __name__ == "__main__":
+    import os
+    import sys
+    import tempfile
+    import time
+
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    print(f"=== History DB Benchmark ({n_rows:,} rows) ===")
+
+    statuses = ['성공'] * 8 + ['실패', '건너뜀']
+    results = [
+        {'그룹': f"업체{i % 3000:04d}", '이메일': f"cso{i % 3000}@example.com",
+         'subject': f"[정산서] 업체{i % 3000:04d}", '상태': statuses[i % 10],
+         '사유': '' if i % 10 < 8 else '수신자 거부', 'row_count': i % 40}
+        for i in range(n_rows)
+    ]
+    workdir = tempfile.mkdtemp()
+
+    # 1. 일괄 저장 - 기존 방식: 행마다 execute, 기본 rollback 저널
+    legacy_path = os.path.join(workdir, "legacy.db")
+    legacy_db = HistoryDB(legacy_path)
+    legacy_db.ensure_schema()
+    legacy_db.close()
+    start = time.perf_counter()
+    conn = sqlite3.connect(legacy_path)
+    conn.execute('PRAGMA journal_mode=DELETE')
+    cursor = conn.cursor()
+    for params in history_params(results, "2026년 10월"):
+        cursor.execute(HISTORY_INSERT_SQL, params)
+    conn.commit()
+    conn.close()
+    legacy_insert = time.perf_counter() - start
+    print(f"  bulk insert, row-by-row execute : {legacy_insert:.2f}s")
+
+    # 관리형 계층: WAL + executemany + 단일 트랜잭션
+    db = HistoryDB(os.path.join(workdir, "managed.db"))
+    start = time.perf_counter()
+    inserted = db.insert_history(results, "2026년 10월")
+    managed_insert = time.perf_counter() - start
+    print(f"  bulk insert, executemany        : {managed_insert:.2f}s ({inserted / managed_insert:,.0f} rows/s)")
+
+    # 2. 메일 1건마다 저장 (발송 중 스트리밍 기록) - 연결 재사용 + WAL 효과
+    n_stream = 2_000
+    start = time.perf_counter()
+    for r in results[:n_stream]:
+        conn = sqlite3.connect(legacy_path)
+        conn.execute(HISTORY_INSERT_SQL, next(history_params([r], "2026년 10월")))
+        conn.commit()
+        conn.close()
+    legacy_stream = time.perf_counter() - start
+    print(f"  {n_stream:,} single saves, connect each : {legacy_stream:.2f}s")
+
+    start = time.perf_counter()
+    for r in results[:n_stream]:
+        db.insert_history([r], "2026년 10월")
+    managed_stream = time.perf_counter() - start
+    print(f"  {n_stream:,} single saves, reused WAL  : {managed_stream:.2f}s")
+
+    # 3. 전체 읽기
+    start = time.perf_counter()
+    df = db.read_history(limit=n_rows + n_stream)
+    read_time = time.perf_counter() - start
+    print(f"  read back                       : {read_time:.2f}s ({len(df):,} rows)")
+    assert len(df) == n_rows + n_stream
+
+    # 3-1. 깊은 페이지: OFFSET vs 커서
+    deep = (n_rows // 50 - 10) * 50
+    start = time.perf_counter()
+    offset_page = db.read_history(period="2026년 10월", limit=50, offset=deep)
+    offset_time = time.perf_counter() - start
+    cursor_at = (df.iloc[deep - 1]['timestamp'], int(df.iloc[deep - 1]['id']))
+    start = time.perf_counter()
+    keyset_page, _ = db.read_history_page(period="2026년 10월", limit=50, after=cursor_at)
+    keyset_time = time.perf_counter() - start
+    print(f"  page at offset {deep:,} (OFFSET vs cursor): {offset_time * 1000:.0f}ms vs {keyset_time * 1000:.1f}ms")
+    assert list(offset_page['id']) == list(keyset_page['id'])
+
+    # 커서로 전체 순회 = 전체 읽기 (중복/누락 없음, 기간 필터 포함)
+    ids = [i for chunk in db.iter_history(period="2026년 10월", chunk_size=7_777) for i in chunk['id']]
+    assert ids == list(df['id'])
+    del df
+
+    # 3-2. 스트리밍 내보내기 (CSV/XLSX)
+    import tracemalloc
+    for fmt in ('csv', 'xlsx'):
+        if fmt == 'xlsx' and n_rows > 200_000:
+            continue  # openpyxl 행 단위 기록은 느려서 대용량 벤치마크에서는 CSV만
+        out_path = os.path.join(workdir, f"export.{fmt}")
+        start = time.perf_counter()
+        exported = db.export_history(out_path, fmt)
+        export_time = time.perf_counter() - start
+        print(f"  export {fmt}: {exported:,} rows in {export_time:.2f}s, "
+              f"{os.path.getsize(out_path) / 1e6:.1f}MB file")
+        assert exported == n_rows + n_stream
+
+    # 메모리 상한은 청크 크기로 결정 (전체 행 수와 무관)
+    tracemalloc.start()
+    db.export_history(os.path.join(workdir, "export.csv"), 'csv')
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"  export csv peak memory          : {peak / 1e6:.1f}MB traced")
+    exported_df = pd.read_csv(os.path.join(workdir, "export.csv"), encoding='utf-8-sig')
+    assert len(exported_df) == n_rows + n_stream and list(exported_df.columns) == list(HISTORY_EXPORT_COLUMNS.values())
+    del exported_df
+
+    # 4. 화면 렌더링마다 반복되는 호출 (스키마 확인 + 첫 페이지)
+    start = time.perf_counter()
+    for _ in range(200):
+        db.ensure_schema()
+        db.read_history(limit=50)
+    print(f"  200 × (ensure_schema + page)    : {time.perf_counter() - start:.2f}s")
+
+    # 5. 대시보드 통계: 전체 스캔(기존 쿼리) vs 요약 테이블
+    def scan_statistics(conn: sqlite3.Connection, period: Optional[str]) -> Dict[str, Any]:
+        where, params = ("WHERE period = ?", (period,)) if period else ("", ())
+        total = conn.execute(f"SELECT COUNT(*) FROM send_history {where}", params).fetchone()[0]
+        status = dict(conn.execute(f"SELECT status, COUNT(*) FROM send_history {where} GROUP BY status",
+                                   params).fetchall())
+        top = conn.execute(f"SELECT company_name, COUNT(*) AS cnt FROM send_history {where} "
+                           f"GROUP BY company_name ORDER BY cnt DESC LIMIT 10", params).fetchall()
+        return {'total': total, 'success': status.get('성공', 0), 'failed': status.get('실패', 0),
+                'skipped': status.get('건너뜀', 0), 'top_companies': top}
+
+    for period in (None, "2026년 10월"):
+        start = time.perf_counter()
+        scanned = scan_statistics(db.connection(), period)
+        scan_time = time.perf_counter() - start
+        start = time.perf_counter()
+        stats = db.statistics(period)
+        stats_time = time.perf_counter() - start
+        label = period or "전체"
+        print(f"  statistics({label}): scan {scan_time * 1000:.0f}ms vs summary {stats_time * 1000:.2f}ms")
+        assert {k: v for k, v in stats.items() if k != 'top_companies'} == \
+            {k: v for k, v in scanned.items() if k != 'top_companies'}
+        assert [c for _, c in stats['top_companies']] == [c for _, c in scanned['top_companies']]
+
+    # 요약 재구축(기존 DB 마이그레이션)도 같은 결과
+    fresh = HistoryDB(db.db_path)
+    with fresh.transaction() as conn:
+        conn.execute("DELETE FROM history_meta")
+    fresh._schema_ready = False
+    fresh.ensure_schema()
+    assert fresh.statistics() == db.statistics()
+
+    # 6. 업체 검색: LIKE 전체 스캔 vs FTS5 trigram 인덱스
+    assert db.search_enabled, "SQLite FTS5 trigram tokenizer not available"
+    db.insert_history([{'그룹': '한빛메디칼', '이메일': 'hanbit@example.com', '상태': '성공'}], "2026년 10월")
+    conn = db.connection()
+    start = time.perf_counter()
+    like_hits = conn.execute("SELECT COUNT(*) FROM send_history WHERE company_name LIKE ?",
+                             ("%빛메디%",)).fetchone()[0]
+    like_time = time.perf_counter() - start
+    start = time.perf_counter()
+    fts_hits = db.count_search("빛메디")
+    page = db.search_history("빛메디")
+    fts_time = time.perf_counter() - start
+    print(f"  company search (LIKE vs FTS)    : {like_time * 1000:.0f}ms vs {fts_time * 1000:.1f}ms")
+    assert like_hits == fts_hits == 1 and page.iloc[0]['company_name'] == '한빛메디칼'
+
+    # 페이지는 겹치지 않고, 업체명 필터(read_history)와 같은 결과 집합
+    ranked = db.search_history("업체0042", limit=10)
+    assert (ranked['company_name'] == '업체0042').all()
+    page2 = db.search_history("업체0042", limit=10, offset=10)
+    assert not set(ranked['id']) & set(page2['id'])
+    assert len(db.read_history(company="업체0042", limit=n_rows)) == db.count_search("업체0042")
+    # 짧은 검색어는 LIKE로 대체
+    assert db.count_search("빛메") == 1
+
+    journal = db.connection().execute('PRAGMA journal_mode').fetchone()[0]
+    print(f"  journal_mode                    : {journal}")
+    assert journal == 'wal'
+    print(f"  Bulk insert speedup             : {legacy_insert / managed_insert:.1f}x")
+    print(f"  Per-message save speedup        : {legacy_stream / managed_stream:.1f}x")
+    print("\n✅ Benchmark complete!")
@@ -0,0 +1,436 @@
+"""
+================================================================================
+📤 Durable Send Outbox
+================================================================================
+발송 작업을 mail_history.db의 outbox 테이블에 기록하여
+프로세스가 중단되어도 중단된 지점부터 이어서 발송할 수 있게 합니다.
+
+기존에는 발송 상태가 메모리(sent_groups)에만 있었고, 발송 이력도 루프가
+정상 종료된 뒤에 한 번에 저장했기 때문에 중간에 중단되면 기록이 모두
+사라졌습니다. 이 모듈은 (run_id, group_key)마다 한 행을 두고 메일 1건마다
+상태를 즉시 커밋합니다.
+
+상태 전이 (행 단위):
+    queued → sending → sent | failed
+    (발송하지 않는 그룹은 처음부터 skipped)
+
+렌더링 전 등록:
+- 발송을 시작하기 전에 대상 그룹 전부를 본문(html) 없는 'queued' 행으로 커밋하고,
+  렌더링 청크가 끝날 때마다 UPDATE로 본문을 채웁니다.
+- 렌더링 도중 중단되어도 작업과 남은 그룹이 모두 outbox에 남으며,
+  이어서 발송할 때 본문이 없는 행은 다시 렌더링합니다.
+
+중복 발송 방지:
+- 'sending'은 SMTP 전송 직전에 커밋됩니다.
+- 재시작 후 'sending'으로 남아 있는 행은 실제 전송 여부를 알 수 없으므로
+  자동으로 다시 보내지 않고 'failed'(발송 여부 확인 필요)로 정리합니다.
+- 이어서 발송할 때는 'queued' 행만 보냅니다.
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import sqlite3
+
+from history_db import HistoryDB
+from smtp_dispatcher import SendJob
+
+
+OUTBOX_STATES = ('queued', 'sending', 'sent', 'failed', 'skipped')
+
+# 이어서 발송할 때 본문이 없는 행을 렌더링하는 함수
+# [(원래 순서, 그룹 키)] → (발송 작업 목록, 렌더링 실패 행 목록)
+RenderMissing = Callable[[List[Tuple[int, str]]], Tuple[List[SendJob], List[Dict[str, str]]]]
+
+# 재시작 후 'sending'으로 남은 행의 사유
+UNCERTAIN_REASON = "발송 중 중단됨 - 수신 여부 확인 필요 (자동 재발송 안 함)"
+
+
+class SendOutbox:
+    """
+    SQLite outbox - 메일 1건 = 1행, 상태 변경마다 즉시 커밋
+
+    연결은 HistoryDB가 스레드별로 관리하며(WAL), 테이블은
+    HistoryDB.ensure_schema() 때 함께 생성됩니다.
+    """
+
+    def __init__(self, db: HistoryDB):
+        self.db = db
+        db.add_schema(self._create_tables)
+
+    def _query(self, sql: str, params: tuple = ()) -> List[sqlite3.Row]:
+        self.db.ensure_schema()
+        cur = self.db.connection().cursor()
+        cur.row_factory = sqlite3.Row
+        return cur.execute(sql, params).fetchall()
+
+    def init_schema(self) -> None:
+        self.db.ensure_schema()
+
+    @staticmethod
+    def _create_tables(conn: sqlite3.Connection) -> None:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS send_runs (
+                run_id TEXT PRIMARY KEY,
+                period TEXT,
+                sender TEXT,
+                total INTEGER,
+                status TEXT DEFAULT 'active',
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                finished_at DATETIME
+            )
+        ''')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS send_outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                run_id TEXT NOT NULL,
+                group_key TEXT NOT NULL,
+                job_index INTEGER,
+                recipient_email TEXT,
+                subject TEXT,
+                html TEXT,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER DEFAULT 0,
+                reason TEXT,
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                UNIQUE (run_id, group_key)
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_outbox_run_state ON send_outbox(run_id, state)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_runs_status ON send_runs(status)')
+
+    # ------------------------------------------------------------------------
+    # 작업 생성 / 상태 기록
+    # ------------------------------------------------------------------------
+
+    def create_run(self, run_id: str, jobs: List[SendJob], period: str, sender: str,
+                   failed_rows: Optional[List[Dict[str, str]]] = None, total: Optional[int] = None,
+                   pending: Optional[List[Tuple[int, str, str]]] = None,
+                   skipped_rows: Optional[List[Dict[str, str]]] = None) -> None:
+        """
+        발송 작업 등록 - 모든 메일을 한 트랜잭션에 기록
+
+        Args:
+            jobs: 렌더링이 끝난 메일 - 'queued'
+            failed_rows: 렌더링 단계에서 이미 실패한 행 (send_results 형식) - 'failed'로 기록
+            total: 작업 전체 건수 (기본값: 기록한 행 수)
+            pending: 아직 렌더링하지 않은 대상 [(원래 순서, 그룹 키, 수신 이메일)]
+                     - 본문 없는 'queued'로 기록하고 fill_rendered로 채움
+            skipped_rows: 발송하지 않는 행 (이미 발송됨 등, send_results 형식) - 'skipped'로 기록
+        """
+        pending = pending or []
+        skipped_rows = skipped_rows or []
+        if total is None:
+            total = len(jobs) + len(failed_rows or []) + len(pending) + len(skipped_rows)
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "INSERT INTO send_runs (run_id, period, sender, total) VALUES (?, ?, ?, ?)",
+                (run_id, period, sender, total)
+            )
+            self.add_jobs(run_id, jobs, failed_rows)
+            conn.executemany(
+                "INSERT INTO send_outbox (run_id, group_key, job_index, recipient_email) VALUES (?, ?, ?, ?)",
+                [(run_id, gk, i, email) for i, gk, email in pending]
+            )
+            conn.executemany(
+                '''INSERT INTO send_outbox (run_id, group_key, recipient_email, state, reason)
+                   VALUES (?, ?, ?, 'skipped', ?)''',
+                [(run_id, r['그룹'], r['이메일'], r['사유']) for r in skipped_rows]
+            )
+
+    def add_jobs(self, run_id: str, jobs: List[SendJob],
+                 failed_rows: Optional[List[Dict[str, str]]] = None) -> None:
+        """등록된 작업에 렌더링이 끝난 메일('queued')과 렌더링 실패 행('failed') 추가"""
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.executemany(
+                '''INSERT INTO send_outbox (run_id, group_key, job_index, recipient_email, subject, html)
+                   VALUES (?, ?, ?, ?, ?, ?)''',
+                [(run_id, j.group_key, j.index, j.recipient, j.subject, j.html) for j in jobs]
+            )
+            conn.executemany(
+                '''INSERT INTO send_outbox (run_id, group_key, recipient_email, state, reason)
+                   VALUES (?, ?, ?, 'failed', ?)''',
+                [(run_id, r['그룹'], r['이메일'], r['사유']) for r in (failed_rows or [])]
+            )
+
+    def fill_rendered(self, run_id: str, jobs: List[SendJob],
+                      failed_rows: Optional[List[Dict[str, str]]] = None) -> None:
+        """
+        본문 없이 등록한 행에 렌더링 결과 기록 - 렌더링 청크가 끝날 때마다 발송 큐에 넣기 전에 호출
+
+        커밋된 뒤에만 발송 큐에 넣으므로 mark_sending의 'queued' 전제가 유지됩니다.
+        """
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.executemany(
+                '''UPDATE send_outbox SET recipient_email = ?, subject = ?, html = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND group_key = ? AND state = 'queued' AND html IS NULL''',
+                [(j.recipient, j.subject, j.html, run_id, j.group_key) for j in jobs]
+            )
+            conn.executemany(
+                '''UPDATE send_outbox SET state = 'failed', reason = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND group_key = ? AND state = 'queued' ''',
+                [(r['사유'], run_id, r['그룹']) for r in (failed_rows or [])]
+            )
+
+    def mark_sending(self, run_id: str, group_key: str) -> None:
+        """SMTP 전송 직전 기록 (커밋 후 전송)"""
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            cur = conn.execute(
+                '''UPDATE send_outbox SET state = 'sending', attempts = attempts + 1,
+                          updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND group_key = ? AND state = 'queued' ''',
+                (run_id, group_key)
+            )
+            if cur.rowcount != 1:
+                raise RuntimeError(f"outbox 행이 발송 대기 상태가 아님: {group_key}")
+
+    def mark_result(self, run_id: str, group_key: str, ok: bool, reason: str = '') -> None:
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.execute(
+                '''UPDATE send_outbox SET state = ?, reason = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND group_key = ?''',
+                ('sent' if ok else 'failed', '' if ok else reason, run_id, group_key)
+            )
+
+    def finish_run(self, run_id: str, status: str) -> None:
+        """작업 종료 기록 (completed / stopped / failed)"""
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.execute(
+                "UPDATE send_runs SET status = ?, finished_at = CURRENT_TIMESTAMP WHERE run_id = ?",
+                (status, run_id)
+            )
+
+    # ------------------------------------------------------------------------
+    # 조회 / 복구
+    # ------------------------------------------------------------------------
+
+    def unfinished_runs(self) -> List[Dict[str, Any]]:
+        """남은 메일('queued'/'sending')이 있는 작업 목록 (상태별 건수 포함)"""
+        runs = self._query("SELECT * FROM send_runs WHERE status != 'closed' ORDER BY created_at DESC")
+        result = []
+        for run in runs:
+            counts = self.run_counts(run['run_id'])
+            if not counts['queued'] and not counts['sending']:
+                continue
+            result.append({**dict(run), 'counts': counts})
+        return result
+
+    def get_run(self, run_id: str) -> Dict[str, Any]:
+        rows = self._query("SELECT * FROM send_runs WHERE run_id = ?", (run_id,))
+        return dict(rows[0]) if rows else {}
+
+    def close_run(self, run_id: str) -> None:
+        """남은 메일을 보내지 않고 작업 종료 - 대기 행은 실패(취소)로 기록"""
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.execute(
+                '''UPDATE send_outbox SET state = 'failed', reason = '작업 취소', updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND state = 'queued' ''',
+                (run_id,)
+            )
+            conn.execute(
+                '''UPDATE send_outbox SET state = 'failed', reason = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND state = 'sending' ''',
+                (UNCERTAIN_REASON, run_id)
+            )
+            conn.execute(
+                "UPDATE send_runs SET status = 'closed', finished_at = CURRENT_TIMESTAMP WHERE run_id = ?",
+                (run_id,)
+            )
+
+    def recover_run(self, run_id: str, render: Optional[RenderMissing] = None
+                    ) -> Tuple[Dict[str, Any], List[SendJob], List[Dict[str, str]]]:
+        """
+        이어서 발송할 작업 복원
+
+        'sending' 행은 전송 여부를 알 수 없으므로 'failed'로 정리하고 다시 보내지 않습니다.
+        렌더링 전에 중단되어 본문이 없는 'queued' 행은 render로 다시 렌더링해 채웁니다.
+        render가 없거나 렌더링하지 못한 행은 'queued'로 남기고 작업 정보의 'unrendered'에 건수를 담습니다.
+
+        Returns:
+            (작업 정보, 본문이 있는 'queued' 발송 작업 목록, 이미 끝난 행의 결과 목록)
+        """
+        self.db.ensure_schema()
+        with self.db.transaction() as conn:
+            conn.execute(
+                '''UPDATE send_outbox SET state = 'failed', reason = ?, updated_at = CURRENT_TIMESTAMP
+                   WHERE run_id = ? AND state = 'sending' ''',
+                (UNCERTAIN_REASON, run_id)
+            )
+            conn.execute("UPDATE send_runs SET status = 'active', finished_at = NULL WHERE run_id = ?", (run_id,))
+
+        if render is not None:
+            missing = [(row['job_index'] or 0, row['group_key']) for row in self._query(
+                '''SELECT job_index, group_key FROM send_outbox
+                   WHERE run_id = ? AND state = 'queued' AND html IS NULL ORDER BY job_index, id''', (run_id,)
+            )]
+            if missing:
+                rendered, failed = render(missing)
+                self.fill_rendered(run_id, rendered, failed)
+
+        run = self.get_run(run_id)
+        rows = self._query("SELECT * FROM send_outbox WHERE run_id = ? ORDER BY job_index, id", (run_id,))
+
+        jobs, done_rows, unrendered = [], [], 0
+        for row in rows:
+            if row['state'] == 'queued':
+                if row['html'] is None:
+                    unrendered += 1
+                    continue
+                jobs.append(SendJob(row['group_key'], row['recipient_email'], row['subject'],
+                                    row['html'], index=row['job_index'] or 0))
+            else:
+                done_rows.append({
+                    '그룹': row['group_key'],
+                    '이메일': row['recipient_email'],
+                    '상태': {'sent': '성공', 'skipped': '건너뜀'}.get(row['state'], '실패'),
+                    '사유': row['reason'] or '',
+                })
+        if run:
+            run['unrendered'] = unrendered
+        return run, jobs, done_rows
+
+    def run_counts(self, run_id: str) -> Dict[str, int]:
+        counts = {row[0]: row[1] for row in self._query(
+            "SELECT state, COUNT(*) FROM send_outbox WHERE run_id = ? GROUP BY state", (run_id,)
+        )}
+        return {s: counts.get(s, 0) for s in OUTBOX_STATES}
+
+
+# ============================================================================
+# 🧪 MODULE TEST (중단 후 이어서 발송 - 중복 발송 없음)
+# ============================================================================
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    import threading
+
+    from send_worker import BackgroundSendWorker
+    from smtp_dispatcher import SMTPDispatcher
+
+    class _RecordingServer:
+        """발송된 수신자를 기록하는 가짜 SMTP 연결 (crash_after건 이후 예외로 '프로세스 중단' 흉내)"""
+
+        def __init__(self, sent: list, crash_after: Optional[int] = None):
+            self.sent = sent
+            self.crash_after = crash_after
+
+        def sendmail(self, sender, recipient, msg):
+            if self.crash_after is not None and len(self.sent) >= self.crash_after:
+                raise KeyboardInterrupt  # 워커 스레드가 통째로 죽는 상황
+            self.sent.append(recipient)
+
+        def quit(self):
+            pass
+
+        close = quit
+
+    # 워커 스레드의 '중단' 예외 traceback은 출력하지 않음
+    threading.excepthook = lambda args: None
+
+    print("=== Durable Outbox Test ===")
+    db_path = os.path.join(tempfile.mkdtemp(), "outbox_test.db")
+    outbox = SendOutbox(HistoryDB(db_path))
+    outbox.init_schema()
+
+    n = 40
+    jobs = [SendJob(f"업체{i:03d}", f"cso{i}@example.com", "제목", "<p>본문</p>", index=i) for i in range(n)]
+    outbox.create_run("run1", jobs, "2026년 10월", "me@example.com")
+
+    # 1차 실행: 15건 보낸 뒤 16번째 전송 중 '중단'
+    sent: list = []
+    dispatcher = SMTPDispatcher(lambda: (_RecordingServer(sent, crash_after=15), None), "me@example.com",
+                                before_send=lambda job: outbox.mark_sending("run1", job.group_key))
+    worker = BackgroundSendWorker(
+        jobs, dispatcher, job_id="run1",
+        on_result=lambda w, r: outbox.mark_result("run1", r.job.group_key, r.ok, r.error or ''))
+    worker.start()
+    worker.join(timeout=10)
+    counts = outbox.run_counts("run1")
+    print(f"  after crash: {counts}")
+    assert counts['sent'] == 15 and counts['sending'] == 1 and counts['queued'] == n - 16
+
+    # 재시작: 미완료 작업 조회 → 복원 → 이어서 발송
+    unfinished = outbox.unfinished_runs()
+    assert [r['run_id'] for r in unfinished] == ["run1"]
+    run, resume_jobs, done_rows = outbox.recover_run("run1")
+    print(f"  recovered: {len(resume_jobs)} queued, {len(done_rows)} done (1 uncertain)")
+    assert len(resume_jobs) == n - 16 and len(done_rows) == 16
+
+    dispatcher = SMTPDispatcher(lambda: (_RecordingServer(sent), None), "me@example.com",
+                                before_send=lambda job: outbox.mark_sending("run1", job.group_key))
+    worker = BackgroundSendWorker(
+        resume_jobs, dispatcher, job_id="run1", prefilled_rows=done_rows, total=n,
+        on_result=lambda w, r: outbox.mark_result("run1", r.job.group_key, r.ok, r.error or ''),
+        on_complete=lambda w: outbox.finish_run("run1", w.state))
+    worker.start()
+    worker.join(timeout=10)
+
+    counts = outbox.run_counts("run1")
+    print(f"  after resume: {counts}, transmissions={len(sent)}, unique={len(set(sent))}")
+    assert len(sent) == len(set(sent)) == n - 1, "double send or missing send"
+    assert counts == {'queued': 0, 'sending': 0, 'sent': n - 1, 'failed': 1, 'skipped': 0}
+    assert outbox.unfinished_runs() == []
+
+    # 렌더링 도중 중단: 대상 전부를 본문 없이 먼저 등록 → 첫 청크만 렌더링·발송한 뒤 '중단'
+    print("\n=== Crash During Rendering Test ===")
+    targets = [(i, f"거래처{i:03d}", f"ceo{i}@example.com") for i in range(30)]
+    skipped = [{'그룹': '거래처999', '이메일': 'x@example.com', '상태': '건너뜀', '사유': '이미 발송됨'}]
+
+    def render(items):
+        jobs = [SendJob(gk, f"ceo{i}@example.com", "제목", "<p>본문</p>", index=i) for i, gk in items if i != 25]
+        failed = [{'그룹': gk, '이메일': '', '상태': '실패', '사유': '렌더링 실패'} for i, gk in items if i == 25]
+        return jobs, failed
+
+    outbox.create_run("run2", [], "2026년 10월", "me@example.com", pending=targets, skipped_rows=skipped)
+    first_jobs, _ = render([(i, gk) for i, gk, _ in targets[:10]])
+    outbox.fill_rendered("run2", first_jobs)
+    sent.clear()
+    dispatcher = SMTPDispatcher(lambda: (_RecordingServer(sent), None), "me@example.com",
+                                before_send=lambda job: outbox.mark_sending("run2", job.group_key))
+    worker = BackgroundSendWorker(
+        first_jobs, dispatcher, job_id="run2",
+        on_result=lambda w, r: outbox.mark_result("run2", r.job.group_key, r.ok, r.error or ''))
+    worker.start()
+    worker.join(timeout=10)
+
+    run = outbox.get_run("run2")
+    counts = outbox.run_counts("run2")
+    print(f"  after crash: {counts}, total={run['total']}")
+    assert run['total'] == sum(counts.values()) == 31
+    assert counts['sent'] == 10 and counts['queued'] == 20 and counts['skipped'] == 1
+    assert [r['run_id'] for r in outbox.unfinished_runs()] == ["run2"]
+
+    # 렌더러 없이 복원하면 본문 없는 행은 발송하지 않고 남겨 둠
+    run, resume_jobs, done_rows = outbox.recover_run("run2")
+    assert run['unrendered'] == 20 and resume_jobs == [] and len(done_rows) == 11
+
+    run, resume_jobs, done_rows = outbox.recover_run("run2", render=render)
+    print(f"  recovered: {len(resume_jobs)} re-rendered, {len(done_rows)} done")
+    assert run['unrendered'] == 0 and len(resume_jobs) == 19 and len(done_rows) == 12
+
+    dispatcher = SMTPDispatcher(lambda: (_RecordingServer(sent), None), "me@example.com",
+                                before_send=lambda job: outbox.mark_sending("run2", job.group_key))
+    worker = BackgroundSendWorker(
+        resume_jobs, dispatcher, job_id="run2", prefilled_rows=done_rows, total=run['total'],
+        on_result=lambda w, r: outbox.mark_result("run2", r.job.group_key, r.ok, r.error or ''),
+        on_complete=lambda w: outbox.finish_run("run2", w.state))
+    worker.start()
+    worker.join(timeout=10)
+
+    counts = outbox.run_counts("run2")
+    print(f"  after resume: {counts}, transmissions={len(sent)}, unique={len(set(sent))}")
+    assert len(sent) == len(set(sent)) == 29, "double send or missing send"
+    assert counts == {'queued': 0, 'sending': 0, 'sent': 29, 'failed': 1, 'skipped': 1}
+    assert outbox.unfinished_runs() == []
+
+    print("\n✅ Outbox resume test passed - no double sends!")
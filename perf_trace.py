@@ -0,0 +1,394 @@
+"""
+================================================================================
+⏱️ Stage Timing & Tracing
+================================================================================
+시트 로드 → 이메일 병합 → 정리 → 그룹화 → 렌더링 → MIME 생성 → SMTP 연결 →
+메일 발송까지 단계별 소요 시간을 가볍게 기록합니다.
+
+운영 로그(add_log)는 메시지만 남기므로 어느 단계가 느린지 알 수 없었습니다.
+이 모듈의 트레이서는 구간(span)을 중첩 경로(예: "send/smtp.send")로 묶어
+경로별 호출 수/합계/분위수(히스토그램)를 집계하고, 카운터(발송 성공/실패,
+재연결, 템플릿 캐시 적중 등)를 함께 보관합니다. 결과는 Step 5의
+"성능" 패널에 표시되고 발송 작업마다 JSON Lines 파일로 내보냅니다.
+
+사용 예:
+    tracer = Tracer()
+    with activate_tracer(tracer):
+        with span('prep'):
+            ...
+        threading.Thread(target=bind_tracer(worker)).start()  # 다른 스레드로 전달
+    tracer.export_jsonl('perf_metrics/run.jsonl', run_id='run')
+
+    @traced('render.email')        # 활성 트레이서가 없으면 바로 원래 함수 호출
+    def render(...): ...
+
+핵심 원칙:
+1. 활성 트레이서는 스레드별 - Streamlit 세션/발송 작업끼리 섞이지 않음
+   (새 스레드에는 bind_tracer로 명시적으로 전달)
+2. 트레이서가 없으면 비용 없음 - span()은 공유 nullcontext 반환
+3. 집계는 고정 버킷 히스토그램 - 메일 수만 건이어도 메모리 일정
+   (개별 구간 기록은 최근 MAX_TRACE_SPANS건만 보관)
+4. 프로세스 풀 워커 안의 구간은 기록되지 않음 - 부모 프로세스에서 청크 단위로 측정
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+
+
+# 히스토그램 버킷 상한 (ms) - 마지막 버킷은 그 이상 전부
+HISTOGRAM_BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500,
+                       1_000, 2_500, 5_000, 10_000, 30_000, 60_000)
+
+# JSON Lines로 내보낼 개별 구간 기록 수 (오래된 것부터 제거, 집계에는 영향 없음)
+MAX_TRACE_SPANS = 5_000
+
+# 중첩 경로 구분자
+PATH_SEPARATOR = '/'
+
+_NULL_SPAN = nullcontext()
+
+
+# ============================================================================
+# 📊 HISTOGRAM
+# ============================================================================
+
+class Histogram:
+    """고정 버킷 히스토그램 (ms) - 호출 수/합계/최소/최대 + 근사 분위수"""
+
+    __slots__ = ('counts', 'count', 'total', 'min', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+
+    def observe(self, value_ms: float) -> None:
+        self.counts[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, value_ms)] += 1
+        self.count += 1
+        self.total += value_ms
+        self.min = min(self.min, value_ms)
+        self.max = max(self.max, value_ms)
+
+    def percentile(self, q: float) -> float:
+        """q(0~1) 분위수 - 해당 버킷([min, max]로 좁힌 구간) 안에서 선형 보간"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= target:
+                lower = max(HISTOGRAM_BOUNDS_MS[i - 1] if i > 0 else 0.0, self.min)
+                upper = min(HISTOGRAM_BOUNDS_MS[i] if i < len(HISTOGRAM_BOUNDS_MS) else self.max, self.max)
+                return lower + (upper - lower) * (target - seen) / n
+            seen += n
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total_ms': round(self.total, 3),
+            'mean_ms': round(self.total / self.count, 3) if self.count else 0.0,
+            'min_ms': round(self.min, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(0.5), 3),
+            'p95_ms': round(self.percentile(0.95), 3),
+            'max_ms': round(self.max, 3),
+            # 빈 버킷은 생략 ("<=10": 3, ">60000": 1)
+            'buckets': {
+                (f"<={HISTOGRAM_BOUNDS_MS[i]:g}" if i < len(HISTOGRAM_BOUNDS_MS)
+                 else f">{HISTOGRAM_BOUNDS_MS[-1]:g}"): n
+                for i, n in enumerate(self.counts) if n
+            },
+        }
+
+
+# ============================================================================
+# ⏱️ TRACER
+# ============================================================================
+
+_local = threading.local()
+
+
+class Tracer:
+    """
+    구간/카운터/히스토그램 수집기 (스레드 안전)
+
+    구간 경로는 스레드별 중첩 스택으로 만들어지며, 같은 경로의 구간은
+    하나의 히스토그램으로 집계됩니다.
+    """
+
+    def __init__(self, max_spans: int = MAX_TRACE_SPANS):
+        self._lock = threading.Lock()
+        self.max_spans = max_spans
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.started_at = datetime.now()
+            self._origin = time.perf_counter()
+            self._histograms: Dict[str, Histogram] = {}
+            self._first_start: Dict[str, float] = {}  # 경로별 첫 시작 시각 (표시 순서)
+            self._counters: Dict[str, int] = {}
+            self._spans: deque = deque(maxlen=self.max_spans)
+            self.dropped_spans = 0
+
+    # ------------------------------------------------------------------------
+    # 기록
+    # ------------------------------------------------------------------------
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """구간 측정 - 현재 스레드의 중첩 경로 아래에 name을 붙여 기록"""
+        parent = getattr(_local, 'path', ())
+        path = parent + (name,)
+        _local.path = path
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            _local.path = parent
+            self._record(path, start, end)
+
+    def _record(self, path: Tuple[str, ...], start: float, end: float) -> None:
+        key = PATH_SEPARATOR.join(path)
+        duration_ms = (end - start) * 1000
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+                self._first_start[key] = start
+            else:
+                self._first_start[key] = min(self._first_start[key], start)
+            histogram.observe(duration_ms)
+            if len(self._spans) == self._spans.maxlen:
+                self.dropped_spans += 1
+            self._spans.append((key, len(path) - 1, (start - self._origin) * 1000, duration_ms,
+                                threading.current_thread().name))
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    # ------------------------------------------------------------------------
+    # 조회 / 내보내기
+    # ------------------------------------------------------------------------
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """경로별 집계 - 부모 바로 아래에 자식, 같은 단계끼리는 먼저 시작한 순서"""
+        with self._lock:
+            items = [(path, h.to_dict()) for path, h in self._histograms.items()]
+            first_start = dict(self._first_start)
+
+        def order(path: str) -> Tuple[float, ...]:
+            parts = path.split(PATH_SEPARATOR)
+            prefixes = [PATH_SEPARATOR.join(parts[:i + 1]) for i in range(len(parts))]
+            # 아직 끝나지 않은 부모 구간(기록 없음)은 자식의 시작 시각으로
+            return tuple(first_start.get(p, first_start[path]) for p in prefixes)
+
+        rows = []
+        for path, data in sorted(items, key=lambda item: order(item[0])):
+            parts = path.split(PATH_SEPARATOR)
+            rows.append({'path': path, 'name': parts[-1], 'depth': len(parts) - 1, **data})
+        return rows
+
+    def totals_by_name(self) -> Dict[str, Tuple[int, float]]:
+        """구간 이름별 (호출 수, 합계 ms) - 경로가 달라도 같은 이름이면 합산 (로그 요약용)"""
+        totals: Dict[str, Tuple[int, float]] = {}
+        with self._lock:
+            for path, h in self._histograms.items():
+                name = path.rsplit(PATH_SEPARATOR, 1)[-1]
+                n, total = totals.get(name, (0, 0.0))
+                totals[name] = (n + h.count, total + h.total)
+        return totals
+
+    def counters(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def spans(self) -> List[Dict[str, Any]]:
+        """보관 중인 개별 구간 (시작 시각 순)"""
+        with self._lock:
+            records = list(self._spans)
+        return [
+            {'path': path, 'depth': depth, 'start_ms': round(start_ms, 3),
+             'duration_ms': round(duration_ms, 3), 'thread': thread}
+            for path, depth, start_ms, duration_ms, thread in sorted(records, key=lambda r: r[2])
+        ]
+
+    def iter_jsonl(self, run_id: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """JSON Lines - run 1줄 → span N줄 → stage(경로별 집계) → counter"""
+        header = {'type': 'run', 'run_id': run_id,
+                  'started_at': self.started_at.isoformat(timespec='seconds'),
+                  'exported_at': datetime.now().isoformat(timespec='seconds'),
+                  'dropped_spans': self.dropped_spans, **(meta or {})}
+        yield json.dumps(header, ensure_ascii=False)
+        for record in self.spans():
+            yield json.dumps({'type': 'span', 'run_id': run_id, **record}, ensure_ascii=False)
+        for row in self.stats():
+            yield json.dumps({'type': 'stage', 'run_id': run_id, **row}, ensure_ascii=False)
+        for name, value in self.counters().items():
+            yield json.dumps({'type': 'counter', 'run_id': run_id, 'name': name, 'value': value},
+                             ensure_ascii=False)
+
+    def export_jsonl(self, path: str, run_id: Optional[str] = None,
+                     meta: Optional[Dict[str, Any]] = None) -> str:
+        """JSON Lines 파일로 저장 (디렉터리가 없으면 생성) - 저장한 경로 반환"""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            for line in self.iter_jsonl(run_id, meta):
+                f.write(line + '\n')
+        return path
+
+
+# ============================================================================
+# 🧵 ACTIVE TRACER (스레드별)
+# ============================================================================
+
+def current_tracer() -> Optional[Tracer]:
+    return getattr(_local, 'tracer', None)
+
+
+@contextmanager
+def activate_tracer(tracer: Optional[Tracer], path: Tuple[str, ...] = ()) -> Iterator[Optional[Tracer]]:
+    """현재 스레드에서 tracer 활성화 (중첩 경로 path 아래에서 시작)"""
+    previous = (getattr(_local, 'tracer', None), getattr(_local, 'path', ()))
+    _local.tracer, _local.path = tracer, path
+    try:
+        yield tracer
+    finally:
+        _local.tracer, _local.path = previous
+
+
+def bind_tracer(fn: Callable[..., Any], detached: bool = False) -> Callable[..., Any]:
+    """
+    현재 스레드의 활성 트레이서(와 중첩 경로)를 다른 스레드에서 쓰도록 fn을 감쌈
+
+    Args:
+        detached: True면 경로를 이어받지 않음 (호출한 구간보다 오래 사는 백그라운드 작업)
+    """
+    tracer = current_tracer()
+    if tracer is None:
+        return fn
+    path = () if detached else getattr(_local, 'path', ())
+
+    @functools.wraps(fn)
+    def run_bound(*args, **kwargs):
+        with activate_tracer(tracer, path):
+            return fn(*args, **kwargs)
+    return run_bound
+
+
+def span(name: str):
+    """활성 트레이서에 구간 기록 (없으면 아무것도 하지 않음)"""
+    tracer = getattr(_local, 'tracer', None)
+    return tracer.span(name) if tracer is not None else _NULL_SPAN
+
+
+def count(name: str, n: int = 1) -> None:
+    tracer = getattr(_local, 'tracer', None)
+    if tracer is not None:
+        tracer.count(name, n)
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """함수 전체를 구간으로 기록하는 데코레이터 (기본 이름: 함수명)"""
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = getattr(_local, 'tracer', None)
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with tracer.span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# ============================================================================
+# 🧪 MODULE TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import tempfile
+
+    print("=== Stage Timing & Tracing Test ===")
+
+    @traced('render.email')
+    def render(i: int) -> str:
+        time.sleep(0.001)
+        return f"<p>{i}</p>"
+
+    # 1. 트레이서가 없으면 그대로 실행 + 오버헤드
+    n_calls = 100_000
+    start = time.perf_counter()
+    for _ in range(n_calls):
+        with span('noop'):
+            pass
+    null_us = (time.perf_counter() - start) / n_calls * 1e6
+
+    tracer = Tracer(max_spans=50)
+    with activate_tracer(tracer):
+        start = time.perf_counter()
+        for _ in range(n_calls):
+            with span('overhead'):
+                pass
+        active_us = (time.perf_counter() - start) / n_calls * 1e6
+    print(f"  span overhead: inactive {null_us:.2f}us, active {active_us:.2f}us")
+    tracer.reset()
+
+    # 2. 중첩 + 다른 스레드로 전달 + 카운터
+    with activate_tracer(tracer):
+        with span('send'):
+            for i in range(20):
+                render(i)
+
+            def worker():
+                for _ in range(10):
+                    with span('smtp.send'):
+                        time.sleep(0.002)
+                    count('mail.sent')
+            threads = [threading.Thread(target=bind_tracer(worker)) for _ in range(3)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+    assert render(1) == "<p>1</p>"  # 활성 트레이서 밖 - 기록 안 됨
+
+    stats = {row['path']: row for row in tracer.stats()}
+    for row in tracer.stats():
+        print(f"  {'  ' * row['depth']}{row['name']:<14} x{row['count']:<3} "
+              f"total {row['total_ms']:7.1f}ms  p50 {row['p50_ms']:6.2f}ms  p95 {row['p95_ms']:6.2f}ms")
+    assert list(stats) == ['send', 'send/render.email', 'send/smtp.send']
+    assert stats['send/render.email']['count'] == 20 and stats['send/smtp.send']['count'] == 30
+    assert stats['send/smtp.send']['min_ms'] >= 2.0
+    assert stats['send/smtp.send']['min_ms'] <= stats['send/smtp.send']['p50_ms'] <= stats['send/smtp.send']['max_ms']
+    assert tracer.counters() == {'mail.sent': 30}
+
+    # 3. JSON Lines 내보내기 (개별 구간은 최근 50건만)
+    path = tracer.export_jsonl(os.path.join(tempfile.mkdtemp(), 'metrics', 'run.jsonl'), run_id='test',
+                               meta={'groups': 20})
+    with open(path, encoding='utf-8') as f:
+        lines = [json.loads(line) for line in f]
+    kinds = [line['type'] for line in lines]
+    assert kinds[0] == 'run' and lines[0]['groups'] == 20 and lines[0]['dropped_spans'] == 1
+    assert kinds.count('span') == 50 and kinds.count('stage') == 3 and kinds.count('counter') == 1
+    print(f"  exported {len(lines)} lines → {path}")
+
+    print("\n✅ Tracing test passed!")
@@ -0,0 +1,282 @@
+"""
+================================================================================
+🧩 Incremental Step 2 → 3 Preparation Pipeline
+================================================================================
+Step 2 → 3 데이터 준비(이메일 병합 → 숫자 정리 → 그룹화)를 단계별로 캐시하고,
+입력이 바뀐 단계만 다시 실행합니다.
+
+기존에는 다음 단계로 갈 때마다 df.copy() → merge_email_data →
+clean_dataframe → group_data_with_wildcard를 처음부터 다시 실행했기 때문에
+합계 자동 계산 토글이나 표시 컬럼 순서만 바꿔도 전체 시트를 다시
+처리했습니다. 이 모듈은 각 단계의 결과를 그 단계가 실제로 읽는 입력으로
+만든 키와 함께 보관합니다.
+
+단계와 키 (앞 단계 키를 포함 - 앞 단계가 다시 실행되면 뒤 단계도 다시 실행):
+    merge     : 데이터 시트 키, 이메일 시트 키, 조인 컬럼 2개, 이메일 컬럼
+                (이메일 시트는 email_directory의 해시 인덱스로 조회 - 시트당 1회 생성, 세션 공유)
+    clean     : merge + 금액/퍼센트 컬럼
+    partition : clean + 그룹 키 컬럼, 이메일 컬럼, 충돌 처리, 와일드카드 사용/접미사
+    display   : clean + 컬럼명 (컬럼별 캐시 - 표시 컬럼 추가/순서 변경은 새 컬럼만 계산)
+    totals    : partition (합계 자동 계산이 켜졌을 때만)
+    assemble  : partition + display + totals + 표시 컬럼 순서 + 세금계산서 금액 컬럼
+
+핵심 원칙:
+1. 시트 키 = (업로드 내용 해시, 시트명) - 같은 시트를 다시 읽어도 캐시 유지
+2. 단계당 최신 결과 1개만 보관 (세션당 메모리 상한)
+3. 결과는 처음부터 실행한 것과 완전히 같음 (단계 함수는 기존 함수 그대로)
+4. 캐시된 DataFrame/grouped_data(GroupedDataset)는 읽기 전용으로 취급
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+from dataclasses import dataclass, field
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import merge_email_data, clean_dataframe
+from email_directory import EmailDirectoryStore, get_email_directory
+from frame_lineage import ORIGINAL_STR_ATTR
+from grouped_dataset import GroupedDataset
+from grouping_engine import partition_groups, build_display_columns, compute_group_totals, assemble_groups
+from perf_trace import span
+
+
+PIPELINE_STAGES = ('merge', 'clean', 'partition', 'display', 'totals', 'assemble')
+
+
+@dataclass(frozen=True)
+class PrepSettings:
+    """Step 2 설정 (리스트는 튜플로 바꿔 키로 사용)"""
+    group_key_col: str
+    email_col: Optional[str] = None
+    amount_cols: Tuple[str, ...] = ()
+    percent_cols: Tuple[str, ...] = ()
+    display_cols: Tuple[str, ...] = ()
+    join_col_data: Optional[str] = None
+    join_col_email: Optional[str] = None
+    conflict_resolution: str = 'first'
+    use_wildcard: bool = True
+    wildcard_suffixes: Tuple[str, ...] = (' 합계',)
+    calculate_totals: bool = False
+    tax_amount_col: Optional[str] = None  # 지정하면 조립 때 그룹별 세금계산서 발행 금액 계산
+
+    def __post_init__(self):
+        for name in ('amount_cols', 'percent_cols', 'display_cols', 'wildcard_suffixes'):
+            object.__setattr__(self, name, tuple(getattr(self, name) or ()))
+
+
+@dataclass
+class PrepResult:
+    """준비 결과 + 이번 실행에서 다시 계산한 단계"""
+    df: pd.DataFrame
+    grouped: GroupedDataset
+    conflicts: List[Dict[str, Any]]
+    executed: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+
+# ============================================================================
+# 🧩 PIPELINE
+# ============================================================================
+
+class PrepPipeline:
+    """
+    세션별 Step 2 → 3 단계 캐시
+
+    사용 예:
+        pipeline = PrepPipeline()
+        result = pipeline.run(df_raw, (content_hash, sheet_name), settings,
+                              df_email, (content_hash, email_sheet))
+        result.grouped, result.conflicts, result.executed  # ['assemble'] 등
+    """
+
+    def __init__(self, directory_store: Optional[EmailDirectoryStore] = None):
+        self.directory_store = directory_store
+        self._stages: Dict[str, Tuple[Hashable, Any]] = {}
+        self._display_key: Optional[Hashable] = None
+        self._display_columns: Dict[str, np.ndarray] = {}
+        self._inputs: Tuple[Any, Any] = (None, None)  # 키가 id()일 때 프레임이 재사용되지 않도록 보관
+        self.hits: Dict[str, int] = {name: 0 for name in PIPELINE_STAGES}
+        self.misses: Dict[str, int] = {name: 0 for name in PIPELINE_STAGES}
+
+    def clear(self) -> None:
+        self.__init__(self.directory_store)
+
+    def _stage(self, name: str, key: Hashable, compute: Callable[[], Any], executed: List[str]) -> Any:
+        cached = self._stages.get(name)
+        if cached is not None and cached[0] == key:
+            self.hits[name] += 1
+            return cached[1]
+        with span(name):
+            value = compute()
+        self._stages[name] = (key, value)
+        self.misses[name] += 1
+        executed.append(name)
+        return value
+
+    def run(self, df_data: pd.DataFrame, data_key: Optional[Hashable], settings: PrepSettings,
+            df_email: Optional[pd.DataFrame] = None, email_key: Optional[Hashable] = None) -> PrepResult:
+        """
+        데이터 준비 실행 - 입력이 바뀐 단계만 다시 계산
+
+        Args:
+            df_data: 엑셀 원본 데이터 시트 (정리 전)
+            data_key: 데이터 시트 키 (예: (내용 해시, 시트명)). None이면 프레임 객체 기준
+            settings: Step 2 설정
+            df_email: 별도 이메일 시트 (없으면 병합하지 않음)
+            email_key: 이메일 시트 키
+        """
+        start = time.perf_counter()
+        executed: List[str] = []
+        s = settings
+        merging = df_email is not None and bool(s.join_col_data and s.join_col_email and s.email_col)
+
+        if data_key is None or (merging and email_key is None):
+            self._inputs = (df_data, df_email)
+        source_key = (data_key if data_key is not None else ('frame', id(df_data)),
+                      (email_key if email_key is not None else ('frame', id(df_email))) if merging else None)
+
+        # 1. 이메일 병합 (병합하지 않으면 원본 그대로 - clean_dataframe이 복사)
+        def merge():
+            if not merging:
+                return df_data
+            directory = get_email_directory(df_email, s.join_col_email, s.email_col, email_key,
+                                            self.directory_store)
+            return merge_email_data(df_data, df_email, s.join_col_data, s.join_col_email, s.email_col,
+                                    directory=directory)
+
+        merge_key = (source_key, s.join_col_data, s.join_col_email, s.email_col) if merging else (source_key,)
+        df_merged = self._stage('merge', merge_key, merge, executed)
+
+        # 2. 숫자 컬럼 정리 (date/id 컬럼은 변환하지 않으므로 키에서 제외)
+        clean_key = (merge_key, s.amount_cols, s.percent_cols)
+        df_cleaned = self._stage(
+            'clean', clean_key,
+            lambda: clean_dataframe(df_merged, list(s.amount_cols), list(s.percent_cols), [], []),
+            executed
+        )
+
+        # 3. 그룹 분할 + 수신 이메일
+        partition_key = (clean_key, s.group_key_col, s.email_col, s.conflict_resolution,
+                         s.use_wildcard, s.wildcard_suffixes)
+        partition = self._stage(
+            'partition', partition_key,
+            lambda: partition_groups(df_cleaned, s.group_key_col, s.email_col, s.conflict_resolution,
+                                     s.use_wildcard, list(s.wildcard_suffixes)),
+            executed
+        )
+
+        # 4. 표시 문자열 - 컬럼별 캐시 (정리 결과가 바뀌면 전부 폐기)
+        if self._display_key != clean_key:
+            self._display_key = clean_key
+            self._display_columns = {}
+        display_cols = list(s.display_cols)
+        new_cols = [c for c in display_cols if c not in self._display_columns]
+        display_columns = self._stage(
+            'display', (clean_key, s.display_cols),
+            lambda: build_display_columns(df_cleaned, display_cols, df_cleaned.attrs.get(ORIGINAL_STR_ATTR, None),
+                                         column_cache=self._display_columns),
+            executed
+        )
+        if executed and executed[-1] == 'display':
+            executed[-1] = f"display({len(new_cols)}/{len(display_cols)} cols)"
+
+        # 5. 금액 합계 (합계 자동 계산이 켜진 경우에만)
+        totals = None
+        if s.calculate_totals:
+            totals = self._stage(
+                'totals', (partition_key,),
+                lambda: compute_group_totals(df_cleaned, partition, list(s.amount_cols)),
+                executed
+            )
+
+        # 6. 조립 (+ 세금계산서 발행 금액)
+        grouped = self._stage(
+            'assemble', (partition_key, s.display_cols, s.calculate_totals, s.tax_amount_col),
+            lambda: assemble_groups(partition, display_columns, display_cols, totals, s.tax_amount_col),
+            executed
+        )
+
+        return PrepResult(df_cleaned, grouped, partition.conflicts, executed, time.perf_counter() - start)
+
+
+# ============================================================================
+# 🧪 MODULE TEST (설정 변경별 재계산 단계 + 결과 동일성)
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+
+    from grouping_engine import group_data_with_wildcard
+
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+    rows_per_group = 12
+    print(f"=== Incremental Prep Pipeline Test ({n_groups:,} groups × {rows_per_group + 1} rows) ===")
+
+    records = []
+    for g in range(n_groups):
+        for r in range(rows_per_group):
+            records.append({"CSO관리업체명": f"업체{g:05d}", "거래처코드": f"H{g:05d}{r:02d}",
+                            "품목명": f"품목{r}", "처방액": f"{(r + 1) * 12_345:,}", "수수료율": "35%",
+                            "총 수수료액": f"{(r + 1) * 4_321:,}", "사업자번호": f"{g:010d}"})
+        records.append({"CSO관리업체명": f"업체{g:05d} 합계", "거래처코드": None, "품목명": None,
+                        "처방액": None, "수수료율": None,
+                        "총 수수료액": f"{sum((r + 1) * 4_321 for r in range(rows_per_group)):,}",
+                        "사업자번호": f"{g:010d}"})
+    df_raw = pd.DataFrame(records)
+    df_email = pd.DataFrame({"사업자번호": [f"{g:010d}" for g in range(n_groups)],
+                             "이메일": [f"cso{g}@example.com" for g in range(n_groups)]})
+
+    base = PrepSettings(
+        group_key_col="CSO관리업체명", email_col="이메일",
+        amount_cols=["처방액", "총 수수료액"], percent_cols=["수수료율"],
+        display_cols=list(df_raw.columns) + ["이메일"],
+        join_col_data="사업자번호", join_col_email="사업자번호",
+    )
+
+    def full_run(settings: PrepSettings):
+        """기존 방식 - 매번 처음부터"""
+        df_work = merge_email_data(df_raw.copy(), df_email, settings.join_col_data,
+                                   settings.join_col_email, settings.email_col)
+        df_cleaned = clean_dataframe(df_work, list(settings.amount_cols), list(settings.percent_cols), [], [])
+        return group_data_with_wildcard(df_cleaned, settings.group_key_col, settings.email_col,
+                                        list(settings.amount_cols), list(settings.percent_cols),
+                                        list(settings.display_cols), settings.conflict_resolution,
+                                        settings.use_wildcard, list(settings.wildcard_suffixes),
+                                        settings.calculate_totals)
+
+    from dataclasses import replace
+    # 각 시나리오는 바로 앞 설정에서 한 가지만 바꿈
+    toggled = replace(base, calculate_totals=True)
+    reordered = replace(toggled, display_cols=list(reversed(base.display_cols)))
+    widened = replace(reordered, display_cols=list(reordered.display_cols) + ["비고"])
+    resolved = replace(widened, conflict_resolution='most_common')
+    scenarios = [
+        ("first run", base, None),
+        ("same settings", base, []),
+        ("toggle calculate_totals", toggled, ['totals', 'assemble']),
+        ("reorder display_cols", reordered, ['display(0/8 cols)', 'assemble']),
+        ("display_cols + 1 col", widened, ['display(1/9 cols)', 'assemble']),
+        ("conflict resolution", resolved, ['partition', 'totals', 'assemble']),
+        ("amount_cols changed", replace(resolved, amount_cols=["총 수수료액"]), None),
+    ]
+
+    pipeline = PrepPipeline()
+    for label, settings, expected in scenarios:
+        start = time.perf_counter()
+        expected_grouped, expected_conflicts = full_run(settings)
+        full_time = time.perf_counter() - start
+
+        result = pipeline.run(df_raw, ("synthetic", "정산서"), settings, df_email, ("synthetic", "사업자"))
+        assert result.grouped == expected_grouped and result.conflicts == expected_conflicts, label
+        if expected is not None:
+            assert result.executed == expected, (label, result.executed)
+        print(f"  {label:<24}: full {full_time:.2f}s → pipeline {result.elapsed:.3f}s "
+              f"(re-ran: {', '.join(result.executed) or '-'})")
+
+    print("\n✅ Pipeline results match full runs!")
@@ -0,0 +1,247 @@
+"""
+================================================================================
+🪣 Token-Bucket Rate Limiter
+================================================================================
+발송 속도 제한기 - 토큰 버킷 방식 (rate, burst, jitter, 배치 휴식)
+
+기존에는 Streamlit 스크립트 스레드에서 time.sleep()으로 직접 대기했기
+때문에 대기 중에는 화면이 멈추고 🛑 긴급 정지 버튼도 반영되지 않았습니다.
+이 제한기는 발송 슬롯을 예약만 하고, 대기는 발송 워커 스레드(또는 asyncio
+태스크)가 정지 이벤트와 함께 수행합니다. 화면 쪽에서는 snapshot()으로
+현재 속도와 다음 발송 예정 시각(ETA)만 읽어 표시합니다.
+
+동작 규칙:
+1. 토큰은 초당 rate개씩 채워지고 최대 burst개까지 쌓임 (발송 1건 = 토큰 1개)
+2. 슬롯마다 0~jitter초의 랜덤 지연 추가 (일정한 간격 패턴 회피)
+3. batch_size건마다 batch_cooldown초 휴식 (휴식 후 버킷은 비어 있는 상태로 재시작)
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Deque, Dict, Optional
+from collections import deque
+import asyncio
+import random
+import threading
+import time
+
+
+# 관측 발송 속도 계산 구간 (초)
+OBSERVED_RATE_WINDOW = 60.0
+
+
+class TokenBucketRateLimiter:
+    """
+    스레드 안전 토큰 버킷 - 발송 슬롯을 순서대로 예약
+
+    사용 예:
+        limiter = TokenBucketRateLimiter.from_delays(5, 10, batch_size=10, batch_delay=30)
+        if limiter.wait(stop_event):   # 워커 스레드
+            send(...)
+    """
+
+    def __init__(self, rate: float, burst: int = 1, jitter: float = 0.0,
+                 batch_size: int = 0, batch_cooldown: float = 0.0):
+        """
+        Args:
+            rate: 초당 발송 토큰 수 (0 이하이면 제한 없음)
+            burst: 버킷 최대 토큰 수 (연속 발송 허용량)
+            jitter: 슬롯마다 추가하는 최대 랜덤 지연 (초)
+            batch_size: 배치 크기 (0이면 배치 휴식 없음)
+            batch_cooldown: 배치마다 휴식 시간 (초)
+        """
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.jitter = max(0.0, float(jitter))
+        self.batch_size = max(0, int(batch_size))
+        self.batch_cooldown = max(0.0, float(batch_cooldown))
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)  # _updated 시각 기준 토큰 수
+        self._updated = time.monotonic()
+        self._next_slot = 0.0             # 다음 슬롯의 가장 이른 시각
+        self._reserved = 0
+        self._sent_times: Deque[float] = deque()
+
+    @classmethod
+    def from_delays(cls, delay_min: float, delay_max: float, batch_size: int = 0,
+                    batch_delay: float = 0.0, burst: int = 1) -> "TokenBucketRateLimiter":
+        """
+        기존 발송 설정(메일 간 랜덤 딜레이 min~max, 배치 크기/간격)에서 생성
+
+        burst=1이면 기존 루프와 같은 "최소 간격 delay_min + 랜덤 0~(max-min)" 패턴이 됩니다.
+        """
+        rate = 1.0 / delay_min if delay_min > 0 else 0.0
+        return cls(rate=rate, burst=burst, jitter=max(0.0, delay_max - delay_min),
+                   batch_size=batch_size, batch_cooldown=batch_delay)
+
+    # ------------------------------------------------------------------------
+    # 예약
+    # ------------------------------------------------------------------------
+
+    def _tokens_at(self, t: float) -> float:
+        """시각 t의 토큰 수 (_updated 이후 채워진 양 포함, burst 상한)"""
+        if self.rate <= 0:
+            return float(self.burst)
+        return min(float(self.burst), self._tokens + max(0.0, t - self._updated) * self.rate)
+
+    def reserve(self) -> float:
+        """
+        토큰 1개를 예약하고 발송 가능한 시각(time.monotonic 기준)을 반환합니다.
+        반환 시각이 미래이면 호출자가 그때까지 대기해야 합니다.
+
+        버킷 상태는 "마지막 예약 슬롯 시각 기준"으로 보관하므로 여러 워커가
+        동시에 예약해도 슬롯이 겹치지 않습니다.
+        """
+        with self._lock:
+            slot = max(time.monotonic(), self._next_slot)
+            tokens = self._tokens_at(slot)
+            if tokens < 1.0:
+                slot += (1.0 - tokens) / self.rate
+                tokens = 1.0
+            if self.jitter:
+                slot += random.uniform(0.0, self.jitter)
+                tokens = self._tokens_at(slot)
+
+            self._tokens = tokens - 1.0
+            self._updated = slot
+            self._next_slot = slot
+            self._reserved += 1
+
+            if self.batch_size and self._reserved % self.batch_size == 0:
+                # 배치 휴식: 휴식이 끝난 시점부터 다시 채움
+                # (휴식 후 burst만큼 몰아서 보내지 않도록)
+                self._next_slot = slot + self.batch_cooldown
+                self._updated = self._next_slot
+            return slot
+
+    def wait(self, stop_event: Optional[threading.Event] = None) -> bool:
+        """
+        슬롯까지 대기 (워커 스레드용) - 정지 이벤트가 설정되면 즉시 반환
+
+        Returns:
+            발송 가능하면 True, 정지 요청이면 False
+        """
+        slot = self.reserve()
+        delay = slot - time.monotonic()
+        if stop_event is None:
+            if delay > 0:
+                time.sleep(delay)
+            self._mark_sent()
+            return True
+
+        if delay > 0 and stop_event.wait(delay):
+            return False
+        if stop_event.is_set():
+            return False
+        self._mark_sent()
+        return True
+
+    async def acquire(self) -> None:
+        """슬롯까지 대기 (asyncio용 - 이벤트 루프를 막지 않음)"""
+        delay = self.reserve() - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._mark_sent()
+
+    def _mark_sent(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._sent_times.append(now)
+            while self._sent_times and now - self._sent_times[0] > OBSERVED_RATE_WINDOW:
+                self._sent_times.popleft()
+
+    # ------------------------------------------------------------------------
+    # 상태 조회 (UI 표시용)
+    # ------------------------------------------------------------------------
+
+    def current_rate(self) -> float:
+        """최근 OBSERVED_RATE_WINDOW초 동안 실제 발송 속도 (건/분)"""
+        now = time.monotonic()
+        with self._lock:
+            recent = [t for t in self._sent_times if now - t <= OBSERVED_RATE_WINDOW]
+        if len(recent) < 2:
+            return 0.0
+        span = max(recent[-1] - recent[0], 1e-9)
+        return (len(recent) - 1) / span * 60.0
+
+    def next_send_eta(self) -> float:
+        """다음 발송까지 남은 시간 (초, 즉시 가능하면 0)"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            tokens = self._tokens_at(slot)
+            if tokens < 1.0:
+                slot += (1.0 - tokens) / self.rate
+            return max(0.0, slot - now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """현재 상태 - 설정 속도, 관측 속도, 다음 발송 ETA, 배치 진행"""
+        eta = self.next_send_eta()
+        with self._lock:
+            reserved = self._reserved
+        in_batch = reserved % self.batch_size if self.batch_size else reserved
+        return {
+            'configured_per_min': self.rate * 60.0 if self.rate > 0 else None,
+            'current_per_min': self.current_rate(),
+            'next_send_eta': eta,
+            'reserved': reserved,
+            'batch_position': in_batch,
+            'in_cooldown': bool(self.batch_size and reserved and in_batch == 0 and eta > 0),
+        }
+
+
+# ============================================================================
+# 🧪 MODULE TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    print("=== Token Bucket Rate Limiter Test ===")
+
+    # 1. burst만큼은 즉시, 이후는 rate 간격
+    limiter = TokenBucketRateLimiter(rate=20, burst=5)
+    start = time.monotonic()
+    slots = [limiter.reserve() - start for _ in range(10)]
+    print(f"  burst slots: {[round(s, 2) for s in slots]}")
+    assert all(s < 0.01 for s in slots[:5])
+    assert abs(slots[9] - 0.25) < 0.02  # 5개 초과분 5개 × 0.05s
+
+    # 2. 기존 설정 매핑 + 배치 휴식
+    limiter = TokenBucketRateLimiter.from_delays(0.05, 0.05, batch_size=4, batch_delay=0.3)
+    start = time.monotonic()
+    slots = [limiter.reserve() - start for _ in range(9)]
+    print(f"  batch slots: {[round(s, 2) for s in slots]}")
+    assert slots[4] - slots[3] > 0.34 and slots[8] - slots[7] > 0.34
+    assert abs((slots[3] - slots[0]) - 0.15) < 0.02
+
+    # 3. jitter는 간격에 더해짐 (기존 random.uniform(min, max)와 같은 평균 간격)
+    limiter = TokenBucketRateLimiter.from_delays(1.0, 3.0)
+    slots = [limiter.reserve() for _ in range(2001)]
+    mean_gap = (slots[-1] - slots[0]) / 2000
+    print(f"  jitter mean gap: {mean_gap:.2f}s (expected ~2.00s)")
+    assert 1.9 < mean_gap < 2.1
+
+    # 4. 정지 이벤트는 대기 중에도 즉시 반영
+    limiter = TokenBucketRateLimiter(rate=0.1, burst=1)
+    limiter.reserve()
+    stop = threading.Event()
+    threading.Timer(0.1, stop.set).start()
+    start = time.monotonic()
+    assert limiter.wait(stop) is False
+    print(f"  stop honored after {time.monotonic() - start:.2f}s (slot was 10s away)")
+
+    # 5. asyncio 대기 + 상태 조회
+    limiter = TokenBucketRateLimiter(rate=50, burst=1, jitter=0.01)
+
+    async def _send_all(n: int) -> None:
+        for _ in range(n):
+            await limiter.acquire()
+
+    asyncio.run(_send_all(20))
+    snap = limiter.snapshot()
+    print(f"  snapshot: {snap}")
+    assert 2000 <= snap['current_per_min'] <= 3100
+
+    print("\n✅ All rate limiter tests passed!")
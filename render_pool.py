@@ -0,0 +1,230 @@
+"""
+================================================================================
+🏭 Parallel Email Renderer (Process Pool)
+================================================================================
+발송 전에 모든 메일 본문(HTML)과 제목을 프로세스 풀에서 미리 렌더링합니다.
+
+기존에는 그룹마다 render_email_content를 순서대로 호출했기 때문에
+대량 발송(수천 개 업체)에서는 렌더링만으로 발송 시작이 수 초 이상
+늦어졌습니다. 이 모듈은 그룹을 청크로 나눠 워커 프로세스에 보내고,
+완료된 청크를 원래 순서대로 바로 돌려줍니다(스트리밍). 호출자는 첫
+청크가 끝나는 즉시 발송 큐에 넣을 수 있습니다.
+
+핵심 원칙:
+1. 템플릿 원문은 워커 초기화 때 한 번만 전달 - 워커마다 한 번 컴파일해 재사용
+   (Jinja2 Template 객체는 피클링할 수 없으므로 원문을 보내고 워커의
+    TEMPLATE_REGISTRY에서 컴파일)
+2. 청크 단위 전송 - 그룹마다 프로세스 간 왕복하지 않음
+3. 결과 순서 = 그룹 순서 (발송 순서 유지)
+   발신자를 지정하면 메시지 바이트(build_wire_bytes)까지 워커에서 만들어 둠
+4. 그룹 수가 적거나 워커가 1개면 프로세스 없이 같은 함수로 직렬 렌더링
+5. spawn 방식 - Streamlit 서버(스레드 다수)를 fork하지 않음, Windows와 동작 동일
+   (직접 작성한 스크립트에서 호출할 때는 if __name__ == "__main__": 가드 필요)
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import multiprocessing
+import os
+
+from email_template import render_email_content, render_tax_invoice_html, get_compiled_template
+from smtp_dispatcher import SendJob, build_wire_bytes
+from perf_trace import span
+
+
+# 이 수보다 적은 그룹은 직렬 렌더링 (프로세스 시작 비용이 더 큼)
+PARALLEL_RENDER_MIN_GROUPS = 200
+
+# 워커 수 상한 및 청크 크기 범위 (그룹 수)
+MAX_RENDER_WORKERS = 8
+MIN_RENDER_CHUNK = 25
+MAX_RENDER_CHUNK = 500
+
+
+@dataclass
+class RenderSettings:
+    """렌더링에 필요한 공통 설정 - 워커 초기화 때 한 번만 전달"""
+    templates: Dict[str, str]
+    display_cols: List[str]
+    amount_cols: List[str]
+    period: str
+    tax_amount_col: Optional[str] = None  # None이면 세금계산서 발행 정보 생략
+    sender_email: Optional[str] = None    # 지정하면 메시지 바이트까지 생성 (발송용)
+    sender_name: Optional[str] = None
+
+
+# 청크 1개 = [(원래 순서, 그룹 키, 그룹 데이터)]
+RenderItem = Tuple[int, str, Dict[str, Any]]
+# 청크 결과 = (발송 작업, 렌더링 실패 행)
+RenderChunk = Tuple[List[SendJob], List[Dict[str, str]]]
+
+
+# ============================================================================
+# 🖋️ RENDERING (워커/직렬 공통)
+# ============================================================================
+
+def render_chunk(items: List[RenderItem], settings: RenderSettings) -> RenderChunk:
+    """그룹 묶음 렌더링 - 실패한 그룹은 결과 행(send_results 형식)으로"""
+    subject_template = get_compiled_template(settings.templates['subject'])
+    jobs: List[SendJob] = []
+    failed: List[Dict[str, str]] = []
+    for index, gk, gd in items:
+        try:
+            tax_html = render_tax_invoice_html(gk, gd, settings.tax_amount_col)
+            html = render_email_content(gk, gd, settings.display_cols, settings.amount_cols,
+                                        settings.templates, extra_html_before_table=tax_html)
+            subject = subject_template.render(company_name=gk, period=settings.period)
+            job = SendJob(gk, gd['recipient_email'], subject, html, index=index)
+            if settings.sender_email:
+                with span('mime.build'):
+                    job.wire = build_wire_bytes(settings.sender_email, job.recipient, subject, html,
+                                                settings.sender_name)
+            jobs.append(job)
+        except Exception as e:
+            failed.append({'그룹': gk, '이메일': gd.get('recipient_email') or '', '상태': '실패', '사유': str(e)})
+    return jobs, failed
+
+
+# 워커 프로세스 전역 - _init_worker에서 설정
+_worker_settings: Optional[RenderSettings] = None
+
+
+def _init_worker(settings: RenderSettings) -> None:
+    """워커 초기화 - 설정 보관 + 템플릿 미리 컴파일 (워커당 1회)"""
+    global _worker_settings
+    _worker_settings = settings
+    for source in settings.templates.values():
+        if source:
+            get_compiled_template(source)
+
+
+def _render_in_worker(items: List[RenderItem]) -> RenderChunk:
+    return render_chunk(items, _worker_settings)
+
+
+# ============================================================================
+# 🏭 POOL
+# ============================================================================
+
+def default_render_workers() -> int:
+    return max(1, min(os.cpu_count() or 1, MAX_RENDER_WORKERS))
+
+
+def _chunk_size(n_items: int, workers: int) -> int:
+    """워커당 4청크 정도 (진행 중 부하 분산 + 첫 청크가 빨리 끝나도록)"""
+    size = -(-n_items // (workers * 4))
+    return max(MIN_RENDER_CHUNK, min(MAX_RENDER_CHUNK, size))
+
+
+def iter_rendered_chunks(groups: List[Tuple[int, str, Dict[str, Any]]], settings: RenderSettings,
+                         workers: Optional[int] = None,
+                         chunk_size: Optional[int] = None) -> Iterator[RenderChunk]:
+    """
+    그룹 렌더링 - 완료된 청크를 원래 순서대로 yield
+
+    Args:
+        groups: (원래 순서 index, 그룹 키, 그룹 데이터) 목록 - 이메일이 유효한 그룹만
+        settings: 템플릿/컬럼 설정
+        workers: 프로세스 수 (기본: CPU 수, 1이면 직렬)
+        chunk_size: 청크당 그룹 수 (기본: 그룹 수/워커 수로 자동)
+    """
+    items = list(groups)
+    if not items:
+        return
+    workers = default_render_workers() if workers is None else max(1, int(workers))
+    workers = min(workers, -(-len(items) // MIN_RENDER_CHUNK))
+    size = chunk_size or _chunk_size(len(items), workers)
+    chunks = [items[i:i + size] for i in range(0, len(items), size)]
+
+    # 청크 구간(render.chunk)은 소비자 대기 시간을 빼고 렌더링(풀이면 결과 대기)만 측정
+    if workers <= 1 or len(items) < PARALLEL_RENDER_MIN_GROUPS:
+        for chunk in chunks:
+            with span('render.chunk'):
+                result = render_chunk(chunk, settings)
+            yield result
+        return
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(settings,)) as pool:
+        # map은 제출 순서대로 결과를 돌려줌 - 앞 청크가 끝나는 즉시 yield
+        results = pool.map(_render_in_worker, chunks)
+        for _ in chunks:
+            with span('render.chunk'):
+                result = next(results)
+            yield result
+
+
+def render_all(groups: List[Tuple[int, str, Dict[str, Any]]], settings: RenderSettings,
+               workers: Optional[int] = None) -> RenderChunk:
+    """전체 렌더링 결과를 한 번에 (발송 작업 목록, 실패 행)"""
+    jobs: List[SendJob] = []
+    failed: List[Dict[str, str]] = []
+    for chunk_jobs, chunk_failed in iter_rendered_chunks(groups, settings, workers):
+        jobs.extend(chunk_jobs)
+        failed.extend(chunk_failed)
+    return jobs, failed
+
+
+# ============================================================================
+# 🧪 MODULE TEST (5,000개 그룹 렌더링 벤치마크)
+# ============================================================================
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    from constants import TEMPLATE_PRESETS
+
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 5_000
+    n_workers = int(sys.argv[2]) if len(sys.argv) > 2 else default_render_workers()
+    print(f"=== Parallel Render Benchmark ({n_groups:,} groups, {n_workers} workers, "
+          f"{os.cpu_count()} CPUs) ===")
+
+    preset = TEMPLATE_PRESETS["기본 (정산서)"]
+    settings = RenderSettings(
+        templates={'subject': preset.subject, 'header_title': preset.header, 'greeting': preset.body,
+                   'info': '', 'additional': '', 'footer': preset.footer},
+        display_cols=["거래처코드", "품목명", "처방액", "수수료율", "총 수수료액"],
+        amount_cols=["총 수수료액"],
+        period="2026년 10월",
+        tax_amount_col="총 수수료액",
+    )
+    groups = []
+    for g in range(n_groups):
+        rows = [{"거래처코드": f"H{g:05d}{r:02d}", "품목명": f"품목{r}", "처방액": f"{(r + 1) * 12_345:,}",
+                 "수수료율": "35%", "총 수수료액": f"{(r + 1) * 4_321:,}"} for r in range(12)]
+        rows.append({"거래처코드": f"업체{g:05d} 합계", "품목명": "", "처방액": "", "수수료율": "",
+                     "총 수수료액": f"{sum((r + 1) * 4_321 for r in range(12)):,}"})
+        groups.append((g, f"업체{g:05d}", {'recipient_email': f"cso{g}@example.com", 'rows': rows,
+                                          'totals': {}, 'row_count': len(rows)}))
+
+    start = time.perf_counter()
+    serial_jobs, serial_failed = render_all(groups, settings, workers=1)
+    serial_time = time.perf_counter() - start
+    print(f"  serial               : {serial_time:.2f}s ({n_groups / serial_time:,.0f} groups/s)")
+
+    start = time.perf_counter()
+    first_chunk_at = None
+    pool_jobs: List[SendJob] = []
+    for chunk_jobs, _ in iter_rendered_chunks(groups, settings, workers=n_workers):
+        if first_chunk_at is None:
+            first_chunk_at = time.perf_counter() - start
+        pool_jobs.extend(chunk_jobs)
+    pool_time = time.perf_counter() - start
+    print(f"  process pool         : {pool_time:.2f}s ({n_groups / pool_time:,.0f} groups/s), "
+          f"first chunk after {first_chunk_at:.2f}s")
+
+    # 결과 동일성 + 순서
+    assert not serial_failed and len(pool_jobs) == n_groups
+    assert [j.index for j in pool_jobs] == list(range(n_groups))
+    assert all(a.html == b.html and a.subject == b.subject for a, b in zip(serial_jobs, pool_jobs))
+    assert "₩" in pool_jobs[0].html  # 세금계산서 발행 정보 포함
+
+    print(f"  Speedup              : {serial_time / pool_time:.2f}x")
+    print("\n✅ Benchmark complete!")
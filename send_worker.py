@@ -0,0 +1,363 @@
+"""
+================================================================================
+🧵 Background Send Worker
+================================================================================
+발송 작업을 Streamlit 스크립트 실행과 분리하여 백그라운드 스레드에서 수행합니다.
+
+기존에는 발송 루프 전체가 스크립트 리런 안에서 돌았기 때문에 탭을 닫거나
+리런이 발생하면 발송이 중단되었습니다. 이 모듈의 워커는 프로세스 전역
+레지스트리에 등록되어 세션과 무관하게 계속 실행되고, 화면은 작업 ID로
+진행 상황을 조회(폴링)만 합니다. 작업 ID는 URL 쿼리 파라미터에도 저장되므로
+브라우저를 새로고침해도 같은 작업에 다시 연결할 수 있습니다.
+
+상태 전이:
+    running ⇄ paused → stopping → stopped
+    running → completed | failed
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import threading
+import traceback
+import uuid
+
+from perf_trace import bind_tracer, span
+from rate_limiter import TokenBucketRateLimiter
+from smtp_dispatcher import DispatchResult, SendJob, SMTPDispatcher
+
+
+# 레지스트리에 보관할 종료된 작업 수 (오래된 것부터 제거)
+MAX_FINISHED_WORKERS = 20
+
+ACTIVE_STATES = ('running', 'paused', 'stopping')
+
+
+def new_send_job_id() -> str:
+    """발송 작업 ID (outbox run_id로도 사용)"""
+    return uuid.uuid4().hex[:12]
+
+
+def describe_send_error(error: Optional[str]) -> str:
+    """SMTP 오류 문자열을 화면 표시용 사유로 변환"""
+    if 'SMTPAuthenticationError' in str(error):
+        return "인증 오류 (비밀번호 확인)"
+    if 'SMTPRecipientsRefused' in str(error):
+        return "수신자 거부 (이메일 주소 확인)"
+    return error or ''
+
+
+def result_row(result: DispatchResult) -> Dict[str, str]:
+    """발송 결과 → 결과 리포트 행 (send_results 형식)"""
+    job = result.job
+    if result.ok:
+        return {'그룹': job.group_key, '이메일': job.recipient, '상태': '성공', '사유': ''}
+    return {'그룹': job.group_key, '이메일': job.recipient, '상태': '실패',
+            '사유': describe_send_error(result.error)}
+
+
+# ============================================================================
+# 🧵 WORKER
+# ============================================================================
+
+class BackgroundSendWorker:
+    """
+    발송 작업 1개를 소유하는 백그라운드 스레드
+
+    모든 상태 조회는 progress()/results_since()로 하며, 내부 상태는 Lock으로 보호합니다.
+    콜백(on_result, on_complete)은 워커 스레드에서 호출되므로 st.* 를 사용하면 안 됩니다.
+    """
+
+    def __init__(self, jobs: Iterable[SendJob], dispatcher: SMTPDispatcher,
+                 limiter: Optional[TokenBucketRateLimiter] = None,
+                 total: Optional[int] = None, prefilled_rows: Optional[List[Dict[str, str]]] = None,
+                 on_result: Optional[Callable[["BackgroundSendWorker", DispatchResult], None]] = None,
+                 on_complete: Optional[Callable[["BackgroundSendWorker"], None]] = None,
+                 job_id: Optional[str] = None, meta: Optional[Dict[str, Any]] = None,
+                 order: Optional[Dict[str, int]] = None):
+        """
+        Args:
+            jobs: 발송 작업 목록, 또는 렌더링되는 대로 작업을 내놓는 제너레이터
+                  (제너레이터면 total과 order 필수 - 렌더링은 발송 입력 스레드에서 진행)
+            dispatcher: 연결 풀 발송기
+            limiter: 상태 표시용 속도 제한기 (dispatcher.limiter와 같은 객체)
+            total: 전체 대상 수 (건너뜀/렌더링 실패 포함, 기본값 len(jobs))
+            prefilled_rows: 발송 전에 확정된 결과 행 (건너뜀, 렌더링 실패)
+            order: 그룹 키 → 원래 순서 (results() 정렬용, 기본값 jobs의 index)
+            on_result: 메일 1건 결과마다 호출
+            on_complete: 작업 종료 시 1회 호출 (정지/실패 포함)
+            meta: 화면 표시용 부가 정보 (기간, 시작한 사용자 등)
+        """
+        self.job_id = job_id or new_send_job_id()
+        self.jobs = jobs
+        self.dispatcher = dispatcher
+        self.limiter = limiter or dispatcher.limiter
+        self.total = total if total is not None else len(jobs)
+        self.meta = meta or {}
+        self.on_result = on_result
+        self.on_complete = on_complete
+
+        self._lock = threading.Lock()
+        self._rows: List[Dict[str, str]] = list(prefilled_rows or [])
+        self.skipped = sum(1 for r in self._rows if r.get('상태') == '건너뜀')
+        self._order = dict(order) if order is not None else {job.group_key: job.index for job in jobs}
+        self.state = 'running'
+        self.error: Optional[str] = None
+        self.success = 0
+        self.failed = sum(1 for r in self._rows if r.get('상태') == '실패')
+        self.current_group: Optional[str] = None
+        self.started_at = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        # 생성한 스레드(Streamlit 세션)의 트레이서를 이어받음 - 발송은 그 구간보다 오래 가므로 최상위 구간
+        self._thread = threading.Thread(target=bind_tracer(self._run, detached=True),
+                                        name=f"send-worker-{self.job_id}", daemon=True)
+
+    # ------------------------------------------------------------------------
+    # 제어
+    # ------------------------------------------------------------------------
+
+    def start(self) -> "BackgroundSendWorker":
+        self._thread.start()
+        return self
+
+    def pause(self) -> None:
+        with self._lock:
+            if self.state == 'running':
+                self.state = 'paused'
+                self.dispatcher.pause()
+
+    def resume(self) -> None:
+        with self._lock:
+            if self.state == 'paused':
+                self.state = 'running'
+                self.dispatcher.resume()
+
+    def stop(self) -> None:
+        with self._lock:
+            if self.state in ('running', 'paused'):
+                self.state = 'stopping'
+                self.dispatcher.stop()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        self._thread.join(timeout)
+
+    @property
+    def is_active(self) -> bool:
+        return self.state in ACTIVE_STATES
+
+    @property
+    def is_finished(self) -> bool:
+        """발송과 완료 콜백까지 모두 끝났는지"""
+        return self.finished_at is not None
+
+    # ------------------------------------------------------------------------
+    # 실행 (워커 스레드)
+    # ------------------------------------------------------------------------
+
+    def _run(self) -> None:
+        try:
+            with span('send'):
+                self._dispatch()
+            with self._lock:
+                self.state = 'stopped' if self.state == 'stopping' else 'completed'
+        except Exception as e:
+            traceback.print_exc()
+            with self._lock:
+                self.state = 'failed'
+                self.error = str(e)
+        finally:
+            self.dispatcher.stop()
+            with self._lock:
+                self.current_group = None
+            if self.on_complete:
+                try:
+                    self.on_complete(self)
+                except Exception as e:
+                    with self._lock:
+                        self.error = self.error or f"완료 처리 실패: {e}"
+            # 완료 처리(이력 저장 등)까지 끝난 뒤 종료 시각 기록
+            with self._lock:
+                self.finished_at = datetime.now()
+
+    def _dispatch(self) -> None:
+        for result in self.dispatcher.run(self.jobs, poll_interval=0.5):
+            if result is None:
+                continue
+            row = result_row(result)
+            with self._lock:
+                self._rows.append(row)
+                self.current_group = result.job.group_key
+                if result.ok:
+                    self.success += 1
+                else:
+                    self.failed += 1
+            if self.on_result:
+                self.on_result(self, result)
+
+    def add_rows(self, rows: List[Dict[str, str]]) -> None:
+        """발송 중에 확정된 결과 행 추가 (스트리밍 렌더링의 실패 행 등) - 어느 스레드에서나 호출 가능"""
+        with self._lock:
+            self._rows.extend(dict(r) for r in rows)
+            self.skipped += sum(1 for r in rows if r.get('상태') == '건너뜀')
+            self.failed += sum(1 for r in rows if r.get('상태') == '실패')
+
+    # ------------------------------------------------------------------------
+    # 조회 (화면 폴링용)
+    # ------------------------------------------------------------------------
+
+    def progress(self) -> Dict[str, Any]:
+        """진행 상황 스냅샷"""
+        limiter_state = self.limiter.snapshot() if self.limiter else {}
+        with self._lock:
+            done = len(self._rows)
+            return {
+                'job_id': self.job_id,
+                'state': self.state,
+                'total': self.total,
+                'done': done,
+                'success': self.success,
+                'failed': self.failed,
+                'skipped': self.skipped,
+                'current_group': self.current_group,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'error': self.error,
+                'next_send_eta': limiter_state.get('next_send_eta'),
+                'current_per_min': limiter_state.get('current_per_min'),
+                'in_cooldown': limiter_state.get('in_cooldown', False),
+                'meta': dict(self.meta),
+            }
+
+    def results_since(self, index: int) -> Tuple[List[Dict[str, str]], int]:
+        """index 이후에 추가된 결과 행과 새 index"""
+        with self._lock:
+            rows = self._rows[index:]
+            return [dict(r) for r in rows], len(self._rows)
+
+    def results(self) -> List[Dict[str, str]]:
+        """전체 결과 행 - 원래 그룹 순서로 정렬"""
+        with self._lock:
+            rows = [dict(r) for r in self._rows]
+        order = self._order
+        return sorted(rows, key=lambda r: order.get(r['그룹'], -1))
+
+
+# ============================================================================
+# 📇 PROCESS-WIDE REGISTRY
+# ============================================================================
+
+_WORKERS: "OrderedDict[str, BackgroundSendWorker]" = OrderedDict()
+_registry_lock = threading.Lock()
+
+
+def start_send_worker(worker: BackgroundSendWorker) -> BackgroundSendWorker:
+    """워커를 레지스트리에 등록하고 시작"""
+    with _registry_lock:
+        _WORKERS[worker.job_id] = worker
+        finished = [jid for jid, w in _WORKERS.items() if not w.is_active]
+        for jid in finished[:max(0, len(finished) - MAX_FINISHED_WORKERS)]:
+            del _WORKERS[jid]
+    return worker.start()
+
+
+def get_send_worker(job_id: Optional[str]) -> Optional[BackgroundSendWorker]:
+    if not job_id:
+        return None
+    with _registry_lock:
+        return _WORKERS.get(job_id)
+
+
+def list_send_workers(active_only: bool = False) -> List[BackgroundSendWorker]:
+    with _registry_lock:
+        workers = list(_WORKERS.values())
+    return [w for w in workers if w.is_active] if active_only else workers
+
+
+# ============================================================================
+# 🧪 MODULE TEST
+# ============================================================================
+
+if __name__ == "__main__":
+    import time
+
+    class _FakeServer:
+        """sendmail 1건에 delay초가 걸리는 가짜 SMTP 연결"""
+
+        def __init__(self, delay: float):
+            self.delay = delay
+
+        def sendmail(self, sender, recipient, msg):
+            time.sleep(self.delay)
+
+        def quit(self):
+            pass
+
+        close = quit
+
+    def _make_worker(n: int, delay: float = 0.01) -> BackgroundSendWorker:
+        jobs = [SendJob(f"업체{i:03d}", f"cso{i}@example.com", "제목", "<p>본문</p>", index=i) for i in range(n)]
+        dispatcher = SMTPDispatcher(lambda: (_FakeServer(delay), None), "me@example.com", pool_size=2)
+        return BackgroundSendWorker(jobs, dispatcher, total=n + 1,
+                                    prefilled_rows=[{'그룹': '건너뜀업체', '이메일': 'x@example.com',
+                                                     '상태': '건너뜀', '사유': '이미 발송됨'}])
+
+    print("=== Background Send Worker Test ===")
+
+    # 1. 완료까지 폴링
+    completed = []
+    worker = _make_worker(50)
+    worker.on_complete = lambda w: completed.append(w.job_id)
+    start_send_worker(worker)
+    assert get_send_worker(worker.job_id) is worker
+    seen = 0
+    while not worker.is_finished:
+        rows, seen = worker.results_since(seen)
+        time.sleep(0.02)
+    worker.join()
+    p = worker.progress()
+    print(f"  completed: state={p['state']}, done={p['done']}/{p['total']}, success={p['success']}")
+    assert p['state'] == 'completed' and p['success'] == 50 and p['done'] == 51
+    assert completed == [worker.job_id]
+    assert [r['그룹'] for r in worker.results()][1:] == [f"업체{i:03d}" for i in range(50)]
+
+    # 2. 일시정지 → 진행 멈춤 → 재개 → 정지
+    worker = start_send_worker(_make_worker(200, delay=0.02))
+    time.sleep(0.1)
+    worker.pause()
+    time.sleep(0.1)  # 진행 중이던 메일 마무리
+    paused_done = worker.progress()['done']
+    time.sleep(0.3)
+    assert worker.progress()['done'] == paused_done, "paused worker kept sending"
+    worker.resume()
+    time.sleep(0.1)
+    assert worker.progress()['done'] > paused_done
+    worker.stop()
+    worker.join(timeout=5)
+    p = worker.progress()
+    print(f"  paused at {paused_done}, stopped: state={p['state']}, done={p['done']}/{p['total']}")
+    assert p['state'] == 'stopped' and p['done'] < p['total']
+
+    # 3. 제너레이터 입력 - 렌더링 청크가 도착하는 대로 발송, 중간 실패 행은 add_rows로
+    def streamed_jobs():
+        for start in range(0, 30, 10):
+            time.sleep(0.05)  # 청크 렌더링
+            streaming.add_rows([{'그룹': f"실패{start:03d}", '이메일': '', '상태': '실패', '사유': '렌더링 실패'}])
+            yield from (SendJob(f"업체{i:03d}", f"cso{i}@example.com", "제목", "<p>본문</p>", index=i)
+                        for i in range(start + 1, start + 10))
+
+    order = {(f"실패{i:03d}" if i % 10 == 0 else f"업체{i:03d}"): i for i in range(30)}
+    streaming = BackgroundSendWorker(streamed_jobs(), SMTPDispatcher(lambda: (_FakeServer(0.01), None),
+                                                                     "me@example.com", pool_size=2),
+                                     total=30, order=order)
+    streaming.start()
+    streaming.join(timeout=10)
+    p = streaming.progress()
+    print(f"  streamed: state={p['state']}, done={p['done']}/{p['total']}, failed={p['failed']}")
+    assert p['state'] == 'completed' and p['success'] == 27 and p['failed'] == 3 and p['done'] == 30
+    assert [r['그룹'] for r in streaming.results()] == sorted(order, key=order.get)
+
+    print("\n✅ All worker tests passed!")
@@ -0,0 +1,593 @@
+"""
+================================================================================
+💾 Session Spill Store (세션 데이터 디스크 보관)
+================================================================================
+공유 Streamlit 서버에서 세션마다 st.session_state에 남는 큰 데이터
+(df, df_email, df_original, grouped_data)를 한동안 쓰지 않으면 로컬
+디스크로 내보내고, 다시 접근하면 메모리 맵으로 읽어 들입니다.
+
+Streamlit은 브라우저를 닫기 전까지 세션 상태를 지우지 않으므로 작업자
+여러 명이 큰 정산 파일을 하나씩 열어 두면 서버 메모리가 바닥납니다.
+
+동작:
+    스크립트 실행 시작 : checkout - 이 세션의 값을 session_state로 (디스크에 있으면 메모리 맵으로 읽음)
+    스크립트 실행 끝   : checkin  - 값을 session_state에서 저장소로 옮긴 뒤 예산 점검
+    예산 점검          : 유휴 시간이 지난 세션 → 디스크
+                         서버 전체 메모리가 예산을 넘으면 가장 오래 쓰지 않은 세션부터 디스크
+                         (스크립트 실행 중인 세션은 제외, 만료 시간이 지난 세션은 삭제)
+                         스냅샷은 저장소 잠금 밖에서 씀 - 쓰는 동안 그 세션이 다시 실행되면 내보내기 취소
+
+디스크 형식 (세션 스냅샷 폴더 1개):
+    col_N.arrow  : 숫자/문자열 컬럼 1개 (Arrow IPC - 메모리 맵으로 복사 없이 읽음)
+    arr_N.npy    : grouped_data의 숫자 배열 (np.load(mmap_mode='r'))
+    manifest.pkl : 프레임 구성(인덱스/컬럼명/attrs), 그 밖의 값
+
+핵심 원칙:
+1. 선택 기능 - 기본은 꺼짐 (constants.SESSION_SPILL_ENABLED 또는 secrets.toml의 SESSION_SPILL)
+2. 프레임끼리 공유하던 컬럼(df/df_original, 원본 문자열 뷰)은 한 번만 저장하고 읽을 때도 공유
+3. 다시 계산할 수 있는 캐시(prep_pipeline)는 저장하지 않고 비움
+4. 복원 후 값이 바뀌지 않았으면 다음 내보내기에서 기존 스냅샷을 그대로 사용
+5. pyarrow가 없거나 Arrow로 저장할 수 없는 컬럼(숫자/문자열 혼합 object)은 pickle
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Dict, Iterator, List, MutableMapping, Optional, Tuple
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+import os
+import pickle
+import shutil
+import threading
+import time
+import uuid
+import weakref
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # 선택 의존성 - 없으면 컬럼도 pickle로 저장 (메모리 맵 없이 읽음)
+    pa = None
+
+from frame_lineage import OriginalText, column_buffers, frames_nbytes
+from perf_trace import count, span
+
+
+# 디스크로 내보내는 세션 상태 키
+SPILL_KEYS = ('df', 'df_email', 'df_original', 'grouped_data')
+
+# 디스크에 쓰지 않고 내보낼 때 clear()만 호출하는 캐시 (다시 계산 가능)
+CACHE_KEYS = ('prep_pipeline',)
+
+MANIFEST_NAME = "manifest.pkl"
+
+
+# ============================================================================
+# 📦 SNAPSHOT (세션 값 → 폴더 1개)
+# ============================================================================
+
+def _arrow_compatible(dtype) -> bool:
+    """Arrow로 저장한 뒤 같은 dtype으로 읽을 수 있는 컬럼 (숫자/불리언/날짜/문자열)"""
+    if pa is None or isinstance(dtype, pd.CategoricalDtype):
+        return False
+    return isinstance(dtype, pd.StringDtype) or dtype.kind in 'biufM'
+
+
+class _SnapshotWriter:
+    """스냅샷 폴더 쓰기 - 같은 버퍼를 쓰는 컬럼은 한 번만 저장"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.columns: List[tuple] = []
+        self._column_ids: Dict[tuple, int] = {}
+        self.originals: List[tuple] = []
+        self._original_ids: Dict[int, int] = {}
+        self._arrays = 0
+
+    def column(self, values: pd.Series) -> int:
+        key = (column_buffers(values), len(values), str(values.dtype))
+        if key in self._column_ids:
+            return self._column_ids[key]
+        n = len(self.columns)
+        if _arrow_compatible(values.dtype):
+            table = pa.Table.from_pandas(pd.DataFrame({'c': values.array}, copy=False), preserve_index=False)
+            with pa.OSFile(os.path.join(self.path, f"col_{n}.arrow"), 'wb') as sink, \
+                    pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            self.columns.append(('arrow', values.dtype))
+        else:
+            self.columns.append(('pickle', values.array))
+        self._column_ids[key] = n
+        return n
+
+    def original(self, original: OriginalText) -> int:
+        key = id(original)
+        if key not in self._original_ids:
+            self._original_ids[key] = len(self.originals)
+            self.originals.append((original.index, original.columns,
+                                   [(kind, self.column(source)) for kind, source in original.parts]))
+        return self._original_ids[key]
+
+    def array(self, values: np.ndarray) -> int:
+        n = self._arrays
+        np.save(os.path.join(self.path, f"arr_{n}.npy"), values, allow_pickle=False)
+        self._arrays += 1
+        return n
+
+    def encode(self, value: Any) -> tuple:
+        if isinstance(value, pd.DataFrame):
+            attrs = {name: ('original', self.original(v)) if isinstance(v, OriginalText) else ('value', v)
+                     for name, v in value.attrs.items()}
+            return ('frame', value.index, value.columns,
+                    [self.column(value.iloc[:, i]) for i in range(value.shape[1])], attrs)
+        if hasattr(value, 'row_dicts') and hasattr(value, 'codes'):  # GroupedDataset
+            state = {name: ('npy', self.array(v)) if isinstance(v, np.ndarray) and v.dtype.kind in 'biuf'
+                     else ('value', v) for name, v in vars(value).items()}
+            return ('object', type(value), state)
+        return ('value', value)
+
+
+def write_snapshot(path: str, values: Dict[str, Any]) -> None:
+    """세션 값 → 스냅샷 폴더 (임시 폴더에 쓴 뒤 이름 변경)"""
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    writer = _SnapshotWriter(tmp_path)
+    encoded = {key: writer.encode(value) for key, value in values.items()}
+    manifest = {'values': encoded, 'columns': writer.columns, 'originals': writer.originals}
+    with open(os.path.join(tmp_path, MANIFEST_NAME), 'wb') as f:
+        pickle.dump(manifest, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path: str) -> Dict[str, Any]:
+    """스냅샷 폴더 → 세션 값 (Arrow 컬럼과 숫자 배열은 메모리 맵)"""
+    with open(os.path.join(path, MANIFEST_NAME), 'rb') as f:
+        manifest = pickle.load(f)
+
+    columns = []
+    for n, (kind, payload) in enumerate(manifest['columns']):
+        if kind == 'arrow':
+            with pa.memory_map(os.path.join(path, f"col_{n}.arrow"), 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+            values = table.to_pandas(split_blocks=True)['c']
+            columns.append((values if values.dtype == payload else values.astype(payload)).array)
+        else:
+            columns.append(payload)
+
+    originals = [
+        OriginalText(index, labels, [pd.Series(columns[c], index=index, copy=False) for _, c in parts],
+                     [kind for kind, _ in parts])
+        for index, labels, parts in manifest['originals']
+    ]
+
+    values = {}
+    for key, encoded in manifest['values'].items():
+        if encoded[0] == 'frame':
+            _, index, labels, column_ids, attrs = encoded
+            df = pd.DataFrame({i: columns[c] for i, c in enumerate(column_ids)}, index=index, copy=False)
+            df.columns = labels
+            df.attrs = {name: originals[v] if kind == 'original' else v for name, (kind, v) in attrs.items()}
+            values[key] = df
+        elif encoded[0] == 'object':
+            _, cls, state = encoded
+            obj = cls.__new__(cls)
+            obj.__dict__.update({name: np.load(os.path.join(path, f"arr_{v}.npy"), mmap_mode='r')
+                                 if kind == 'npy' else v for name, (kind, v) in state.items()})
+            values[key] = obj
+        else:
+            values[key] = encoded[1]
+    return values
+
+
+def estimate_values_nbytes(values: Dict[str, Any]) -> int:
+    """세션 값의 메모리 추정 - 프레임끼리 공유하는 컬럼은 한 번만 계산"""
+    frames = [v for v in values.values() if isinstance(v, pd.DataFrame)]
+    total = frames_nbytes(*frames) if frames else 0
+    for value in values.values():
+        if hasattr(value, 'nbytes') and callable(value.nbytes):  # GroupedDataset
+            total += int(value.nbytes())
+    return total
+
+
+# ============================================================================
+# 🗄️ STORE
+# ============================================================================
+
+@dataclass
+class _SessionEntry:
+    values: Dict[str, Any] = field(default_factory=dict)   # 저장소가 보관 중인 값 (실행 사이)
+    caches: Dict[str, Any] = field(default_factory=dict)   # 내보낼 때 비우는 캐시
+    nbytes: int = 0
+    last_access: float = 0.0
+    active: bool = False                                    # 스크립트 실행 중 (값은 session_state에 있음)
+    spilled: bool = False                                   # 값이 디스크에만 있음
+    spilling: bool = False                                  # 잠금 밖에서 스냅샷을 쓰는 중 (값은 아직 메모리)
+    snapshot: Optional[str] = None                          # 최신 스냅샷 폴더
+    snapshot_refs: Dict[str, Any] = field(default_factory=dict)  # 스냅샷과 같은 객체인지 (weakref)
+    sized_ids: Tuple = ()                                   # nbytes를 계산한 값의 id
+
+
+def _weak(value: Any):
+    try:
+        return weakref.ref(value)
+    except TypeError:  # dict/None 등 - 같은 객체인지 확인할 수 없으면 항상 다시 저장
+        return None
+
+
+class SessionStore:
+    """
+    세션별 큰 값 보관 + 디스크 내보내기 (스레드 안전)
+
+    사용 예 (스크립트 실행마다):
+        with store.session(session_id, st.session_state):
+            render_app()
+    """
+
+    def __init__(self, spill_dir: str, budget_bytes: int, idle_seconds: float, expire_seconds: float):
+        self.spill_dir = spill_dir
+        self.budget_bytes = budget_bytes
+        self.idle_seconds = idle_seconds
+        self.expire_seconds = expire_seconds
+        self._sessions: Dict[str, _SessionEntry] = {}
+        self._lock = threading.RLock()
+        self._pending_delete: List[str] = []
+        self.spills = 0
+        self.restores = 0
+        os.makedirs(spill_dir, exist_ok=True)
+        self._remove_stale_snapshots()
+
+    # ------------------------------------------------------------------
+    # 스크립트 실행 시작/끝
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def session(self, session_id: str, state: MutableMapping[str, Any]) -> Iterator[None]:
+        """스크립트 실행 1번 동안 값을 session_state에 두고, 끝나면(예외/rerun 포함) 저장소로"""
+        self.checkout(session_id, state)
+        try:
+            yield
+        finally:
+            self.checkin(session_id, state)
+
+    def checkout(self, session_id: str, state: MutableMapping[str, Any]) -> None:
+        """
+        이 세션의 값을 session_state에 넣음 - 디스크에 있으면 읽어 들임
+
+        실행 사이에 session_state에 직접 넣은 값(콜백 등)이 있으면 그 값을 유지합니다.
+        """
+        with self._lock:
+            entry = self._sessions.setdefault(session_id, _SessionEntry())
+            entry.active = True
+            entry.spilling = False  # 내보내는 중이었으면 취소 - 값은 아직 메모리에 있음
+            entry.last_access = time.monotonic()
+            if entry.spilled:
+                with span('session_store.restore'):
+                    entry.values = read_snapshot(entry.snapshot)
+                entry.snapshot_refs = {key: _weak(value) for key, value in entry.values.items()}
+                entry.spilled = False
+                self.restores += 1
+                count('session_store.restore')
+            for key, value in {**entry.values, **entry.caches}.items():
+                if key not in state:
+                    state[key] = value
+            entry.values, entry.caches = {}, {}
+
+    def checkin(self, session_id: str, state: MutableMapping[str, Any]) -> None:
+        """값을 session_state에서 저장소로 옮기고 메모리 예산 점검"""
+        values = {key: state.pop(key) for key in SPILL_KEYS if key in state}
+        caches = {key: state.pop(key) for key in CACHE_KEYS if key in state}
+        with self._lock:
+            entry = self._sessions.setdefault(session_id, _SessionEntry())
+            ids = tuple((key, id(value)) for key, value in values.items())
+            if ids != entry.sized_ids:
+                entry.nbytes = estimate_values_nbytes(values)
+                entry.sized_ids = ids
+            if entry.snapshot is not None and not self._matches_snapshot(entry, values):
+                self._discard(entry.snapshot)
+                entry.snapshot, entry.snapshot_refs = None, {}
+            entry.values, entry.caches = values, caches
+            entry.active = False
+            entry.last_access = time.monotonic()
+        self.enforce()
+
+    # ------------------------------------------------------------------
+    # 예산 점검 / 내보내기
+    # ------------------------------------------------------------------
+
+    def enforce(self, now: Optional[float] = None) -> None:
+        """
+        만료 세션 삭제 → 유휴 세션 내보내기 → 예산 초과분 내보내기 (오래 쓰지 않은 순)
+
+        내보낼 세션은 잠금 안에서 고르고 스냅샷은 잠금 밖에서 씁니다 - 쓰는 동안 다른 세션의
+        checkout/checkin이 기다리지 않습니다.
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            for session_id, entry in list(self._sessions.items()):
+                if not entry.active and not entry.spilling and now - entry.last_access >= self.expire_seconds:
+                    self.drop(session_id)
+            victims = [session_id for session_id, entry in self._sessions.items()
+                       if self._spillable(entry) and now - entry.last_access >= self.idle_seconds]
+            resident = self.memory_bytes() - sum(self._sessions[session_id].nbytes for session_id in victims)
+            if resident > self.budget_bytes:
+                candidates = sorted((session_id for session_id, entry in self._sessions.items()
+                                     if self._spillable(entry) and session_id not in victims),
+                                    key=lambda session_id: self._sessions[session_id].last_access)
+                for session_id in candidates:
+                    if resident <= self.budget_bytes:
+                        break
+                    victims.append(session_id)
+                    resident -= self._sessions[session_id].nbytes
+            spills = [self._begin_spill(session_id) for session_id in victims]
+            self._retry_deletes()
+        for spill in spills:
+            self._spill(*spill)
+
+    def spill(self, session_id: str) -> bool:
+        """세션 1개를 바로 디스크로 (실행 중이거나 쓰는 동안 다시 실행되면 False)"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None or not self._spillable(entry):
+                return False
+            spill = self._begin_spill(session_id)
+        return self._spill(*spill)
+
+    def _begin_spill(self, session_id: str) -> Tuple[str, _SessionEntry, Dict[str, Any]]:
+        """(잠금 안) 내보내는 중으로 표시 - 스냅샷에 쓸 값은 지금의 값"""
+        entry = self._sessions[session_id]
+        entry.spilling = True
+        return session_id, entry, entry.values
+
+    def _spill(self, session_id: str, entry: _SessionEntry, values: Dict[str, Any]) -> bool:
+        """(잠금 밖) 스냅샷을 쓴 뒤 잠금 안에서 내보내기 완료 - 그사이 세션이 다시 쓰였으면 취소"""
+        path = None
+        try:
+            if entry.snapshot is None:
+                path = os.path.join(self.spill_dir, uuid.uuid4().hex)
+                with span('session_store.spill'):
+                    write_snapshot(path, values)
+        except BaseException:
+            with self._lock:
+                if entry.values is values:
+                    entry.spilling = False
+                if path is not None:
+                    self._discard(path)
+            raise
+        with self._lock:
+            if self._sessions.get(session_id) is not entry or not entry.spilling or entry.values is not values:
+                if path is not None:
+                    self._discard(path)
+                return False
+            if path is not None:
+                entry.snapshot = path
+                entry.snapshot_refs = {key: _weak(value) for key, value in values.items()}
+            for cache in entry.caches.values():
+                if hasattr(cache, 'clear'):
+                    cache.clear()
+            entry.values = {}
+            entry.spilled, entry.spilling = True, False
+            self.spills += 1
+            count('session_store.spill')
+            return True
+
+    def drop(self, session_id: str) -> None:
+        """세션 삭제 (메모리 + 스냅샷)"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None and entry.snapshot is not None:
+                self._discard(entry.snapshot)
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+
+    def memory_bytes(self) -> int:
+        """메모리에 있는 세션 값 합계 (실행 중인 세션은 마지막 체크인 기준)"""
+        with self._lock:
+            return sum(e.nbytes for e in self._sessions.values() if not e.spilled)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = list(self._sessions.values())
+            return {
+                'sessions': len(entries),
+                'active': sum(e.active for e in entries),
+                'spilled': sum(e.spilled for e in entries),
+                'memory_bytes': self.memory_bytes(),
+                'budget_bytes': self.budget_bytes,
+                'spills': self.spills,
+                'restores': self.restores,
+            }
+
+    # ------------------------------------------------------------------
+    # 내부
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _spillable(entry: _SessionEntry) -> bool:
+        return not entry.active and not entry.spilled and not entry.spilling
+
+    @staticmethod
+    def _matches_snapshot(entry: _SessionEntry, values: Dict[str, Any]) -> bool:
+        """복원한 뒤 값이 그대로인지 (같은 객체) - 그대로면 스냅샷을 다시 쓰지 않음"""
+        if set(values) != set(entry.snapshot_refs):
+            return False
+        for key, value in values.items():
+            ref = entry.snapshot_refs[key]
+            if ref is None or ref() is not value:
+                return False
+        return True
+
+    def _discard(self, path: str) -> None:
+        """스냅샷 삭제 - 메모리 맵이 열려 있어 지울 수 없으면(Windows) 나중에 다시 시도"""
+        try:
+            shutil.rmtree(path)
+        except FileNotFoundError:
+            pass
+        except OSError:
+            self._pending_delete.append(path)
+
+    def _retry_deletes(self) -> None:
+        pending, self._pending_delete = self._pending_delete, []
+        for path in pending:
+            self._discard(path)
+
+    def _remove_stale_snapshots(self) -> None:
+        """이전 서버 프로세스가 남긴 만료된 스냅샷 삭제"""
+        cutoff = time.time() - self.expire_seconds
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+_SHARED_STORE: Optional[SessionStore] = None
+_SHARED_STORE_LOCK = threading.Lock()
+
+
+def shared_session_store(spill_dir: str, budget_bytes: int, idle_seconds: float,
+                         expire_seconds: float) -> SessionStore:
+    """서버 프로세스 전역 저장소 (처음 호출할 때 생성 - 이후 인자는 무시)"""
+    global _SHARED_STORE
+    with _SHARED_STORE_LOCK:
+        if _SHARED_STORE is None:
+            _SHARED_STORE = SessionStore(spill_dir, budget_bytes, idle_seconds, expire_seconds)
+        return _SHARED_STORE
+
+
+# ============================================================================
+# 🧪 MODULE TEST (세션 10개 - 예산 초과분 디스크 보관 → 복원)
+# ============================================================================
+
+if __name__ == "__main__":
+    import gc
+    import sys
+    import tempfile
+
+    # data_loader/grouping_engine이 import한 모듈의 클래스 사용 (이 파일은 __main__으로 실행됨)
+    from session_store import SessionStore
+    from benchmarks.workbook_generator import EMAIL_COL, GROUP_KEY_COL, JOIN_COL, WorkbookSpec, write_workbook
+    from data_loader import WorkbookSource, clean_dataframe, merge_email_data, parse_sheet
+    from frame_lineage import ORIGINAL_STR_ATTR, materialized_columns
+    from grouping_engine import group_data_with_wildcard
+
+    companies = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_sessions = 10
+    spec = WorkbookSpec(companies=companies, rows_per_company=20)
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "sessions.xlsx")
+    write_workbook(path, spec)
+    print(f"=== Session Spill Store Test ({n_sessions} sessions × {spec.data_rows:,} rows, "
+          f"{'pyarrow' if pa is not None else 'pickle only'}) ===")
+
+    source = WorkbookSource.from_path(path)
+    sheet = parse_sheet(source.excel_file, spec.data_sheet)
+    df_email = parse_sheet(source.excel_file, spec.email_sheet)
+    display_cols = spec.display_cols + [EMAIL_COL]
+
+    def session_values(df_original):
+        """Step 3까지 진행한 세션의 값 (df = 정리된 프레임, df_original과 컬럼 공유)"""
+        merged = merge_email_data(df_original, df_email, JOIN_COL, JOIN_COL, EMAIL_COL)
+        cleaned = clean_dataframe(merged, list(spec.amount_cols), list(spec.percent_cols), [], [])
+        grouped, _ = group_data_with_wildcard(cleaned, GROUP_KEY_COL, EMAIL_COL, list(spec.amount_cols),
+                                              list(spec.percent_cols), display_cols)
+        return {'df': cleaned, 'df_email': df_email, 'df_original': df_original, 'grouped_data': grouped}
+
+    class Pipeline:
+        cleared = 0
+
+        def clear(self):
+            Pipeline.cleared += 1
+
+    per_session = estimate_values_nbytes(session_values(sheet))
+    budget = int(per_session * 3.5)  # 세션 3개 분량
+    store = SessionStore(os.path.join(workdir, "spill"), budget, idle_seconds=3600, expire_seconds=7200)
+
+    # 10개 세션이 각자 시트를 열고 Step 3까지 진행 (세션마다 별도 파싱 결과)
+    expected = {}
+    for i in range(n_sessions):
+        sid = f"session-{i}"
+        state = {'current_step': 3, 'prep_pipeline': Pipeline()}
+        store.checkout(sid, state)
+        state.update(session_values(parse_sheet(source.excel_file, spec.data_sheet)))
+        expected[sid] = {key: state[key] for key in ('df', 'grouped_data')} if i in (0, n_sessions - 1) else None
+        store.checkin(sid, state)
+        assert set(state) == {'current_step'}  # 큰 값은 실행 사이에 session_state에 남지 않음
+        assert store.memory_bytes() <= budget
+    stats = store.stats()
+    print(f"  per session        : {per_session / 1024 / 1024:7.2f}MB (budget {budget / 1024 / 1024:.2f}MB)")
+    print(f"  after 10 sessions  : {stats['memory_bytes'] / 1024 / 1024:7.2f}MB in memory, "
+          f"{stats['spilled']} spilled, {Pipeline.cleared} pipeline caches cleared")
+    assert stats['spilled'] == n_sessions - 3 and Pipeline.cleared == stats['spilled']
+
+    # 가장 오래된 세션으로 돌아옴 → 디스크에서 복원, 값/공유 관계 동일
+    state = {}
+    start = time.perf_counter()
+    store.checkout("session-0", state)
+    restore_time = time.perf_counter() - start
+    old = expected["session-0"]
+    pd.testing.assert_frame_equal(state['df'], old['df'])
+    assert state['df'].attrs['numeric_parse_failures'] == old['df'].attrs['numeric_parse_failures']
+    assert state['grouped_data'] == old['grouped_data']
+    assert list(state['grouped_data'].items())[0][1]['rows'][0] == list(old['grouped_data'].items())[0][1]['rows'][0]
+    original = state['df'].attrs[ORIGINAL_STR_ATTR]
+    assert original is state['df_original'].attrs[ORIGINAL_STR_ATTR]
+    pd.testing.assert_frame_equal(original.frame(), old['df'].attrs[ORIGINAL_STR_ATTR].frame())
+    # df는 df_original과 바꾸지 않은 컬럼을 계속 공유
+    assert set(materialized_columns(state['df'], state['df_original'])) == \
+        {EMAIL_COL, *spec.amount_cols, *spec.percent_cols}
+    print(f"  restore session-0  : {restore_time * 1000:7.1f}ms (memory-mapped)")
+
+    # 그대로 체크인 → 다시 내보낼 때 기존 스냅샷 재사용
+    snapshot = store._sessions["session-0"].snapshot
+    store.checkin("session-0", state)
+    assert store.spill("session-0") and store._sessions["session-0"].snapshot == snapshot
+
+    # 스냅샷은 잠금 밖에서 씀 - 쓰는 동안 다른 세션이 실행되고, 쓰던 세션이 돌아오면 내보내기 취소
+    import session_store
+    writing, release = threading.Event(), threading.Event()
+    real_write = session_store.write_snapshot
+
+    def slow_write(path, values):
+        writing.set()
+        release.wait(10)
+        real_write(path, values)
+
+    session_store.write_snapshot = slow_write
+    slow_sid, other_sid = [sid for sid, e in store._sessions.items() if not e.spilled][:2]
+    spiller = threading.Thread(target=store.spill, args=(slow_sid,))
+    spiller.start()
+    assert writing.wait(10)
+    other = {}
+    store.checkout(other_sid, other)
+    store.checkin(other_sid, other)
+    assert spiller.is_alive(), "checkout waited for the snapshot write"
+    slow = {}
+    store.checkout(slow_sid, slow)
+    release.set()
+    spiller.join(10)
+    session_store.write_snapshot = real_write
+    assert 'df' in slow and not store._sessions[slow_sid].spilled
+    store.checkin(slow_sid, slow)
+    del other, slow
+    print("  spill outside lock : other session ran during the write, returning session cancelled it")
+
+    # 유휴 시간이 지나면 전부 디스크, 만료되면 삭제
+    del state, old, expected
+    gc.collect()
+    store.enforce(now=time.monotonic() + 3600)
+    assert store.stats()['spilled'] == n_sessions and store.memory_bytes() == 0
+    store.enforce(now=time.monotonic() + 7200)
+    assert store.stats()['sessions'] == 0
+    leftover = os.listdir(store.spill_dir)
+    print(f"  after expiry       : {store.stats()}, {len(leftover)} snapshot dirs left")
+
+    print("\n✅ Session spill store test passed!")
@@ -0,0 +1,636 @@
+"""
+================================================================================
+📮 Pooled SMTP Dispatcher
+================================================================================
+여러 개의 인증된 SMTP 연결(풀)로 메일을 동시에 발송합니다.
+
+기존 발송 루프는 연결 하나로 순차 발송했기 때문에 메일마다 서버 응답
+대기 시간이 그대로 누적되었습니다. 이 모듈은 N개의 워커가 각자 연결을
+하나씩 맡아 발송하고, 모든 워커가 하나의 전역 발송 간격 제한기를
+공유하여 기존 배치 규칙(batch_size 통마다 batch_delay 휴식)을 유지합니다.
+발송 간격 대기는 워커 스레드에서만 일어나므로 Streamlit 화면은 멈추지 않습니다.
+
+핵심 원칙:
+1. 발송 간격은 전역 - 연결 수를 늘려도 분당 발송량은 설정값을 넘지 않음
+2. 연결 끊김 시 투명한 재연결 - 같은 메일을 새 연결로 한 번 더 시도
+3. 결과는 호출 스레드에서 소비 - Streamlit UI 갱신은 스크립트 스레드에서만
+4. 메시지 바이트는 발송 전에 미리 생성 - 워커는 sendmail(I/O)만 수행
+
+Author: Senior Solution Architect
+Version: 1.0.0
+================================================================================
+"""
+
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass, field
+from email.mime.multipart import MIMEMultipart
+from email.policy import compat32
+from email.mime.text import MIMEText
+from email.utils import formataddr
+import queue
+import smtplib
+import threading
+import time
+
+from constants import DEFAULT_SENDER_NAME
+from perf_trace import bind_tracer, count, span
+from rate_limiter import TokenBucketRateLimiter
+
+
+# 연결이 끊어진 것으로 보고 재연결 후 재시도할 예외
+# (SMTPException은 OSError 하위 클래스이므로 SMTP 오류를 먼저 구분)
+RECONNECT_SMTP_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError)
+RECONNECT_ERRORS = (ConnectionError, TimeoutError, OSError)
+
+# 발송용 MIME 정책 - CRLF 줄바꿈으로 직렬화해 sendmail이 다시 변환하지 않음
+# (email.policy.SMTP는 한글 제목을 접을 때 공백이 사라지는 경우가 있고 3배 느려 compat32 기반 사용)
+SMTP_POLICY = compat32.clone(linesep='\r\n')
+
+# 입력 스레드가 워커보다 앞서 준비해 두는 메일 수 (워커 1개당, 메모리 상한)
+FEED_AHEAD_PER_WORKER = 32
+
+
+# ============================================================================
+# 🔐 SMTP CONNECTION
+# ============================================================================
+
+def create_smtp_connection(config, max_retries=3):
+    """
+    SMTP 연결 생성 - 하이웍스(Hiworks) SSL 최적화
+    
+    필수 조건:
+    - Server: smtps.hiworks.com
+    - Port: 465 (SSL)
+    - smtplib.SMTP_SSL 사용 (일반 SMTP 아님)
+    - From 헤더와 로그인 이메일 일치 필수 (553 에러 방지)
+    """
+    import ssl
+    import socket
+    last_error = None
+    timeout = config.get('timeout', 30)
+    
+    for attempt in range(max_retries):
+        try:
+            if config['port'] == 465:
+                # SSL 컨텍스트 설정 (하이웍스 호환)
+                context = ssl.create_default_context()
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+                context.set_ciphers('DEFAULT@SECLEVEL=1')
+                
+                # SMTP_SSL로 465 포트 직접 연결 (STARTTLS 아님)
+                server = smtplib.SMTP_SSL(
+                    config['server'], 
+                    config['port'], 
+                    context=context,
+                    timeout=timeout
+                )
+            else:
+                # 587 포트 등 STARTTLS 방식
+                server = smtplib.SMTP(config['server'], config['port'], timeout=timeout)
+                server.ehlo()
+                if config.get('use_tls', True):
+                    server.starttls()
+                    server.ehlo()
+            
+            # 로그인 (이메일과 앱 비밀번호)
+            server.login(config['username'], config['password'])
+            return server, None
+            
+        except smtplib.SMTPAuthenticationError as e:
+            error_code = e.smtp_code if hasattr(e, 'smtp_code') else 0
+            error_str = str(e)
+            
+            # 454: 임시 인증 서버 오류 → 재시도
+            if error_code == 454 or '454' in error_str or 'Temporary' in error_str:
+                last_error = f"인증 서버 임시 오류 (시도 {attempt+1}/{max_retries})"
+                time.sleep(2)
+                continue
+            
+            # 535: 인증 거부 (비밀번호 오류)
+            if error_code == 535 or '535' in error_str:
+                return None, "❌ 인증 거부: 비밀번호가 틀렸거나 2차 앱 비밀번호가 필요합니다."
+            
+            # 553: 발신자 불일치 또는 IP 차단
+            if error_code == 553 or '553' in error_str:
+                if 'IP' in error_str:
+                    return None, "❌ IP 차단: 하이웍스 관리자 설정에서 이 IP를 허용해야 합니다."
+                return None, "❌ 발신자 불일치: From 주소와 로그인 이메일이 다릅니다."
+            
+            return None, f"❌ 인증 실패: {error_str[:150]}"
+            
+        except socket.timeout:
+            last_error = f"연결 시간 초과 ({timeout}초) - 네트워크 확인 필요"
+            time.sleep(2)
+            continue
+            
+        except socket.gaierror:
+            return None, "❌ 서버를 찾을 수 없음: 서버 주소 또는 인터넷 연결을 확인하세요."
+            
+        except ssl.SSLError as e:
+            error_str = str(e)
+            if 'handshake' in error_str.lower():
+                last_error = f"SSL 핸드셰이크 실패 (시도 {attempt+1}/{max_retries})"
+                time.sleep(2)
+                continue
+            return None, f"❌ SSL 오류: {error_str[:100]}"
+            
+        except ConnectionRefusedError:
+            return None, "❌ 연결 거부: 서버 주소/포트가 올바른지 확인하세요."
+            
+        except Exception as e:
+            error_str = str(e)
+            if 'handshake' in error_str.lower() or 'ssl' in error_str.lower():
+                last_error = f"SSL 연결 오류 (시도 {attempt+1}/{max_retries})"
+                time.sleep(2)
+                continue
+            return None, f"❌ 연결 오류: {error_str[:100]}"
+    
+    return None, f"❌ 연결 실패: {last_error} - 네트워크 상태를 확인하고 잠시 후 다시 시도하세요."
+
+
+# ============================================================================
+# ✉️ MESSAGE BUILDER
+# ============================================================================
+
+def build_message(sender_email: str, recipient: str, subject: str, html_content: str,
+                  sender_name: Optional[str] = None) -> MIMEMultipart:
+    """HTML 메일 MIME 메시지 생성"""
+    msg = MIMEMultipart('alternative', policy=SMTP_POLICY)
+    msg['Subject'] = subject
+    msg['From'] = formataddr((sender_name or DEFAULT_SENDER_NAME, sender_email))
+    msg['To'] = recipient
+    msg.attach(MIMEText(html_content, 'html', 'utf-8', policy=SMTP_POLICY))
+    return msg
+
+
+def build_wire_bytes(sender_email: str, recipient: str, subject: str, html_content: str,
+                     sender_name: Optional[str] = None) -> bytes:
+    """
+    sendmail에 그대로 넘길 메시지 바이트 (헤더 RFC 2047, 본문 UTF-8 base64, CRLF)
+
+    결과는 7bit ASCII이므로 smtplib가 줄바꿈 변환/인코딩을 다시 하지 않습니다.
+    """
+    return build_message(sender_email, recipient, subject, html_content, sender_name).as_bytes()
+
+
+@dataclass
+class SendJob:
+    """발송 작업 1건 (렌더링 완료된 메일)"""
+    group_key: str
+    recipient: str
+    subject: str
+    html: str = field(repr=False)
+    index: int = 0  # 원래 발송 순서 (결과 정렬용)
+    # 미리 만든 메시지 바이트 (build_wire_bytes, 발신자는 dispatcher와 같아야 함) - 없으면 발송 전에 생성
+    wire: Optional[bytes] = field(default=None, repr=False)
+
+
+@dataclass
+class DispatchResult:
+    """발송 결과 1건"""
+    job: SendJob
+    ok: bool
+    error: Optional[str] = None
+    attempts: int = 1
+    worker_id: int = 0
+
+
+# ============================================================================
+# 🔌 CONNECTION POOL
+# ============================================================================
+
+class PooledConnection:
+    """
+    워커 1개가 소유하는 SMTP 연결 - 필요할 때 연결하고 끊기면 다시 연결
+
+    connect()는 (server, error) 튜플을 반환해야 합니다 (create_smtp_connection과 동일).
+    """
+
+    def __init__(self, connect: Callable[[], Tuple[Any, Optional[str]]]):
+        self._connect = connect
+        self.server = None
+        self.connects = 0
+
+    def get(self) -> Tuple[Any, Optional[str]]:
+        if self.server is None:
+            with span('smtp.connect'):
+                server, error = self._connect()
+            if server is None:
+                count('smtp.connect_failed')
+                return None, error
+            self.server = server
+            self.connects += 1
+        return self.server, None
+
+    def discard(self) -> None:
+        """끊어진 연결 폐기 (다음 get()에서 재연결)"""
+        count('smtp.reconnect')
+        server, self.server = self.server, None
+        if server is not None:
+            try:
+                server.close()
+            except Exception:
+                pass
+
+    def close(self) -> None:
+        server, self.server = self.server, None
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                try:
+                    server.close()
+                except Exception:
+                    pass
+
+
+# ============================================================================
+# 📮 DISPATCHER
+# ============================================================================
+
+class SMTPDispatcher:
+    """
+    연결 풀 기반 동시 발송기
+
+    사용 예:
+        limiter = TokenBucketRateLimiter.from_delays(5, 10, batch_size=10, batch_delay=30)
+        dispatcher = SMTPDispatcher(lambda: create_smtp_connection(config),
+                                    sender_email, pool_size=3, limiter=limiter)
+        for result in dispatcher.run(jobs, poll_interval=0.5):
+            if result is None:
+                ...  # 대기 중 - limiter.snapshot()으로 ETA 표시, 정지 버튼 확인
+            else:
+                ...  # 진행률/로그 갱신 (호출 스레드)
+    """
+
+    def __init__(self, connect: Callable[[], Tuple[Any, Optional[str]]], sender_email: str,
+                 pool_size: int = 1, limiter: Optional[TokenBucketRateLimiter] = None,
+                 sender_name: Optional[str] = None, max_reconnects: int = 1,
+                 before_send: Optional[Callable[[SendJob], None]] = None):
+        self.connect = connect
+        self.sender_email = sender_email
+        self.sender_name = sender_name
+        self.pool_size = max(1, int(pool_size))
+        self.limiter = limiter or TokenBucketRateLimiter(rate=0)
+        self.max_reconnects = max_reconnects
+        self.before_send = before_send  # 발송 직전 훅 (워커 스레드, 예: outbox 'sending' 기록)
+        self._stop = threading.Event()
+        self._running = threading.Event()  # clear = 일시정지
+        self._running.set()
+        self.connections: List[PooledConnection] = []
+        self._feed_error: Optional[BaseException] = None
+
+    def stop(self) -> None:
+        """발송 중단 요청 - 진행 중인 메일 이후 새 메일을 시작하지 않음"""
+        self._stop.set()
+        self._running.set()  # 일시정지 중인 워커도 깨워서 종료
+
+    def close(self) -> None:
+        """정지 + 미리 열어 둔 연결 정리 (run()을 호출하지 않고 포기할 때)"""
+        self.stop()
+        for conn in self.connections:
+            conn.close()
+
+    def pause(self) -> None:
+        """일시정지 - 진행 중인 메일은 마치고 다음 메일부터 대기"""
+        self._running.clear()
+
+    def resume(self) -> None:
+        self._running.set()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stop.is_set()
+
+    @property
+    def paused(self) -> bool:
+        return not self._running.is_set()
+
+    def _wait_if_paused(self) -> bool:
+        """일시정지 해제까지 대기 - 계속 발송하면 True, 정지 요청이면 False"""
+        while not self._running.wait(timeout=0.5):
+            pass
+        return not self._stop.is_set()
+
+    def check_connection(self) -> Optional[str]:
+        """발송 전 연결 확인 - 첫 번째 풀 연결을 미리 열어 둠 (실패 시 오류 메시지)"""
+        conn = PooledConnection(self.connect)
+        server, error = conn.get()
+        if server is None:
+            return error
+        self.connections.append(conn)
+        return None
+
+    def prepare(self, job: SendJob) -> bytes:
+        """메시지 바이트 준비 (이미 있으면 그대로)"""
+        if job.wire is None:
+            with span('mime.build'):
+                job.wire = build_wire_bytes(self.sender_email, job.recipient, job.subject, job.html,
+                                            self.sender_name)
+        return job.wire
+
+    def _deliver(self, conn: PooledConnection, job: SendJob) -> Tuple[bool, Optional[str], int]:
+        """메일 1건 발송 - 연결 끊김이면 재연결 후 재시도"""
+        last_error = None
+        for attempt in range(1, self.max_reconnects + 2):
+            server, error = conn.get()
+            if server is None:
+                return False, error, attempt
+
+            try:
+                wire = self.prepare(job)
+                with span('smtp.send'):
+                    server.sendmail(self.sender_email, job.recipient, wire)
+                job.wire = None  # 발송 완료 - 결과를 보관하는 동안 메모리를 차지하지 않도록
+                return True, None, attempt
+            except RECONNECT_SMTP_ERRORS as e:
+                last_error = f"{type(e).__name__}: {e}"
+                conn.discard()
+            except smtplib.SMTPException as e:
+                # 수신자 거부 등 서버 응답 오류는 연결과 무관 - 재시도하지 않음
+                return False, f"{type(e).__name__}: {e}", attempt
+            except RECONNECT_ERRORS as e:
+                last_error = f"{type(e).__name__}: {e}"
+                conn.discard()
+            except Exception as e:
+                return False, str(e), attempt
+
+        return False, last_error, self.max_reconnects + 1
+
+    def _worker(self, worker_id: int, conn: PooledConnection,
+                jobs: "queue.Queue[Optional[SendJob]]", results: "queue.Queue") -> None:
+        try:
+            while self._wait_if_paused():
+                try:
+                    job = jobs.get(timeout=0.5)
+                except queue.Empty:
+                    # 아직 렌더링 중인 작업을 기다리는 중 (스트리밍 입력)
+                    if self._stop.is_set():
+                        break
+                    continue
+                if job is None:  # 입력 끝
+                    break
+                with span('rate_limit.wait'):
+                    allowed = self.limiter.wait(self._stop)
+                if not allowed or not self._wait_if_paused():
+                    break
+                if self.before_send:
+                    try:
+                        self.before_send(job)
+                    except Exception as e:
+                        # 발송 기록을 남길 수 없으면 보내지 않음 (중복 발송 방지)
+                        results.put(DispatchResult(job, False, f"발송 기록 실패: {e}", 0, worker_id))
+                        continue
+                ok, error, attempts = self._deliver(conn, job)
+                count('mail.sent' if ok else 'mail.failed')
+                results.put(DispatchResult(job, ok, error, attempts, worker_id))
+        finally:
+            conn.close()
+            results.put(None)  # 워커 종료 표시
+
+    def _put(self, job_queue: "queue.Queue[Optional[SendJob]]", item: Optional[SendJob]) -> bool:
+        """큐가 찰 때는 워커를 기다림 - 정지 요청이면 False"""
+        while True:
+            try:
+                job_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self._stop.is_set():
+                    return False
+
+    def _feed(self, jobs: Iterable[SendJob], job_queue: "queue.Queue[Optional[SendJob]]",
+              n_workers: int) -> None:
+        """
+        입력 스레드 - 작업을 받아(제너레이터면 렌더링 청크 스트림) 메시지 바이트를 미리
+        만든 뒤 발송 큐에 넣음. 워커보다 FEED_AHEAD_PER_WORKER건씩 앞서 갑니다.
+        """
+        try:
+            for job in jobs:
+                if self._stop.is_set():
+                    return
+                try:
+                    self.prepare(job)
+                except Exception:
+                    pass  # 워커의 _deliver에서 다시 시도해 그 메일만 실패로 기록
+                if not self._put(job_queue, job):
+                    return
+        except Exception as e:
+            self._feed_error = e
+            self._stop.set()
+        finally:
+            for _ in range(n_workers):
+                if not self._put(job_queue, None):
+                    break
+
+    def run(self, jobs: Iterable[SendJob], poll_interval: Optional[float] = None) -> Iterator[Optional[DispatchResult]]:
+        """
+        발송 실행 - 결과를 완료 순서대로 yield
+
+        작업은 입력 스레드가 받아 오는 대로 메시지 바이트를 만들어 발송 큐에 넣습니다.
+        jobs가 제너레이터면 렌더링이 끝나기 전에 앞쪽 메일부터 발송을 시작합니다.
+        입력 중 예외가 나면 발송을 멈추고 모든 결과를 돌려준 뒤 그 예외를 다시 발생시킵니다.
+
+        poll_interval을 지정하면 그 시간 동안 새 결과가 없을 때 None을 yield합니다.
+        호출 스레드는 이때 화면 갱신(ETA 표시)과 정지 요청 확인을 할 수 있습니다.
+
+        호출자가 반복을 중단하거나 예외가 발생하면(Streamlit 리런 포함)
+        워커를 정지시키고 연결을 정리합니다.
+        """
+        self._feed_error = None
+        n_workers = self.pool_size
+        if isinstance(jobs, (list, tuple)):
+            n_workers = min(n_workers, max(1, len(jobs)))
+        job_queue: "queue.Queue[Optional[SendJob]]" = queue.Queue(maxsize=n_workers * FEED_AHEAD_PER_WORKER)
+        # 단계별 시간 기록 - 호출 스레드의 활성 트레이서를 입력/워커 스레드로 전달
+        feeder = threading.Thread(target=bind_tracer(self._feed), args=(jobs, job_queue, n_workers),
+                                  name="smtp-dispatch-feed", daemon=True)
+
+        result_queue: "queue.Queue[Optional[DispatchResult]]" = queue.Queue()
+        while len(self.connections) < n_workers:
+            self.connections.append(PooledConnection(self.connect))
+
+        threads = [
+            threading.Thread(target=bind_tracer(self._worker), args=(i, conn, job_queue, result_queue),
+                             name=f"smtp-dispatch-{i}", daemon=True)
+            for i, conn in enumerate(self.connections[:n_workers])
+        ]
+        for extra in self.connections[n_workers:]:
+            extra.close()
+        for t in threads:
+            t.start()
+        feeder.start()
+
+        finished = 0
+        try:
+            while finished < n_workers:
+                try:
+                    result = result_queue.get(timeout=poll_interval)
+                except queue.Empty:
+                    yield None
+                    continue
+                if result is None:
+                    finished += 1
+                    continue
+                yield result
+        finally:
+            self._stop.set()
+            for t in threads:
+                t.join(timeout=5)
+            feeder.join(timeout=5)
+        if self._feed_error is not None:
+            raise self._feed_error
+
+
+# ============================================================================
+# 🧪 MODULE TEST (로컬 SMTP 스탠드인 서버 대상)
+# ============================================================================
+
+if __name__ == "__main__":
+    import socketserver
+
+    class _SinkHandler(socketserver.StreamRequestHandler):
+        """최소 SMTP 서버 - AUTH 허용, 메시지 수신 후 카운트 (drop_every마다 연결 강제 종료)"""
+
+        def _reply(self, line: str) -> None:
+            self.wfile.write((line + "\r\n").encode())
+
+        def handle(self):
+            server = self.server
+            self._reply("220 localhost sink")
+            while True:
+                line = self.rfile.readline()
+                if not line:
+                    return
+                cmd = line.decode(errors="replace").strip().upper()
+                if cmd.startswith(("EHLO", "HELO")):
+                    self._reply("250-localhost")
+                    self._reply("250 AUTH PLAIN LOGIN")
+                elif cmd.startswith("AUTH"):
+                    self._reply("235 ok")
+                elif cmd.startswith(("MAIL", "RSET", "NOOP")):
+                    self._reply("250 ok")
+                elif cmd.startswith("RCPT"):
+                    if "REFUSE" in cmd:
+                        self._reply("550 no such user")
+                    else:
+                        self._reply("250 ok")
+                elif cmd == "DATA":
+                    with server.lock:
+                        server.attempts += 1
+                        drop = server.drop_every and server.attempts % server.drop_every == 0
+                    if drop:
+                        return  # 메시지 수신 전 연결 끊김
+                    self._reply("354 go ahead")
+                    while self.rfile.readline() not in (b".\r\n", b""):
+                        pass
+                    time.sleep(server.latency)  # 실제 서버의 응답 지연 흉내
+                    with server.lock:
+                        server.received += 1
+                    self._reply("250 queued")
+                elif cmd == "QUIT":
+                    self._reply("221 bye")
+                    return
+                else:
+                    self._reply("500 unknown")
+
+    class _Sink(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+        def __init__(self, drop_every: int = 0, latency: float = 0.0):
+            super().__init__(("127.0.0.1", 0), _SinkHandler)
+            self.lock = threading.Lock()
+            self.attempts = 0
+            self.received = 0
+            self.drop_every = drop_every
+            self.latency = latency
+
+    def _connect_to(port: int):
+        def connect():
+            try:
+                server = smtplib.SMTP("127.0.0.1", port, timeout=5)
+                server.login("user@example.com", "pw")
+                return server, None
+            except Exception as e:
+                return None, str(e)
+        return connect
+
+    def _jobs(n: int) -> List[SendJob]:
+        jobs = [SendJob(f"업체{i:03d}", f"cso{i}@example.com", f"[정산서] 업체{i:03d}",
+                        "<p>정산서</p>" * 50, index=i) for i in range(n)]
+        jobs[7].recipient = "refuse@example.com"
+        return jobs
+
+    print("=== SMTP Dispatcher Test ===")
+
+    # 1. 풀 크기별 처리량 (발송 간격 없음, 서버 응답 지연 20ms)
+    for pool_size in (1, 4):
+        sink = _Sink(latency=0.02)
+        threading.Thread(target=sink.serve_forever, daemon=True).start()
+        dispatcher = SMTPDispatcher(_connect_to(sink.server_address[1]), "user@example.com", pool_size=pool_size)
+        start = time.perf_counter()
+        results = list(dispatcher.run(_jobs(200)))
+        elapsed = time.perf_counter() - start
+        ok = sum(r.ok for r in results)
+        print(f"  pool={pool_size}: {ok}/{len(results)} ok, {elapsed:.2f}s, received={sink.received}")
+        assert len(results) == 200 and ok == 199 and sink.received == 199
+        sink.shutdown()
+
+    # 2. 연결 끊김 → 투명한 재연결
+    sink = _Sink(drop_every=25)
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    dispatcher = SMTPDispatcher(_connect_to(sink.server_address[1]), "user@example.com", pool_size=3)
+    results = list(dispatcher.run(_jobs(100)))
+    retried = sum(1 for r in results if r.attempts > 1)
+    connects = sum(c.connects for c in dispatcher.connections)
+    print(f"  reconnect: {sum(r.ok for r in results)}/100 ok, retried={retried}, connects={connects}")
+    assert sum(r.ok for r in results) == 99 and retried > 0 and sink.received == 99
+    sink.shutdown()
+
+    # 3. 전역 간격 + 배치 휴식 (풀 크기와 무관하게 유지)
+    sink = _Sink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    limiter = TokenBucketRateLimiter.from_delays(0.05, 0.05, batch_size=5, batch_delay=0.3)
+    dispatcher = SMTPDispatcher(_connect_to(sink.server_address[1]), "user@example.com", pool_size=4, limiter=limiter)
+    start = time.perf_counter()
+    ticks = 0
+    results = []
+    for result in dispatcher.run(_jobs(11), poll_interval=0.05):
+        if result is None:
+            ticks += 1  # 대기 중에도 호출 스레드로 제어가 돌아옴
+        else:
+            results.append(result)
+    elapsed = time.perf_counter() - start
+    # 슬롯 11개: 간격 10 × 0.05 + 배치 휴식 2 × 0.3 = 1.1s
+    print(f"  paced: {len(results)} sent in {elapsed:.2f}s (expected ≥ 1.10s), idle ticks={ticks}")
+    assert elapsed >= 1.05 and ticks > 0
+    sink.shutdown()
+
+    # 4. 미리 만든 메시지 바이트 - 발송 구간(연결 1개, 응답 지연 없음)에서 빠지는 시간
+    import email
+    sink = _Sink()
+    threading.Thread(target=sink.serve_forever, daemon=True).start()
+    server, _ = _connect_to(sink.server_address[1])()
+    jobs = [SendJob(f"업체{i:03d}", f"cso{i}@example.com", f"[정산서] 업체{i:03d} 2026년 10월 정산 내역 안내",
+                    "<tr><td>품목</td><td>₩12,345</td></tr>" * 200, index=i) for i in range(300)]
+    start = time.perf_counter()
+    for job in jobs:
+        msg = build_message("user@example.com", job.recipient, job.subject, job.html)
+        server.sendmail("user@example.com", job.recipient, msg.as_string())
+    inline_time = time.perf_counter() - start
+    wires = [build_wire_bytes("user@example.com", j.recipient, j.subject, j.html) for j in jobs]
+    start = time.perf_counter()
+    for job, wire in zip(jobs, wires):
+        server.sendmail("user@example.com", job.recipient, wire)
+    prebuilt_time = time.perf_counter() - start
+    server.quit()
+    parsed = email.message_from_bytes(wires[0])
+    assert parsed['Subject'] and b"\r\n" in wires[0] and wires[0].count(b"\n") == wires[0].count(b"\r\n")
+    assert "₩12,345" in parsed.get_payload(0).get_payload(decode=True).decode("utf-8")
+    print(f"  send path per message: build+as_string {inline_time / len(jobs) * 1000:.2f}ms → "
+          f"pre-built bytes {prebuilt_time / len(jobs) * 1000:.2f}ms")
+    assert sink.received == 600
+    sink.shutdown()
+
+    print("\n✅ All dispatcher tests passed!")